@@ -7,30 +7,46 @@ Provides endpoints for configuration, backtest execution, templates, and results
 from __future__ import annotations
 
 import json
+import multiprocessing
+import os
+import queue
 import threading
 import time
 import uuid
-from datetime import datetime
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 import sqlite3
 
 import duckdb
+import numpy as np
+import orjson
 import pandas as pd
 from fastapi import FastAPI, HTTPException, Request, Response
 import httpx
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # 未安装时大字段退化为明文 JSON 存储
+
 import sys
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from backtest.engine import BacktestEngine
 from backtest.performance import PerformanceAnalyzer
+from backend.worker import (
+    _now_iso,
+    run_backtest,
+    warmup,
+)
 
 DATA_DIR = ROOT / "data"
 CONFIGS_PATH = ROOT / "configs" / "buy_selectors.json"
@@ -39,24 +55,110 @@ DB_PATH = ROOT / "backend" / "backtest_results.db"
 FRONTEND_DIR = ROOT / "frontend"
 INDICATORS_DB_PATH = ROOT / "data" / "indicators.duckdb"
 
+# 排名指标：与 metrics_json 中的键同名，同时冗余为 backtests 表的 REAL 列，
+# 供 /api/rankings 直接在 SQLite 内排序
+RANKING_METRICS = (
+    "score",
+    "total_return_pct",
+    "sharpe_ratio",
+    "max_drawdown_pct",
+    "win_rate_pct",
+    "final_value",
+)
+
+
+# orjson：NaN/Inf 输出为 null；datetime 交给 default=str 处理，保持与旧版
+# json.dumps(default=str) 一致的 "YYYY-MM-DD HH:MM:SS" 格式
+_ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_SERIALIZE_NUMPY
+    | orjson.OPT_PASSTHROUGH_DATETIME
+)
+
 
-def _now_iso() -> str:
-    return datetime.utcnow().isoformat() + "Z"
+def _json_dumps_bytes(data: Any) -> bytes:
+    return orjson.dumps(data, default=str, option=_ORJSON_OPTIONS)
 
 
 def _json_dumps(data: Any) -> str:
-    return json.dumps(data, ensure_ascii=False, default=str)
+    return _json_dumps_bytes(data).decode("utf-8")
 
 
-def _json_loads(text: Optional[str]) -> Any:
+def _json_loads(text: Optional[Union[bytes, str]]) -> Any:
     if not text:
         return None
-    return json.loads(text)
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        # 旧版 json.dumps 写入的行可能含 NaN / Infinity 字面量
+        return json.loads(text)
 
 
-def init_db():
+def _json_dumps_blob(data: Any) -> Union[bytes, str]:
+    """序列化大字段（payload / result），安装了 zstandard 时压缩为 BLOB。"""
+    raw = _json_dumps_bytes(data)
+    if zstandard is None:
+        return raw.decode("utf-8")
+    return zstandard.ZstdCompressor(level=3).compress(raw)
+
+
+def _json_loads_blob(value: Optional[Union[bytes, str]]) -> Any:
+    """_json_dumps_blob 的逆操作；兼容历史上以明文 TEXT 存储的行。"""
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read compressed backtest results")
+        value = zstandard.ZstdDecompressor().decompress(value)
+    return _json_loads(value)
+
+
+# 进程内共享的 SQLite 连接：避免每次读写都重新 open 文件 + 回滚日志 fsync。
+# isolation_level=None 关闭 sqlite3 模块的隐式事务，写入由 db_execute 显式
+# BEGIN IMMEDIATE / COMMIT 包裹；所有访问经 _DB_LOCK 串行化。
+_DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA wal_autocheckpoint=1000",
+)
+_DB_LOCK = threading.RLock()
+_DB_CONN: Optional[sqlite3.Connection] = None
+
+# 日志 / 进度批量写入专用连接：JobEventWriter 的 flush 不再占用 _DB_LOCK，
+# API 读请求在 WAL 下与之并发；与主连接之间的写冲突由 busy_timeout 排队
+_WRITER_LOCK = threading.Lock()
+_WRITER_CONN: Optional[sqlite3.Connection] = None
+
+
+def _connect() -> sqlite3.Connection:
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with sqlite3.connect(DB_PATH) as conn:
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    for pragma in _DB_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _DB_CONN
+    if _DB_CONN is None:
+        _DB_CONN = _connect()
+    return _DB_CONN
+
+
+def _get_writer_conn() -> sqlite3.Connection:
+    global _WRITER_CONN
+    if _WRITER_CONN is None:
+        _WRITER_CONN = _connect()
+    return _WRITER_CONN
+
+
+def init_db():
+    with _DB_LOCK:
+        conn = _get_conn()
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS backtests (
@@ -86,6 +188,13 @@ def init_db():
             )
             """
         )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_logs_bt_id ON logs(backtest_id, id DESC)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bt_created_at ON backtests(created_at DESC)"
+        )
+        _migrate_metric_columns(conn)
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS templates (
@@ -96,7 +205,32 @@ def init_db():
             )
             """
         )
-        conn.commit()
+
+
+def _migrate_metric_columns(conn: sqlite3.Connection) -> None:
+    """为旧库补齐排名指标列及索引，并从 metrics_json 回填已完成的回测。"""
+    existing = {row["name"] for row in conn.execute("PRAGMA table_info(backtests)")}
+    added = False
+    for metric in RANKING_METRICS:
+        if metric not in existing:
+            conn.execute(f"ALTER TABLE backtests ADD COLUMN {metric} REAL")
+            added = True
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_bt_{metric} ON backtests(status, {metric} DESC)"
+        )
+
+    if added:
+        assignments = ", ".join(
+            f"{metric}=json_extract(metrics_json, '$.{metric}')" for metric in RANKING_METRICS
+        )
+        try:
+            conn.execute(
+                f"UPDATE backtests SET {assignments} "
+                f"WHERE status='COMPLETED' AND metrics_json IS NOT NULL"
+            )
+        except sqlite3.OperationalError as exc:
+            # SQLite 未编译 JSON1 时跳过回填，旧记录在排名中排在末尾
+            print(f"WARNING: failed to backfill ranking metrics: {exc}")
 
 
 def cleanup_stale_jobs():
@@ -114,68 +248,174 @@ def cleanup_stale_jobs():
     )
 
 
+@contextmanager
+def db_transaction(dedicated_writer: bool = False):
+    """
+    开启一个写事务（BEGIN IMMEDIATE … COMMIT），异常时回滚。
+
+    dedicated_writer=True 时使用日志写入专用连接，否则使用共享连接。
+    """
+    lock, get_conn = (
+        (_WRITER_LOCK, _get_writer_conn) if dedicated_writer else (_DB_LOCK, _get_conn)
+    )
+    with lock:
+        conn = get_conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+
 def db_execute(query: str, params: tuple = ()) -> None:
-    with sqlite3.connect(DB_PATH) as conn:
+    with db_transaction() as conn:
         conn.execute(query, params)
-        conn.commit()
 
 
 def db_query(query: str, params: tuple = ()) -> List[sqlite3.Row]:
-    with sqlite3.connect(DB_PATH) as conn:
-        conn.row_factory = sqlite3.Row
-        cur = conn.execute(query, params)
+    with _DB_LOCK:
+        cur = _get_conn().execute(query, params)
         return cur.fetchall()
 
 
-def load_buy_config_default() -> Dict[str, Any]:
-    with open(CONFIGS_PATH, "r", encoding="utf-8") as f:
+@lru_cache(maxsize=8)
+def _read_json(path: Path, mtime_ns: int) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
+def _load_json_cached(path: Path) -> Dict[str, Any]:
+    """
+    读取 JSON 配置，按 (path, mtime_ns) 缓存解析结果，文件改动后自动失效。
+
+    返回的是共享对象，调用方不得原地修改。
+    """
+    return _read_json(path, os.stat(path).st_mtime_ns)
+
+
+def load_buy_config_default() -> Dict[str, Any]:
+    return _load_json_cached(CONFIGS_PATH)
+
+
 def load_sell_strategies() -> Dict[str, Any]:
-    with open(SELL_STRATEGIES_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return _load_json_cached(SELL_STRATEGIES_PATH)
 
 
-def _scale(value: float, low: float, high: float) -> float:
-    if high == low:
-        return 0.0
-    return max(0.0, min(1.0, (value - low) / (high - low)))
+class JobEventWriter:
+    """
+    单个回测任务的日志 / 进度批量写入器。
 
+    回测 worker 进程把事件压入 events 队列（Manager 队列，跨进程），由后台
+    线程按时间窗口（FLUSH_INTERVAL）或条数（FLUSH_BATCH）聚合后，在一个事务内
+    executemany 写入日志，并只写入窗口内最新的一次进度。
+    """
 
-def compute_strategy_score(analysis: Dict[str, Any]) -> Dict[str, Any]:
-    returns = analysis.get("returns", {})
-    risk = analysis.get("risk_adjusted", {})
-    drawdown = analysis.get("drawdown", {})
-    trades = analysis.get("trade_stats", {})
+    FLUSH_INTERVAL = 0.1
+    FLUSH_BATCH = 50
 
-    total_return = float(returns.get("total_return_pct", 0.0))
-    sharpe = float(risk.get("sharpe_ratio", 0.0))
-    max_dd = abs(float(drawdown.get("max_drawdown_pct", 0.0)))
-    win_rate = float(trades.get("win_rate_pct", 0.0))
+    def __init__(self, job_id: str, events: Optional[Any] = None) -> None:
+        self.job_id = job_id
+        self.events = events if events is not None else queue.SimpleQueue()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
 
-    score = (
-        0.4 * _scale(total_return, 0, 50) +
-        0.25 * _scale(sharpe, 0, 2.5) +
-        0.2 * _scale(win_rate, 40, 80) +
-        0.15 * _scale(100 - max_dd, 50, 100)
-    ) * 10
+    def log(self, message: str) -> None:
+        self.events.put(("log", (self.job_id, _now_iso(), message)))
 
-    return {
-        "score": round(score, 2),
-        "components": {
-            "total_return_pct": total_return,
-            "sharpe_ratio": sharpe,
-            "max_drawdown_pct": max_dd,
-            "win_rate_pct": win_rate
-        }
-    }
+    def progress(self, value: float) -> None:
+        self.events.put(("progress", value))
+
+    def close(self) -> None:
+        """停止后台线程并写完队列中剩余的事件（可重复调用）。"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self.events.get(timeout=self.FLUSH_INTERVAL)
+            except queue.Empty:
+                if self._closed.is_set():
+                    return
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.FLUSH_INTERVAL
+            while len(batch) < self.FLUSH_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.events.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch: List[tuple]) -> None:
+        log_rows = []
+        latest_progress = None
+        started_at = None
+        for kind, value in batch:
+            if kind == "log":
+                log_rows.append(value)
+            elif kind == "progress":
+                latest_progress = value
+            elif kind == "started":
+                started_at = value
+
+        try:
+            with db_transaction(dedicated_writer=True) as conn:
+                if started_at is not None:
+                    conn.execute(
+                        "UPDATE backtests SET status=?, started_at=?, progress=? WHERE id=?",
+                        ("RUNNING", started_at, 0.0, self.job_id),
+                    )
+                if log_rows:
+                    conn.executemany(
+                        "INSERT INTO logs (backtest_id, ts, message) VALUES (?, ?, ?)",
+                        log_rows,
+                    )
+                if latest_progress is not None:
+                    conn.execute(
+                        "UPDATE backtests SET progress=? WHERE id=?",
+                        (latest_progress, self.job_id),
+                    )
+        except Exception as exc:
+            print(f"WARNING: failed to flush events for job {self.job_id}: {exc}")
 
 
 class JobManager:
+    """
+    回测任务调度。
+
+    引擎在 ProcessPoolExecutor（大小 = CPU 核数）中运行，API 进程里每个任务
+    只保留一个轻量状态线程：等待 Future 并写入终态。事件队列与取消标志由
+    multiprocessing.Manager 提供，以便随 submit 传入复用中的 worker 进程。
+    进程池与 Manager 在首次提交任务时才创建。
+    """
+
     def __init__(self) -> None:
         self._jobs: Dict[str, Dict[str, Any]] = {}
         self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager: Optional[Any] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+            return self._executor
+
+    def _get_manager(self) -> Any:
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.Manager()
+            return self._manager
 
     def create(self, payload: Dict[str, Any]) -> str:
         job_id = str(uuid.uuid4())
@@ -193,178 +433,118 @@ class JobManager:
                 _now_iso(),
                 payload.get("start_date"),
                 payload.get("end_date"),
-                _json_dumps(payload),
+                _json_dumps_blob(payload),
             ),
         )
         return job_id
 
     def start(self, job_id: str, payload: Dict[str, Any]) -> None:
-        cancel_event = threading.Event()
-
-        def run_job():
-            try:
-                db_execute(
-                    "UPDATE backtests SET status=?, started_at=?, progress=? WHERE id=?",
-                    ("RUNNING", _now_iso(), 0.0, job_id),
-                )
-
-                def log_callback(message: str) -> None:
-                    db_execute(
-                        "INSERT INTO logs (backtest_id, ts, message) VALUES (?, ?, ?)",
-                        (job_id, _now_iso(), message),
-                    )
-
-                def progress_callback(done: int, total: int, date: datetime) -> None:
-                    progress = 0.0 if total == 0 else (done / total) * 100.0
-                    db_execute(
-                        "UPDATE backtests SET progress=? WHERE id=?",
-                        (round(progress, 2), job_id),
-                    )
-
-                def cancel_check() -> bool:
-                    return cancel_event.is_set()
-                buy_config = payload.get("buy_config")
-                if buy_config is None:
-                    buy_config = load_buy_config_default()
-
-                sell_strategies = load_sell_strategies()
-                sell_strategy_name = payload.get("sell_strategy_name")
-                sell_strategy_config = payload.get("sell_strategy_config")
-                if sell_strategy_config is None:
-                    if not sell_strategy_name:
-                        sell_strategy_name = "conservative_trailing"
-                    sell_strategy_config = sell_strategies.get("strategies", {}).get(sell_strategy_name)
-                if not sell_strategy_config:
-                    raise ValueError("Sell strategy configuration not found.")
-
-                stock_pool = payload.get("stock_pool", {"type": "all"})
-                stock_codes = None
-                if stock_pool.get("type") == "list":
-                    stock_codes = stock_pool.get("codes", [])
-
-                engine = BacktestEngine(
-                    data_dir=str(DATA_DIR),
-                    buy_config_path=str(CONFIGS_PATH),
-                    sell_strategy_config=sell_strategy_config,
-                    start_date=payload.get("start_date"),
-                    end_date=payload.get("end_date"),
-                    initial_capital=float(payload.get("initial_capital", 1000000)),
-                    max_positions=int(payload.get("max_positions", 10)),
-                    position_sizing=payload.get("position_sizing", "equal_weight"),
-                    commission_rate=float(payload.get("commission_rate", 0.0003)),
-                    stamp_tax_rate=float(payload.get("stamp_tax_rate", 0.001)),
-                    slippage_rate=float(payload.get("slippage_rate", 0.001)),
-                    buy_config=buy_config,
-                    log_callback=log_callback,
-                    # ── Score 百分位过滤 ──────────────────────────────────────
-                    score_filter_enabled=bool(payload.get("score_filter_enabled", False)),
-                    score_percentile_threshold=float(payload.get("score_percentile_threshold", 60.0)),
-                    score_min_history=int(payload.get("score_min_history", 20)),
-                    score_warmup_lookback_days=int(payload.get("score_warmup_lookback_days", 20)),
-                    # ── 换仓 (Rotation) ───────────────────────────────────────
-                    rotation_enabled=bool(payload.get("rotation_enabled", False)),
-                    rotation_min_stop_threshold=float(payload.get("rotation_min_loss", 0.05)),
-                    rotation_max_per_day=int(payload.get("rotation_max_per_day", 2)),
-                    rotation_score_ratio=float(payload.get("rotation_score_ratio", 1.2)),
-                    rotation_min_score_improvement=float(payload.get("rotation_min_score_improvement", 10.0)),
-                    rotation_no_score_policy=str(payload.get("rotation_no_score_policy", "skip")),
-                )
-
-                engine.load_data(
-                    stock_codes=stock_codes,
-                    lookback_days=int(payload.get("lookback_days", 200)),
-                )
-                if len(engine.market_data) == 0:
-                    raise ValueError("No market data loaded.")
-
-                engine.load_buy_selectors()
-                if len(engine.buy_selectors) == 0:
-                    raise ValueError("No active buy selectors.")
-
-                engine.load_sell_strategy()
-                engine.run(progress_callback=progress_callback, cancel_check=cancel_check)
-
-                if cancel_event.is_set():
-                    db_execute(
-                        "UPDATE backtests SET status=?, finished_at=? WHERE id=?",
-                        ("CANCELLED", _now_iso(), job_id),
-                    )
-                    return
+        manager = self._get_manager()
+        cancel_event = manager.Event()
+        writer = JobEventWriter(job_id, events=manager.Queue())
+
+        try:
+            buy_config = payload.get("buy_config")
+            if buy_config is None:
+                buy_config = load_buy_config_default()
+
+            sell_strategies = load_sell_strategies()
+            sell_strategy_name = payload.get("sell_strategy_name")
+            sell_strategy_config = payload.get("sell_strategy_config")
+            if sell_strategy_config is None:
+                if not sell_strategy_name:
+                    sell_strategy_name = "conservative_trailing"
+                sell_strategy_config = sell_strategies.get("strategies", {}).get(sell_strategy_name)
+            if not sell_strategy_config:
+                raise ValueError("Sell strategy configuration not found.")
+
+            future = self._get_executor().submit(
+                run_backtest,
+                job_id,
+                payload,
+                buy_config,
+                sell_strategy_config,
+                str(DATA_DIR),
+                str(CONFIGS_PATH),
+                writer.events,
+                cancel_event,
+            )
+        except Exception as exc:
+            writer.close()
+            db_execute(
+                "UPDATE backtests SET status=?, error=?, finished_at=? WHERE id=?",
+                ("FAILED", str(exc), _now_iso(), job_id),
+            )
+            return
 
-                results = engine.get_results()
-                equity_df = pd.DataFrame(results.get("equity_curve", []))
-                trades_df = pd.DataFrame(results.get("trades", []))
-
-                # Get benchmark name from payload (optional)
-                benchmark_name = payload.get("benchmark_name")
-
-                analysis = PerformanceAnalyzer(
-                    equity_curve=equity_df,
-                    trades=trades_df,
-                    initial_capital=float(payload.get("initial_capital", 1000000)),
-                    benchmark_name=benchmark_name if benchmark_name and benchmark_name != "none" else None,
-                    benchmark_data_dir=DATA_DIR / "index",
-                ).analyze()
-
-                score = compute_strategy_score(analysis)
-
-                best_trade = None
-                best_stock = None
-                if not trades_df.empty:
-                    best_trade_row = trades_df.sort_values("net_pnl_pct", ascending=False).iloc[0]
-                    best_trade = best_trade_row.to_dict()
-                    best_stock_series = trades_df.groupby("code")["net_pnl"].sum().sort_values(ascending=False)
-                    if not best_stock_series.empty:
-                        best_stock = {"code": best_stock_series.index[0], "net_pnl": best_stock_series.iloc[0]}
-
-                results["analysis"] = analysis
-                results["strategy_score"] = score
-                results["best_trade"] = best_trade
-                results["best_stock"] = best_stock
-
-                metrics = {
-                    "total_return_pct": analysis.get("returns", {}).get("total_return_pct", 0),
-                    "max_drawdown_pct": analysis.get("drawdown", {}).get("max_drawdown_pct", 0),
-                    "win_rate_pct": analysis.get("trade_stats", {}).get("win_rate_pct", 0),
-                    "sharpe_ratio": analysis.get("risk_adjusted", {}).get("sharpe_ratio", 0),
-                    "final_value": analysis.get("returns", {}).get("final_value", 0),
-                    "score": score.get("score", 0),
-                }
+        # 任务状态线程只等待 Future 并落库终态，不做任何数值计算
+        thread = threading.Thread(
+            target=self._finish_job, args=(job_id, future, writer), daemon=True
+        )
+        with self._lock:
+            self._jobs[job_id] = {
+                "future": future,
+                "cancel_event": cancel_event,
+                "thread": thread,
+            }
+        thread.start()
 
+    def _finish_job(self, job_id: str, future: Future, writer: JobEventWriter) -> None:
+        try:
+            try:
+                outcome = future.result()
+            except CancelledError:
+                # 尚在进程池队列中即被取消，worker 从未启动
+                outcome = None
+            finally:
+                # 先写完排队中的日志 / 进度，避免旧状态覆盖下面的终态
+                writer.close()
+
+            if outcome is None:
                 db_execute(
-                    """
-                    UPDATE backtests
-                    SET status=?, progress=?, finished_at=?, result_json=?, metrics_json=?
-                    WHERE id=?
-                    """,
-                    (
-                        "COMPLETED",
-                        100.0,
-                        _now_iso(),
-                        _json_dumps(results),
-                        _json_dumps(metrics),
-                        job_id,
-                    ),
-                )
-            except (KeyboardInterrupt, SystemExit) as exc:
-                # Handle forced termination (Ctrl+C, kill, etc.)
-                db_execute(
-                    "UPDATE backtests SET status=?, error=?, finished_at=? WHERE id=?",
-                    ("FAILED", f"Backtest terminated: {type(exc).__name__}", _now_iso(), job_id),
-                )
-                raise
-            except Exception as exc:
-                import traceback
-                error_msg = f"{str(exc)}\n{traceback.format_exc()}"
-                db_execute(
-                    "UPDATE backtests SET status=?, error=?, finished_at=? WHERE id=?",
-                    ("FAILED", error_msg, _now_iso(), job_id),
+                    "UPDATE backtests SET status=?, finished_at=? WHERE id=?",
+                    ("CANCELLED", _now_iso(), job_id),
                 )
-
-        thread = threading.Thread(target=run_job, daemon=True)
-        with self._lock:
-            self._jobs[job_id] = {"thread": thread, "cancel_event": cancel_event}
-        thread.start()
+                return
+
+            metrics = outcome["metrics"]
+            metric_columns = ", ".join(f"{m}=?" for m in RANKING_METRICS)
+            db_execute(
+                f"""
+                UPDATE backtests
+                SET status=?, progress=?, finished_at=?, result_json=?, metrics_json=?,
+                    {metric_columns}
+                WHERE id=?
+                """,
+                (
+                    "COMPLETED",
+                    100.0,
+                    _now_iso(),
+                    _json_dumps_blob(outcome["results"]),
+                    _json_dumps(metrics),
+                    *(float(metrics[m]) for m in RANKING_METRICS),
+                    job_id,
+                ),
+            )
+        except (KeyboardInterrupt, SystemExit) as exc:
+            # Handle forced termination (Ctrl+C, kill, etc.)
+            db_execute(
+                "UPDATE backtests SET status=?, error=?, finished_at=? WHERE id=?",
+                ("FAILED", f"Backtest terminated: {type(exc).__name__}", _now_iso(), job_id),
+            )
+            raise
+        except Exception as exc:
+            import traceback
+            # worker 内的原始堆栈经 __cause__ 一并输出
+            error_msg = f"{str(exc)}\n{traceback.format_exc()}"
+            db_execute(
+                "UPDATE backtests SET status=?, error=?, finished_at=? WHERE id=?",
+                ("FAILED", error_msg, _now_iso(), job_id),
+            )
+        finally:
+            writer.close()
+            with self._lock:
+                self._jobs.pop(job_id, None)
 
     def cancel(self, job_id: str) -> bool:
         with self._lock:
@@ -372,14 +552,51 @@ class JobManager:
             if not job:
                 return False
             job["cancel_event"].set()
+            job["future"].cancel()
             return True
 
+    def warmup(self) -> None:
+        """启动时预先创建 Manager 与进程池，首个回测请求不再承担拉起开销。"""
+        self._get_manager()
+        self._get_executor().submit(warmup)
+
+    def shutdown(self) -> None:
+        """API 进程退出时取消运行中的任务，等待各任务写完缓冲日志与终态后关闭进程池。"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+            executor, self._executor = self._executor, None
+            manager, self._manager = self._manager, None
+
+        for job in jobs:
+            job["cancel_event"].set()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        for job in jobs:
+            job["thread"].join()
+        if manager is not None:
+            manager.shutdown()
+
 
 init_db()
 cleanup_stale_jobs()
 job_manager = JobManager()
 
-app = FastAPI(title="Backtest API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    job_manager.warmup()
+    yield
+    job_manager.shutdown()
+    if _PROXY_CLIENT is not None:
+        await _PROXY_CLIENT.aclose()
+
+
+app = FastAPI(
+    title="Backtest API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -412,10 +629,13 @@ def create_backtest(payload: Dict[str, Any]):
 
 @app.get("/api/backtests")
 def list_backtests():
+    # 指标直接读冗余的 REAL 列，不再逐行解析 metrics_json；
+    # 仅未能回填指标列的旧记录（score 为 NULL）才带回原始 JSON
     rows = db_query(
-        """
+        f"""
         SELECT id, name, status, progress, created_at, started_at, finished_at,
-               start_date, end_date, metrics_json, error
+               start_date, end_date, error, {", ".join(RANKING_METRICS)},
+               CASE WHEN score IS NULL THEN metrics_json END AS legacy_metrics_json
         FROM backtests
         ORDER BY created_at DESC
         LIMIT 200
@@ -423,6 +643,10 @@ def list_backtests():
     )
     items = []
     for row in rows:
+        if row["score"] is not None:
+            metrics = {m: row[m] for m in RANKING_METRICS}
+        else:
+            metrics = _json_loads(row["legacy_metrics_json"])
         items.append({
             "id": row["id"],
             "name": row["name"],
@@ -433,15 +657,48 @@ def list_backtests():
             "finished_at": row["finished_at"],
             "start_date": row["start_date"],
             "end_date": row["end_date"],
-            "metrics": _json_loads(row["metrics_json"]),
+            "metrics": metrics,
             "error": row["error"],
         })
     return {"items": items}
 
 
+def _equity_curve_columns(result: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """取出按列存储的净值曲线；兼容旧记录中的逐日 dict 列表。"""
+    columns = result.get("equity_curve_columns")
+    if columns is not None:
+        return columns
+    records = result.get("equity_curve") or []
+    if not records:
+        return {}
+    keys = list(records[0].keys())
+    return {k: [r.get(k) for r in records] for k in keys}
+
+
+def _expand_equity_curve(result: Dict[str, Any]) -> Dict[str, Any]:
+    """把按列存储的净值曲线展开回前端使用的 equity_curve 记录列表。"""
+    columns = result.pop("equity_curve_columns", None)
+    if columns is not None:
+        keys = list(columns.keys())
+        result["equity_curve"] = [dict(zip(keys, row)) for row in zip(*columns.values())]
+    return result
+
+
+_BACKTEST_DETAIL_COLUMNS = (
+    "id, name, status, progress, created_at, started_at, finished_at, "
+    "start_date, end_date, payload_json, metrics_json, error"
+)
+
+
 @app.get("/api/backtests/{backtest_id}")
-def get_backtest(backtest_id: str):
-    rows = db_query("SELECT * FROM backtests WHERE id=?", (backtest_id,))
+def get_backtest(backtest_id: str, include: str = ""):
+    """
+    回测详情。默认不读取体积最大的 result_json（前端轮询只需状态 / 进度 / 日志），
+    传 ?include=result 时才一并返回完整结果。
+    """
+    include_result = include == "result"
+    columns = _BACKTEST_DETAIL_COLUMNS + (", result_json" if include_result else "")
+    rows = db_query(f"SELECT {columns} FROM backtests WHERE id=?", (backtest_id,))
     if not rows:
         raise HTTPException(status_code=404, detail="Backtest not found.")
     row = rows[0]
@@ -452,7 +709,7 @@ def get_backtest(backtest_id: str):
     )
     log_items = [{"ts": log["ts"], "message": log["message"]} for log in reversed(logs)]
 
-    return {
+    item = {
         "id": row["id"],
         "name": row["name"],
         "status": row["status"],
@@ -462,12 +719,27 @@ def get_backtest(backtest_id: str):
         "finished_at": row["finished_at"],
         "start_date": row["start_date"],
         "end_date": row["end_date"],
-        "payload": _json_loads(row["payload_json"]),
-        "result": _json_loads(row["result_json"]),
+        "payload": _json_loads_blob(row["payload_json"]),
         "metrics": _json_loads(row["metrics_json"]),
         "error": row["error"],
         "logs": log_items,
     }
+    if include_result:
+        result = _json_loads_blob(row["result_json"])
+        item["result"] = _expand_equity_curve(result) if result else result
+    return item
+
+
+@app.get("/api/backtests/{backtest_id}/equity")
+def get_backtest_equity(backtest_id: str):
+    """按列返回净值曲线（列名 -> 值列表），不展开为逐日对象。"""
+    rows = db_query("SELECT result_json FROM backtests WHERE id=?", (backtest_id,))
+    if not rows:
+        raise HTTPException(status_code=404, detail="Backtest not found.")
+    result = _json_loads_blob(rows[0]["result_json"])
+    if not result:
+        raise HTTPException(status_code=400, detail="No result data available.")
+    return {"backtest_id": backtest_id, "columns": _equity_curve_columns(result)}
 
 
 @app.post("/api/backtests/{backtest_id}/cancel")
@@ -513,12 +785,22 @@ def delete_template(template_id: str):
 
 @app.get("/api/rankings")
 def get_rankings(metric: str = "score"):
+    if metric not in RANKING_METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown ranking metric: {metric}")
+
+    # metric 已经过白名单校验，可安全拼入 ORDER BY
     rows = db_query(
-        "SELECT id, name, created_at, metrics_json FROM backtests WHERE status='COMPLETED'"
+        f"""
+        SELECT id, name, created_at, {", ".join(RANKING_METRICS)}
+        FROM backtests
+        WHERE status='COMPLETED'
+        ORDER BY {metric} DESC
+        LIMIT 200
+        """
     )
     items = []
     for row in rows:
-        metrics = _json_loads(row["metrics_json"]) or {}
+        metrics = {m: row[m] for m in RANKING_METRICS if row[m] is not None}
         items.append({
             "id": row["id"],
             "name": row["name"],
@@ -526,7 +808,6 @@ def get_rankings(metric: str = "score"):
             "metrics": metrics,
             "rank_value": metrics.get(metric, 0),
         })
-    items.sort(key=lambda x: x["rank_value"], reverse=True)
     return {"items": items}
 
 
@@ -569,22 +850,38 @@ def get_kline(code: str, start: str = "", end: str = ""):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@lru_cache(maxsize=16)
+def _read_benchmark_series(path: Path, mtime_ns: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    只解析基准 CSV 的 date / close 两列，按日期排序后返回 numpy 数组。
+
+    按 (path, mtime_ns) 缓存，同一指数的后续请求直接 searchsorted 切片。
+    """
+    df = pd.read_csv(path, usecols=["date", "close"])
+    dates = pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[ns]")
+    close = df["close"].to_numpy(dtype=float)
+    order = np.argsort(dates, kind="stable")
+    return dates[order], close[order]
+
+
 @app.get("/api/benchmark")
 def get_benchmark(name: str, start: str, end: str):
     bench_dir = DATA_DIR / "index"
     bench_path = bench_dir / f"{name}.csv"
     if not bench_path.exists():
         raise HTTPException(status_code=404, detail="Benchmark data not found.")
-    df = pd.read_csv(bench_path)
-    if "date" not in df.columns or "close" not in df.columns:
+    try:
+        dates, close = _read_benchmark_series(bench_path, os.stat(bench_path).st_mtime_ns)
+    except ValueError:
         raise HTTPException(status_code=400, detail="Invalid benchmark data format.")
-    df["date"] = pd.to_datetime(df["date"])
-    df = df[(df["date"] >= pd.to_datetime(start)) & (df["date"] <= pd.to_datetime(end))]
-    if df.empty:
+
+    lo = int(np.searchsorted(dates, np.datetime64(pd.to_datetime(start), "ns"), side="left"))
+    hi = int(np.searchsorted(dates, np.datetime64(pd.to_datetime(end), "ns"), side="right"))
+    if lo >= hi:
         return {"series": []}
-    base = float(df["close"].iloc[0])
-    df["nav"] = df["close"] / base
-    series = [{"date": d.strftime("%Y-%m-%d"), "nav": float(v)} for d, v in zip(df["date"], df["nav"])]
+    nav = close[lo:hi] / close[lo]
+    date_strs = np.datetime_as_string(dates[lo:hi], unit="D")
+    series = [{"date": d, "nav": v} for d, v in zip(date_strs.tolist(), nav.tolist())]
     return {"series": series}
 
 
@@ -601,7 +898,10 @@ def get_backtest_analysis(backtest_id: str, benchmark: str = "none"):
         Analysis results with benchmark comparison if specified
     """
     # Load backtest from database
-    rows = db_query("SELECT * FROM backtests WHERE id=?", (backtest_id,))
+    rows = db_query(
+        "SELECT status, payload_json, result_json FROM backtests WHERE id=?",
+        (backtest_id,),
+    )
     if not rows:
         raise HTTPException(status_code=404, detail="Backtest not found.")
     row = rows[0]
@@ -611,16 +911,16 @@ def get_backtest_analysis(backtest_id: str, benchmark: str = "none"):
         raise HTTPException(status_code=400, detail="Backtest not completed.")
 
     # Load result
-    result = _json_loads(row["result_json"])
+    result = _json_loads_blob(row["result_json"])
     if not result:
         raise HTTPException(status_code=400, detail="No result data available.")
 
     # Extract equity curve and trades
-    equity_df = pd.DataFrame(result.get("equity_curve", []))
+    equity_df = pd.DataFrame(_equity_curve_columns(result))
     trades_df = pd.DataFrame(result.get("trades", []))
 
     # Get initial capital from payload
-    payload = _json_loads(row["payload_json"])
+    payload = _json_loads_blob(row["payload_json"])
     initial_capital = float(payload.get("initial_capital", 1000000)) if payload else 1000000
 
     # Recompute analysis with benchmark
@@ -646,25 +946,43 @@ def get_backtest_analysis(backtest_id: str, benchmark: str = "none"):
 
 NEXTJS_URL = "http://localhost:3000"
 
+# 前端页面 / 静态资源的轮询全部走这里：复用一个带连接池的 AsyncClient，
+# 不再为每个请求新建客户端并重新握手；在 lifespan 结束时关闭
+_PROXY_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _get_proxy_client() -> httpx.AsyncClient:
+    global _PROXY_CLIENT
+    if _PROXY_CLIENT is None:
+        _PROXY_CLIENT = httpx.AsyncClient(follow_redirects=True, timeout=30)
+    return _PROXY_CLIENT
+
+
 @app.api_route(
     "/{path:path}",
     methods=["GET", "POST", "PUT", "DELETE", "PATCH", "OPTIONS", "HEAD"],
     include_in_schema=False,
 )
 async def proxy_to_nextjs(path: str, request: Request):
-    
+    # If-None-Match / Accept-Encoding 等请求头原样转发，304 与 gzip 响应体
+    # 按上游原始字节回传（aiter_raw 不解压），Content-Encoding / ETag 保持一致
+    client = _get_proxy_client()
     url = f"{NEXTJS_URL}/{path}"
     headers = {k: v for k, v in request.headers.items() if k.lower() != "host"}
-    async with httpx.AsyncClient(follow_redirects=True, timeout=30) as client:
-        resp = await client.request(
-            method=request.method,
-            url=url,
-            headers=headers,
-            content=await request.body(),
-            params=dict(request.query_params),
-        )
+    upstream = client.build_request(
+        method=request.method,
+        url=url,
+        headers=headers,
+        content=await request.body(),
+        params=dict(request.query_params),
+    )
+    resp = await client.send(upstream, stream=True)
+    try:
+        content = b"".join([chunk async for chunk in resp.aiter_raw()])
+    finally:
+        await resp.aclose()
     return Response(
-        content=resp.content,
+        content=content,
         status_code=resp.status_code,
         headers=dict(resp.headers),
     )
\ No newline at end of file
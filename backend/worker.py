@@ -0,0 +1,327 @@
+"""
+Backtest job execution.
+
+run_backtest 在 ProcessPoolExecutor 的 worker 进程中执行整个引擎，避免
+数值热循环与 FastAPI 请求线程争用同一个 GIL。worker 不访问 SQLite：
+日志 / 进度 / 开始事件经 multiprocessing.Manager 队列回传给 API 进程的
+JobEventWriter，最终结果作为 Future 的返回值交回 API 进程落库。
+
+本模块不能有导入副作用（不初始化数据库），以便 worker 进程安全导入。
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest.engine import DATA_FILE_SUFFIXES, BacktestEngine
+from backtest.performance import PerformanceAnalyzer
+
+PROGRESS_MIN_INTERVAL = 0.25  # 秒；进度百分比未变化时的最小写入间隔
+CANCEL_POLL_INTERVAL = 0.1    # 秒；跨进程读取取消标志的最小间隔
+MARKET_DATA_CACHE_SIZE = 2    # 每个 worker 进程保留的已加载行情份数
+
+
+# 日志热路径上的时间戳：同一秒内复用已格式化的 "YYYY-MM-DDTHH:MM:SS" 前缀，
+# 只拼接微秒部分；输出与 datetime.utcnow().isoformat() + "Z" 一致
+_TS_CACHE: Tuple[int, str] = (-1, "")
+
+
+def _now_iso() -> str:
+    global _TS_CACHE
+    sec, usec = divmod(time.time_ns() // 1000, 1_000_000)
+    cached_sec, prefix = _TS_CACHE
+    if sec != cached_sec:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+        _TS_CACHE = (sec, prefix)
+    if usec:
+        return f"{prefix}.{usec:06d}Z"
+    return prefix + "Z"
+
+
+def compute_strategy_score(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    returns = analysis.get("returns", {})
+    risk = analysis.get("risk_adjusted", {})
+    drawdown = analysis.get("drawdown", {})
+    trades = analysis.get("trade_stats", {})
+
+    total_return = float(returns.get("total_return_pct", 0.0))
+    sharpe = float(risk.get("sharpe_ratio", 0.0))
+    max_dd = abs(float(drawdown.get("max_drawdown_pct", 0.0)))
+    win_rate = float(trades.get("win_rate_pct", 0.0))
+
+    # 固定的线性组合，各分项先线性映射到 [0, 1] 再截断：
+    #   收益率 0~50%、夏普 0~2.5、胜率 40~80%、(100 - 最大回撤) 50~100
+    score = (
+        0.4 * max(0.0, min(1.0, total_return / 50.0)) +
+        0.25 * max(0.0, min(1.0, sharpe / 2.5)) +
+        0.2 * max(0.0, min(1.0, (win_rate - 40.0) / 40.0)) +
+        0.15 * max(0.0, min(1.0, (50.0 - max_dd) / 50.0))
+    ) * 10
+
+    return {
+        "score": round(score, 2),
+        "components": {
+            "total_return_pct": total_return,
+            "sharpe_ratio": sharpe,
+            "max_drawdown_pct": max_dd,
+            "win_rate_pct": win_rate
+        }
+    }
+
+
+def find_best_trade_and_stock(
+    trades_df: pd.DataFrame,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    找出收益率最高的单笔交易，以及累计净盈亏最高的股票。
+
+    直接在 numpy 数组上 argmax / bincount，避免 sort_values + groupby 的开销。
+    """
+    if trades_df.empty:
+        return None, None
+
+    best_idx = int(np.argmax(trades_df["net_pnl_pct"].to_numpy(dtype=float)))
+    best_trade = trades_df.iloc[best_idx].to_dict()
+
+    codes, uniques = pd.factorize(trades_df["code"])
+    pnl_by_code = np.bincount(codes, weights=trades_df["net_pnl"].to_numpy(dtype=float))
+    stock_idx = int(np.argmax(pnl_by_code))
+    best_stock = {"code": uniques[stock_idx], "net_pnl": float(pnl_by_code[stock_idx])}
+
+    return best_trade, best_stock
+
+
+# ── 行情预加载缓存 ────────────────────────────────────────────────────
+# worker 进程在多个任务间复用：参数扫描时同一数据源 / 区间 / 股票池的行情
+# 只读取一次，legacy 模式的 KDJ/BBI 指标线也只算一次（engine.preload_state()）。
+# key 含数据源的版本（见 _data_version），数据更新后自动失效；
+# 缓存的是 load_data() 之后（已按 price_dtype 转换）的行情，因此 key 也含 price_dtype。
+_MARKET_DATA_CACHE: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+
+def _data_version(engine: BacktestEngine) -> tuple:
+    """
+    数据源的版本：指标库文件的 (mtime_ns, size)；或行情目录的
+    (目录 mtime_ns, 文件数, 文件最大 mtime_ns, 文件总大小)。
+
+    只看文件最大 mtime 不够：删除股票文件、或用 cp -p / rsync -a 拷入保留旧 mtime 的文件时
+    它不变。增删文件会改变目录 mtime 与文件数，原地覆盖通常改变大小。
+    """
+    if engine.use_indicator_db and engine.indicator_store:
+        st = os.stat(engine.indicator_db_path)
+        return (st.st_mtime_ns, st.st_size)
+    suffix = DATA_FILE_SUFFIXES[engine.data_format]
+    count = 0
+    latest = 0
+    total_size = 0
+    with os.scandir(engine.data_dir) as it:
+        for entry in it:
+            if entry.name.endswith(suffix):
+                st = entry.stat()
+                count += 1
+                latest = max(latest, st.st_mtime_ns)
+                total_size += st.st_size
+    return (os.stat(engine.data_dir).st_mtime_ns, count, latest, total_size)
+
+
+def _load_market_data(
+    engine: BacktestEngine, stock_codes: Optional[List[str]], lookback_days: int
+) -> None:
+    key = (
+        str(engine.data_dir),
+        engine.data_format,
+        engine.use_indicator_db,
+        engine.start_date,
+        engine.end_date,
+        tuple(stock_codes) if stock_codes is not None else None,
+        lookback_days,
+        engine.price_dtype.str,
+        _data_version(engine),
+    )
+    cached = _MARKET_DATA_CACHE.get(key)
+    if cached is not None:
+        _MARKET_DATA_CACHE.move_to_end(key)
+        engine.load_data(preloaded=cached)
+        return
+
+    engine.load_data(stock_codes=stock_codes, lookback_days=lookback_days)
+    _MARKET_DATA_CACHE[key] = engine.preload_state()
+    while len(_MARKET_DATA_CACHE) > MARKET_DATA_CACHE_SIZE:
+        _MARKET_DATA_CACHE.popitem(last=False)
+
+
+def warmup() -> int:
+    """空任务：API 启动时提交一次，让进程池提前拉起 worker（并完成模块导入）。"""
+    return os.getpid()
+
+
+class _CancelFlag:
+    """
+    Manager Event 的本地镜像，供引擎直接调用 is_set()。
+
+    Manager Event 的 is_set() 是一次跨进程往返，引擎在每个交易日 / 每只持仓
+    上都会检查，这里按 CANCEL_POLL_INTERVAL 节流；一旦观察到取消便不再回查。
+    """
+
+    __slots__ = ("_remote", "_set", "_last_polled")
+
+    def __init__(self, remote: Any) -> None:
+        self._remote = remote
+        self._set = False
+        self._last_polled = 0.0
+
+    def is_set(self) -> bool:
+        if self._set:
+            return True
+        now = time.monotonic()
+        if now - self._last_polled >= CANCEL_POLL_INTERVAL:
+            self._last_polled = now
+            self._set = self._remote.is_set()
+        return self._set
+
+
+def run_backtest(
+    job_id: str,
+    payload: Dict[str, Any],
+    buy_config: Dict[str, Any],
+    sell_strategy_config: Dict[str, Any],
+    data_dir: str,
+    buy_config_path: str,
+    events: Any,
+    cancel_event: Any,
+) -> Optional[Dict[str, Any]]:
+    """
+    在 worker 进程内运行一个回测任务。
+
+    Args:
+        events: Manager 队列，事件格式与 JobEventWriter 一致：
+            ("started", ts) / ("log", (job_id, ts, message)) / ("progress", pct)
+        cancel_event: Manager Event，API 进程 set() 后任务在下一次检查时退出
+
+    Returns:
+        None 表示任务被取消；否则为 {"results": ..., "metrics": ...}
+    """
+    events.put(("started", _now_iso()))
+
+    def log_callback(message: str) -> None:
+        events.put(("log", (job_id, _now_iso(), message)))
+
+    # 进度只给前端轮询看：整数百分比未变化且距上次发送不足
+    # PROGRESS_MIN_INTERVAL 秒时直接跳过，最后一根 bar 总是发送
+    last_sent_pct = -1
+    last_sent_ts = 0.0
+
+    def progress_callback(done: int, total: int, date: datetime) -> None:
+        nonlocal last_sent_pct, last_sent_ts
+        progress = 0.0 if total == 0 else (done / total) * 100.0
+        pct = int(progress)
+        now = time.monotonic()
+        if (
+            done < total
+            and pct == last_sent_pct
+            and now - last_sent_ts < PROGRESS_MIN_INTERVAL
+        ):
+            return
+        last_sent_pct = pct
+        last_sent_ts = now
+        events.put(("progress", round(progress, 2)))
+
+    stock_pool = payload.get("stock_pool", {"type": "all"})
+    stock_codes = None
+    if stock_pool.get("type") == "list":
+        stock_codes = stock_pool.get("codes", [])
+
+    engine = BacktestEngine(
+        data_dir=data_dir,
+        buy_config_path=buy_config_path,
+        sell_strategy_config=sell_strategy_config,
+        start_date=payload.get("start_date"),
+        end_date=payload.get("end_date"),
+        initial_capital=float(payload.get("initial_capital", 1000000)),
+        max_positions=int(payload.get("max_positions", 10)),
+        position_sizing=payload.get("position_sizing", "equal_weight"),
+        commission_rate=float(payload.get("commission_rate", 0.0003)),
+        stamp_tax_rate=float(payload.get("stamp_tax_rate", 0.001)),
+        slippage_rate=float(payload.get("slippage_rate", 0.001)),
+        buy_config=buy_config,
+        log_callback=log_callback,
+        # ── Score 百分位过滤 ──────────────────────────────────────
+        score_filter_enabled=bool(payload.get("score_filter_enabled", False)),
+        score_percentile_threshold=float(payload.get("score_percentile_threshold", 60.0)),
+        score_min_history=int(payload.get("score_min_history", 20)),
+        score_warmup_lookback_days=int(payload.get("score_warmup_lookback_days", 20)),
+        # ── 换仓 (Rotation) ───────────────────────────────────────
+        rotation_enabled=bool(payload.get("rotation_enabled", False)),
+        rotation_min_stop_threshold=float(payload.get("rotation_min_loss", 0.05)),
+        rotation_max_per_day=int(payload.get("rotation_max_per_day", 2)),
+        rotation_score_ratio=float(payload.get("rotation_score_ratio", 1.2)),
+        rotation_min_score_improvement=float(payload.get("rotation_min_score_improvement", 10.0)),
+        rotation_no_score_policy=str(payload.get("rotation_no_score_policy", "skip")),
+        # ── 选股器并发 ────────────────────────────────────────────
+        selector_threads=int(payload.get("selector_threads", 0)),
+        price_dtype=str(payload.get("price_dtype", "float64")),
+        # 日志经 log_callback 实时推送，不需要在引擎内再保留一份
+        capture_logs=False,
+    )
+
+    _load_market_data(engine, stock_codes, int(payload.get("lookback_days", 200)))
+    if len(engine.market_data) == 0:
+        raise ValueError("No market data loaded.")
+
+    engine.load_buy_selectors()
+    if len(engine.buy_selectors) == 0:
+        raise ValueError("No active buy selectors.")
+
+    engine.load_sell_strategy()
+    engine.run(progress_callback=progress_callback, cancel_event=_CancelFlag(cancel_event))
+
+    if cancel_event.is_set():
+        return None
+
+    # 直接取 DataFrame，不再 records -> DataFrame 来回转换
+    results = engine.get_results(format="dataframe")
+    equity_df = results.pop("equity_curve")
+    trades_df = results["trades"]
+
+    # Get benchmark name from payload (optional)
+    benchmark_name = payload.get("benchmark_name")
+
+    analysis = PerformanceAnalyzer(
+        equity_curve=equity_df,
+        trades=trades_df,
+        initial_capital=float(payload.get("initial_capital", 1000000)),
+        benchmark_name=benchmark_name if benchmark_name and benchmark_name != "none" else None,
+        benchmark_data_dir=Path(data_dir) / "index",
+    ).analyze()
+
+    score = compute_strategy_score(analysis)
+
+    best_trade, best_stock = find_best_trade_and_stock(trades_df)
+
+    # 净值曲线按列存储（列名 -> 值列表）：比逐日 dict 列表体积小、编解码快，
+    # 读取端可直接 pd.DataFrame(columns) 还原
+    results["equity_curve_columns"] = equity_df.to_dict("list")
+    results["trades"] = trades_df.to_dict("records")
+    results["analysis"] = analysis
+    results["strategy_score"] = score
+    results["best_trade"] = best_trade
+    results["best_stock"] = best_stock
+
+    metrics = {
+        "total_return_pct": analysis.get("returns", {}).get("total_return_pct", 0),
+        "max_drawdown_pct": analysis.get("drawdown", {}).get("max_drawdown_pct", 0),
+        "win_rate_pct": analysis.get("trade_stats", {}).get("win_rate_pct", 0),
+        "sharpe_ratio": analysis.get("risk_adjusted", {}).get("sharpe_ratio", 0),
+        "final_value": analysis.get("returns", {}).get("final_value", 0),
+        "score": score.get("score", 0),
+    }
+
+    return {"results": results, "metrics": metrics}
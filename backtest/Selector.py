@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 
 from scipy.signal import find_peaks
 import numpy as np
@@ -50,7 +50,8 @@ def _find_peaks(
         **kwargs,
     )
 
-    peaks_df = df.iloc[indices].copy()
+    # take() 本身返回新对象且不带 SettingWithCopy 标记，下面加列无需再 copy()
+    peaks_df = df.take(indices)
     peaks_df["is_peak"] = True
 
     # Flatten SciPy arrays into columns (only those with same length as indices)
@@ -61,6 +62,99 @@ def _find_peaks(
     return peaks_df
 
 
+def _latest_snapshot(
+    date: pd.Timestamp,
+    data: Dict[str, pd.DataFrame],
+    min_len: int = 1,
+    with_prev_close: bool = False,
+) -> Tuple[pd.DataFrame, Dict[str, Tuple[pd.DataFrame, int]]]:
+    """
+    各股票截至 date 的最新一行拼成大表（index 为股票代码），供向量化预筛。
+
+    只记录每只股票的 (df, 截止行数)，历史窗口由 _tail() 在通过预筛后才切，
+    不为全部股票逐只切片 / 拷贝。截至 date 的行数不足 min_len 的股票跳过。
+    with_prev_close=True 时附加前一日收盘价列 _prev_close。
+    引擎传入的 DaySlices 自带各股票截至 date 的行数（frames_with_ends），
+    此时只遍历截至当日有数据的股票，且无需逐只 searchsorted。
+    DaySlices 还带有当日 memo：全市场快照每天只拼一次，各选股器在其上
+    按 min_len / with_prev_close 派生，不再各自逐只构造 N 行 Series。
+    返回的 latest_df 可能被同日其他选股器共用，只读。
+    """
+    memo = getattr(data, "memo", None)
+    if memo is None:
+        latest_df, code_to_end, _ = _build_snapshot(date, data, min_len, with_prev_close)
+        return latest_df, code_to_end
+
+    base = memo.get("latest_snapshot")
+    if base is None:
+        base = memo["latest_snapshot"] = _build_snapshot(date, data, 1, False)
+    latest_df, code_to_end, ends = base
+    if latest_df.empty:
+        return latest_df, code_to_end
+
+    if min_len > 1:
+        keep = ends >= min_len
+        if not keep.all():
+            latest_df = latest_df[keep]
+    if with_prev_close:
+        prev_closes = []
+        for code in latest_df.index:
+            df, end = code_to_end[code]
+            prev_closes.append(df["close"].iat[end - 2])
+        latest_df = latest_df.assign(_prev_close=prev_closes)
+    return latest_df, code_to_end
+
+
+def _build_snapshot(
+    date: pd.Timestamp,
+    data: Dict[str, pd.DataFrame],
+    min_len: int,
+    with_prev_close: bool,
+) -> Tuple[pd.DataFrame, Dict[str, Tuple[pd.DataFrame, int]], np.ndarray]:
+    """_latest_snapshot 的实际构造；另返回与 latest_df 行对齐的截止行数数组。"""
+    codes: List[str] = []
+    rows: List[pd.Series] = []
+    prev_closes: List[float] = []
+    code_to_end: Dict[str, Tuple[pd.DataFrame, int]] = {}
+    ends: List[int] = []
+
+    frames_with_ends = getattr(data, "frames_with_ends", None)
+    if frames_with_ends is not None:
+        items = frames_with_ends()
+    else:
+        items = ((code, df, None) for code, df in data.items())
+
+    for code, df, end in items:
+        if df is None:
+            continue
+        if end is None:
+            # searchsorted 是 O(log n)，比 df[df["date"]<=date] 的 O(n) 快
+            end = int(df["date"].searchsorted(date, side="right"))
+        if end == 0 or end < min_len:
+            continue
+        codes.append(code)
+        rows.append(df.iloc[end - 1])
+        if with_prev_close:
+            prev_closes.append(df["close"].iat[end - 2])
+        code_to_end[code] = (df, end)
+        ends.append(end)
+
+    if not rows:
+        return pd.DataFrame(), code_to_end, np.empty(0, dtype=np.intp)
+
+    # 纵向堆叠 → shape (n_stocks, n_cols)，每行是一只股票的当日数据
+    latest_df = pd.DataFrame(rows)
+    latest_df.index = pd.Index(codes, name="_code")
+    if with_prev_close:
+        latest_df["_prev_close"] = prev_closes
+    return latest_df, code_to_end, np.asarray(ends, dtype=np.intp)
+
+
+def _tail(df: pd.DataFrame, end: int, n: int) -> pd.DataFrame:
+    """df.iloc[:end].tail(n) 的视图。"""
+    return df.iloc[max(0, end - n):end]
+
+
 
 # --------------------------- Selector 类 --------------------------- #
 
@@ -152,29 +246,11 @@ class BBIKDJSelector:
 
         # ── 第一步：为所有股票找到截止 date 的最新一行，拼成大表 ──────────
         # 每只股票取当日（≤ date）最新一行，连同 code 记录下来
-        # 同时把截断+tail后的 hist 暂存，供通过预筛的股票直接复用，避免重复切片
-        latest_rows: List[pd.Series] = []
-        code_to_hist: Dict[str, pd.DataFrame] = {}
-
-        for code, df in data.items():
-            # searchsorted 是 O(log n)，比 df[df["date"]<=date] 的 O(n) 快
-            _idx = int(df["date"].searchsorted(date, side="right"))
-            if _idx == 0:
-                continue
-            hist = df.iloc[:_idx].tail(self.max_window + 20)
-            if hist.empty:
-                continue
-            row = hist.iloc[-1].copy()
-            row["_code"] = code
-            latest_rows.append(row)
-            code_to_hist[code] = hist  # 暂存，只在通过预筛后才用
-
-        if not latest_rows:
+        # 只记录截止行数，hist 在通过预筛后才切片
+        latest_df, code_to_end = _latest_snapshot(date, data)
+        if latest_df.empty:
             return []
 
-        # 纵向堆叠 → shape (n_stocks, n_cols)，每行是一只股票的当日数据
-        latest_df = pd.DataFrame(latest_rows).set_index("_code")
-
         # ── 第二步：三条件向量化预筛（全列操作，无 Python 循环）─────────
         # pandas 对整列做比较，底层是 numpy C 代码
         # 5000 只股票和 1 只股票的耗时几乎相同
@@ -195,7 +271,7 @@ class BBIKDJSelector:
 
         t2 = time.time()
         for code in candidates:
-            if self._passes_filters(code_to_hist[code]):
+            if self._passes_filters(_tail(*code_to_end[code], self.max_window + 20)):
                 picks.append(code)
         t3 = time.time()
         #print(f"精细过滤耗时: {t3 - t2:.2f}s，候选股票数量: {len(candidates)}")
@@ -317,29 +393,10 @@ class SuperB1Selector:
         min_len = self.lookback_n + self._extra_for_bbi
 
         # ── 第一步：切片并暂存 hist ──────────────────────────────────
-        latest_rows: List[pd.Series] = []
-        code_to_hist: Dict[str, pd.DataFrame] = {}
-
-        for code, df in data.items():
-            _idx = int(df["date"].searchsorted(date, side="right"))
-            if _idx < 2:
-                continue
-            hist = df.iloc[:_idx].tail(min_len)
-            if len(hist) < min_len:
-                continue
-            row = hist.iloc[-1].copy()
-            row["_code"] = code
-            # 预算跌幅，避免向量化时需要 shift
-            prev_close = hist.iloc[-2]["close"]
-            row["_prev_close"] = prev_close
-            latest_rows.append(row)
-            code_to_hist[code] = hist
-
-        if not latest_rows:
+        latest_df, code_to_end = _latest_snapshot(date, data, min_len=max(2, min_len), with_prev_close=True)
+        if latest_df.empty:
             return []
 
-        latest_df = pd.DataFrame(latest_rows).set_index("_code")
-
         # ── 第二步：向量化预筛（4 条件，把候选从 5000 降到几十）────────
         # 条件 1：当日约束
         mask = latest_df["day_constraints_pass"] == 1
@@ -356,7 +413,7 @@ class SuperB1Selector:
         # ── 第三步：精细过滤（只对少量候选跑完整逻辑）──────────────────
         picks: List[str] = []
         for code in candidates:
-            if self._passes_filters(code_to_hist[code]):
+            if self._passes_filters(_tail(*code_to_end[code], min_len)):
                 picks.append(code)
         return picks
         
@@ -392,12 +449,25 @@ class PeakKDJSelector:
         if hist.iloc[-1]['day_constraints_pass'] == 0:
             return False
 
-        hist = hist.copy().sort_values("date")
-        hist["oc_max"] = hist[["open", "close"]].max(axis=1)
+        # 引擎传入的历史已按日期升序，只有乱序时才排序（sort_values 会复制整段历史）
+        if not hist["date"].is_monotonic_increasing:
+            hist = hist.sort_values("date")
+
+        # 峰值检测只用到 date / close / oc_max：建三列窄表，不复制也不改写 hist
+        # （hist 是与行情共享内存的只读视图）；fmax 与 max(axis=1) 一样跳过 NaN
+        close_arr = hist["close"].to_numpy()
+        peak_src = pd.DataFrame(
+            {
+                "date": hist["date"].to_numpy(),
+                "close": close_arr,
+                "oc_max": np.fmax(hist["open"].to_numpy(), close_arr),
+            },
+            index=hist.index,
+        )
 
         # 1. 提取 peaks（需要实时计算）
         peaks_df = _find_peaks(
-            hist,
+            peak_src,
             column="oc_max",
             distance=6,
             prominence=0.5,
@@ -463,26 +533,10 @@ class PeakKDJSelector:
 
     def select(self, date: pd.Timestamp, data: Dict[str, pd.DataFrame]) -> List[str]:
         # ── 第一步：切片并暂存 hist ──────────────────────────────────
-        latest_rows: List[pd.Series] = []
-        code_to_hist: Dict[str, pd.DataFrame] = {}
-
-        for code, df in data.items():
-            _idx = int(df["date"].searchsorted(date, side="right"))
-            if _idx == 0:
-                continue
-            hist = df.iloc[:_idx].tail(self.max_window + 20)
-            if hist.empty:
-                continue
-            row = hist.iloc[-1].copy()
-            row["_code"] = code
-            latest_rows.append(row)
-            code_to_hist[code] = hist
-
-        if not latest_rows:
+        latest_df, code_to_end = _latest_snapshot(date, data)
+        if latest_df.empty:
             return []
 
-        latest_df = pd.DataFrame(latest_rows).set_index("_code")
-
         # ── 第二步：向量化预筛 ───────────────────────────────────────
         # 当日约束 + 知行约束（收盘 > 长期 且 短期 > 长期）
         mask = latest_df["day_constraints_pass"] == 1
@@ -494,7 +548,7 @@ class PeakKDJSelector:
         # ── 第三步：精细过滤 ─────────────────────────────────────────
         picks: List[str] = []
         for code in candidates:
-            if self._passes_filters(code_to_hist[code]):
+            if self._passes_filters(_tail(*code_to_end[code], self.max_window + 20)):
                 picks.append(code)
         return picks
 
@@ -548,33 +602,32 @@ class BBIShortLongSelector:
         import warnings
         rsv_short_col = f'rsv_{self.n_short}'
         rsv_long_col  = f'rsv_{self.n_long}'
-        hist = hist.copy()
+        # RSV 序列作为局部变量持有，不往只读的 hist 视图里写列，也就不必整段复制
         if rsv_short_col in hist.columns:
-            hist["RSV_short"] = hist[rsv_short_col]
+            rsv_short = hist[rsv_short_col]
         else:
             warnings.warn(
                 f"预计算数据库缺少列 '{rsv_short_col}'，已回退到实时计算。"
                 f"建议在 precompute_indicators.py 中添加 n={self.n_short} 的 RSV 计算。",
                 UserWarning, stacklevel=2,
             )
-            hist["RSV_short"] = compute_rsv(hist, self.n_short)
+            rsv_short = compute_rsv(hist, self.n_short)
         if rsv_long_col in hist.columns:
-            hist["RSV_long"] = hist[rsv_long_col]
+            rsv_long = hist[rsv_long_col]
         else:
             warnings.warn(
                 f"预计算数据库缺少列 '{rsv_long_col}'，已回退到实时计算。"
                 f"建议在 precompute_indicators.py 中添加 n={self.n_long} 的 RSV 计算。",
                 UserWarning, stacklevel=2,
             )
-            hist["RSV_long"] = compute_rsv(hist, self.n_long)
+            rsv_long = compute_rsv(hist, self.n_long)
 
         if len(hist) < self.m:
             return False
 
-        win = hist.iloc[-self.m :]
-        long_ok = (win["RSV_long"] >= self.upper_rsv_threshold).all()
+        long_ok = (rsv_long.iloc[-self.m :] >= self.upper_rsv_threshold).all()
 
-        short_series = win["RSV_short"]
+        short_series = rsv_short.iloc[-self.m :]
 
         # 短期 RSV 模式检测
         mask_upper = short_series >= self.upper_rsv_threshold
@@ -610,26 +663,10 @@ class BBIShortLongSelector:
         )
 
         # ── 第一步：切片并暂存 hist ──────────────────────────────────
-        latest_rows: List[pd.Series] = []
-        code_to_hist: Dict[str, pd.DataFrame] = {}
-
-        for code, df in data.items():
-            _idx = int(df["date"].searchsorted(date, side="right"))
-            if _idx == 0:
-                continue
-            hist = df.iloc[:_idx].tail(need_len)
-            if hist.empty:
-                continue
-            row = hist.iloc[-1].copy()
-            row["_code"] = code
-            latest_rows.append(row)
-            code_to_hist[code] = hist
-
-        if not latest_rows:
+        latest_df, code_to_end = _latest_snapshot(date, data)
+        if latest_df.empty:
             return []
 
-        latest_df = pd.DataFrame(latest_rows).set_index("_code")
-
         # ── 第二步：向量化预筛 ───────────────────────────────────────
         # 当日约束 + DIF > 0 + 知行约束（收盘 > 长期 且 短期 > 长期）
         mask = latest_df["day_constraints_pass"] == 1
@@ -642,7 +679,7 @@ class BBIShortLongSelector:
         # ── 第三步：精细过滤 ─────────────────────────────────────────
         picks: List[str] = []
         for code in candidates:
-            if self._passes_filters(code_to_hist[code]):
+            if self._passes_filters(_tail(*code_to_end[code], need_len)):
                 picks.append(code)
         return picks
 
@@ -698,7 +735,9 @@ class MA60CrossVolumeWaveSelector:
         if hist.empty:
             return False
 
-        hist = hist.copy().sort_values("date")
+        # [优化] 只读使用：已按日期升序时不排序、不复制
+        if not hist["date"].is_monotonic_increasing:
+            hist = hist.sort_values("date")
         min_len = max(60 + self.lookback_n + self.ma60_slope_days, self.max_window + 5)
         if len(hist) < min_len:
             return False
@@ -767,26 +806,10 @@ class MA60CrossVolumeWaveSelector:
         need_len = max(60 + self.lookback_n + self.ma60_slope_days, self.max_window + 20)
 
         # ── 第一步：切片并暂存 hist ──────────────────────────────────
-        latest_rows: List[pd.Series] = []
-        code_to_hist: Dict[str, pd.DataFrame] = {}
-
-        for code, df in data.items():
-            _idx = int(df["date"].searchsorted(date, side="right"))
-            if _idx == 0:
-                continue
-            hist = df.iloc[:_idx].tail(need_len)
-            if len(hist) < need_len:
-                continue
-            row = hist.iloc[-1].copy()
-            row["_code"] = code
-            latest_rows.append(row)
-            code_to_hist[code] = hist
-
-        if not latest_rows:
+        latest_df, code_to_end = _latest_snapshot(date, data, min_len=need_len)
+        if latest_df.empty:
             return []
 
-        latest_df = pd.DataFrame(latest_rows).set_index("_code")
-
         # ── 第二步：向量化预筛 ───────────────────────────────────────
         # 当日约束 + 当日收盘 >= MA60 + 知行约束（收盘 > 长期 且 短期 > 长期）
         mask = latest_df["day_constraints_pass"] == 1
@@ -799,7 +822,7 @@ class MA60CrossVolumeWaveSelector:
         # ── 第三步：精细过滤 ─────────────────────────────────────────
         picks: List[str] = []
         for code in candidates:
-            if self._passes_filters(code_to_hist[code]):
+            if self._passes_filters(_tail(*code_to_end[code], need_len)):
                 picks.append(code)
         return picks
 
@@ -854,7 +877,9 @@ class BigBullishVolumeSelector:
         if hist is None or hist.empty:
             return False
 
-        hist = hist.sort_values("date").copy()
+        # [优化] 只读使用：已按日期升序时不排序、不复制
+        if not hist["date"].is_monotonic_increasing:
+            hist = hist.sort_values("date")
 
         if len(hist) < self.min_history:
             return False
@@ -928,28 +953,10 @@ class BigBullishVolumeSelector:
         need_len = max(self.min_history, self.vol_lookback_n + 2)
 
         # ── 第一步：切片并暂存 hist ──────────────────────────────────
-        latest_rows: List[pd.Series] = []
-        code_to_hist: Dict[str, pd.DataFrame] = {}
-
-        for code, df in data.items():
-            if df is None or df.empty:
-                continue
-            _idx = int(df["date"].searchsorted(date, side="right"))
-            if _idx == 0:
-                continue
-            hist = df.iloc[:_idx].tail(need_len)
-            if len(hist) < need_len:
-                continue
-            row = hist.iloc[-1].copy()
-            row["_code"] = code
-            latest_rows.append(row)
-            code_to_hist[code] = hist
-
-        if not latest_rows:
+        latest_df, code_to_end = _latest_snapshot(date, data, min_len=need_len)
+        if latest_df.empty:
             return []
 
-        latest_df = pd.DataFrame(latest_rows).set_index("_code")
-
         # ── 第二步：向量化预筛 ───────────────────────────────────────
         mask = pd.Series(True, index=latest_df.index)
 
@@ -970,6 +977,6 @@ class BigBullishVolumeSelector:
         # ── 第三步：精细过滤 ─────────────────────────────────────────
         picks: List[str] = []
         for code in candidates:
-            if self._passes_filters(code_to_hist[code]):
+            if self._passes_filters(_tail(*code_to_end[code], need_len)):
                 picks.append(code)
         return picks
\ No newline at end of file
@@ -2,15 +2,29 @@
 Core data structures for backtesting system.
 
 Defines Position, Order, Trade, and BuySignal classes.
+
+All four are slotted dataclasses (no per-instance __dict__): they are created
+per signal / order / fill in the hot loop, so attribute access and memory
+matter. Add new state as declared fields rather than ad-hoc attributes.
 """
 
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from enum import Enum
 import numpy as np
 
 
+# Position 持仓以来极值字段，update_price_stats_batch 的 (n, 5) 数组按此列序
+EXTREME_FIELDS = (
+    'highest_price_since_entry',
+    'highest_close_since_entry',
+    'lowest_close_since_entry',
+    'highest_high_since_entry',
+    'lowest_low_since_entry',
+)
+
+
 class OrderAction(Enum):
     """Order action type."""
     BUY = "BUY"
@@ -25,7 +39,7 @@ class OrderStatus(Enum):
     CANCELLED = "CANCELLED"
 
 
-@dataclass
+@dataclass(slots=True)
 class Position:
     """
     Represents a stock position.
@@ -88,6 +102,58 @@ class Position:
         """Increment holding period counter."""
         self.days_held += 1
 
+    @staticmethod
+    def update_price_stats_batch(
+        positions: List["Position"],
+        date: datetime,
+        close: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        current: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Vectorized update_price_stats over several positions at once.
+
+        当前极值一次性收集成 (n, 5) 数组，用 numpy 比较出需要刷新的字段，
+        只回写真正创下新高 / 新低的持仓，避免逐持仓的分支判断。
+        调用方若传入自己维护的 current（列序同 EXTREME_FIELDS），则不再从属性收集，
+        并在原地刷新为新的极值，供下一个 bar 继续使用。
+        """
+        if not positions:
+            return
+
+        if current is None:
+            current = Position.collect_extremes(positions)
+
+        for i in np.flatnonzero(close > current[:, 0]):
+            positions[i].highest_price_since_entry = float(close[i])
+        for i in np.flatnonzero(close > current[:, 1]):
+            positions[i].highest_close_since_entry = float(close[i])
+            positions[i].highest_close_date = date
+        for i in np.flatnonzero(close < current[:, 2]):
+            positions[i].lowest_close_since_entry = float(close[i])
+            positions[i].lowest_close_date = date
+        for i in np.flatnonzero(high > current[:, 3]):
+            positions[i].highest_high_since_entry = float(high[i])
+            positions[i].highest_high_date = date
+        for i in np.flatnonzero(low < current[:, 4]):
+            positions[i].lowest_low_since_entry = float(low[i])
+            positions[i].lowest_low_date = date
+
+        np.maximum(current[:, 0], close, out=current[:, 0])
+        np.maximum(current[:, 1], close, out=current[:, 1])
+        np.minimum(current[:, 2], close, out=current[:, 2])
+        np.maximum(current[:, 3], high, out=current[:, 3])
+        np.minimum(current[:, 4], low, out=current[:, 4])
+
+    @staticmethod
+    def collect_extremes(positions: List["Position"]) -> np.ndarray:
+        """持仓以来的极值收集成 (n, 5) 数组，列序同 EXTREME_FIELDS。"""
+        return np.array(
+            [tuple(getattr(p, name) for name in EXTREME_FIELDS) for p in positions],
+            dtype=float,
+        ).reshape(len(positions), len(EXTREME_FIELDS))
+
     @property
     def initial_value(self) -> float:
         """Initial position value (Principal) at entry price."""
@@ -106,7 +172,7 @@ class Position:
         return (self.shares * current_price - self.cost_basis) / self.cost_basis
 
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     """
     Represents a pending order for T+1 execution.
@@ -131,6 +197,7 @@ class Order:
     # Context
     reason: Optional[str] = None  # For sells: exit reason
     buy_strategy: Optional[str] = None  # For buys: which selector triggered
+    signal_score: float = 0.0  # For buys: BuySignal.score, becomes the position's entry_score
 
     def execute(
         self,
@@ -176,7 +243,7 @@ class Order:
         self.status = OrderStatus.CANCELLED
 
 
-@dataclass
+@dataclass(slots=True)
 class BuySignal:
     """
     Represents a buy signal from a selector.
@@ -255,7 +322,7 @@ class BuySignal:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Trade:
     """
     Represents a completed trade (buy + sell).
@@ -296,21 +363,61 @@ class Trade:
         self.net_pnl = self.exit_proceeds - self.entry_cost
         self.net_pnl_pct = self.net_pnl / self.entry_cost
 
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for reporting."""
-        return {
-            'code': self.code,
-            'entry_date': self.entry_date.strftime('%Y-%m-%d'),
-            'entry_price': round(self.entry_price, 2),
-            'exit_date': self.exit_date.strftime('%Y-%m-%d'),
-            'exit_price': round(self.exit_price, 2),
-            'shares': self.shares,
-            'holding_days': self.holding_days,
-            'gross_pnl': round(self.gross_pnl, 2),
-            'gross_pnl_pct': round(self.gross_pnl_pct * 100, 2),
-            'net_pnl': round(self.net_pnl, 2),
-            'net_pnl_pct': round(self.net_pnl_pct * 100, 2),
-            'max_unrealized_pnl_pct': round(self.max_unrealized_pnl_pct * 100, 2),
-            'exit_reason': self.exit_reason,
-            'buy_strategy': self.buy_strategy or 'Unknown'
-        }
\ No newline at end of file
+    @classmethod
+    def from_arrays(
+        cls,
+        codes: List[str],
+        entry_dates: List[datetime],
+        entry_prices: List[float],
+        shares: List[int],
+        entry_costs: List[float],
+        exit_dates: List[datetime],
+        exit_prices: List[float],
+        exit_proceeds: List[float],
+        buy_strategies: List[Optional[str]],
+        exit_reasons: List[str],
+        holding_days: List[int],
+        max_unrealized_pnl_pcts: List[float],
+    ) -> List["Trade"]:
+        """
+        Build a batch of trades from parallel columns.
+
+        P&L 四个派生字段用 numpy 一次算完，实例通过 object.__new__ 直接填充，
+        跳过逐笔 __post_init__；结果与逐个 Trade(...) 构造完全一致。
+        """
+        n = len(codes)
+        if n == 0:
+            return []
+
+        entry_price_arr = np.asarray(entry_prices, dtype=float)
+        exit_price_arr = np.asarray(exit_prices, dtype=float)
+        entry_cost_arr = np.asarray(entry_costs, dtype=float)
+        price_diff = exit_price_arr - entry_price_arr
+        net_pnl_arr = np.asarray(exit_proceeds, dtype=float) - entry_cost_arr
+
+        gross_pnl = (np.asarray(shares, dtype=float) * price_diff).tolist()
+        gross_pnl_pct = (price_diff / entry_price_arr).tolist()
+        net_pnl = net_pnl_arr.tolist()
+        net_pnl_pct = (net_pnl_arr / entry_cost_arr).tolist()
+
+        trades: List[Trade] = []
+        for i in range(n):
+            trade = object.__new__(cls)
+            trade.code = codes[i]
+            trade.entry_date = entry_dates[i]
+            trade.entry_price = entry_prices[i]
+            trade.shares = shares[i]
+            trade.entry_cost = entry_costs[i]
+            trade.exit_date = exit_dates[i]
+            trade.exit_price = exit_prices[i]
+            trade.exit_proceeds = exit_proceeds[i]
+            trade.buy_strategy = buy_strategies[i]
+            trade.exit_reason = exit_reasons[i]
+            trade.gross_pnl = gross_pnl[i]
+            trade.gross_pnl_pct = gross_pnl_pct[i]
+            trade.net_pnl = net_pnl[i]
+            trade.net_pnl_pct = net_pnl_pct[i]
+            trade.holding_days = holding_days[i]
+            trade.max_unrealized_pnl_pct = max_unrealized_pnl_pcts[i]
+            trades.append(trade)
+        return trades
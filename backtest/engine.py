@@ -15,16 +15,34 @@ Performance optimizations (vs original):
         替代原来的 df[df['date'] <= date] 全量布尔扫描 (O(N))。
   P1-2  check_sell_signals 并行化：对持仓使用 ThreadPoolExecutor 并行检查卖出信号，
         持仓间相互独立，pandas/numpy 运算在 C 层释放 GIL。
+  P1-3  OHLCV 面板：load_data() 结束时把所有股票的 OHLCV 对齐到交易日历，
+        按字段分列存为 (n_dates, 5, n_codes) 的连续 ndarray；每日行情快照只是面板的一行视图，
+        不再为每只股票构造 pd.Series。
+  P1-4  CSV 解析缓存：每个 CSV 解析（含日期转换、排序）后的 DataFrame 以 pickle
+        存入 data_dir/.csv_cache/，按源文件 mtime/size 校验，重复回测跳过 read_csv。
+  P1-5  选股按日期并行预计算：选股器只依赖 (date, 截至 date 的历史)，
+        precompute_signals() 在 fork 出的子进程中按交易日并行跑完全部选股，
+        主循环只剩组合逻辑与组合账户状态机。
 """
 
+import copy
 import math
+import multiprocessing
 import os
+import sys
+import threading
 import json
+import pickle
 import importlib
 import time as _time
+from collections import OrderedDict, deque
+from collections.abc import Mapping, MutableSequence
 from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
+from itertools import chain
+from operator import attrgetter
+from typing import Deque, Dict, Iterable, List, Optional, Any, Set, Tuple
 from pathlib import Path
 import pandas as pd
 import numpy as np
@@ -32,6 +50,7 @@ import numpy as np
 from .data_structures import BuySignal
 from .portfolio import PortfolioManager
 from .execution import ExecutionEngine
+from .sell_strategies.base import PositionArrays
 
 
 # ══════════════════════════════════════════════════════════════════
@@ -101,10 +120,7 @@ def _selector_chunk_worker(args):
                 start_date=start_dt.strftime('%Y-%m-%d'),
                 end_date=end_dt.strftime('%Y-%m-%d'),
             )
-            data_chunk = {}
-            if not df_all.empty:
-                for code, group in df_all.groupby('code'):
-                    data_chunk[code] = group.sort_values('date').reset_index(drop=True)
+            data_chunk = _split_by_code(df_all) if not df_all.empty else {}
         except Exception:
             data_chunk = {}
     elif data_chunk is None:
@@ -123,6 +139,389 @@ def _selector_chunk_worker(args):
     return local_selector.select(date, data_chunk)
 
 
+# ══════════════════════════════════════════════════════════════════
+# [优化P1-5] 按交易日并行预计算选股结果
+# ══════════════════════════════════════════════════════════════════
+
+# fork 前由 precompute_signals() 设置；子进程借此共享父进程已加载的行情（写时复制）
+_precompute_engine = None
+
+
+def _precompute_init() -> None:
+    """子进程 initializer：丢弃从父进程继承的池与日志回调，只保留只读行情。"""
+    engine = _precompute_engine
+    engine._executor = None
+    engine._selector_pool = None
+    engine._selection_by_date = {}
+    engine.log = lambda _: None
+
+
+def _precompute_select_worker(date):
+    """
+    在子进程中对单个交易日运行全部选股器。
+
+    返回与 buy_selectors 顺序一致的 [(picked_codes, 错误信息, traceback, 耗时)]；
+    异常对象未必可 pickle，只回传其文本。
+    """
+    engine = _precompute_engine
+    data_up_to_date = engine._get_data_up_to_date(date)
+    return [
+        (picks, None if exc is None else str(exc), tb, elapsed)
+        for _, picks, exc, tb, elapsed in engine._run_selectors(date, data_up_to_date)
+    ]
+
+
+@dataclass(slots=True)
+class SelectorRef:
+    """已加载的买入选股器；select 为预绑定的 instance.select。"""
+    class_name: str
+    alias: str
+    instance: Any
+    params: Dict[str, Any]
+    select: Any
+    # 参数可 pickle、可在 worker 进程中按类名重建时为 True；否则始终在本进程内选股
+    process_safe: bool = True
+
+
+def _selector_params(instance: Any) -> Dict[str, Any]:
+    """worker 进程重建选股器所用的参数：实例的公开属性（不含 indicator_store）。"""
+    return {
+        k: v for k, v in vars(instance).items()
+        if not k.startswith('_') and k != 'indicator_store'
+    }
+
+
+def _is_picklable(obj: Any) -> bool:
+    try:
+        pickle.dumps(obj)
+    except Exception:
+        return False
+    return True
+
+
+# 信号排序 / 取最优的 key：C 实现的 attrgetter 比 lambda 少一层 Python 调用
+_BY_SCORE = attrgetter('score')
+
+
+def _best_per_code(signals: Iterable[BuySignal]) -> List[BuySignal]:
+    """
+    按股票代码去重，保留得分最高的信号（同分保留先出现的），
+    结果按各代码首次出现的顺序排列。单遍扫描，不先拼出中间列表。
+    """
+    best: Dict[str, BuySignal] = {}
+    for signal in signals:
+        kept = best.get(signal.code)
+        if kept is None or signal.score > kept.score:
+            best[signal.code] = signal
+    return list(best.values())
+
+
+# [优化P1-4] CSV 解析缓存目录（位于 data_dir 下，glob("*.csv") 不会扫到）
+CSV_CACHE_DIRNAME = ".csv_cache"
+
+# data_format -> 行情文件扩展名
+DATA_FILE_SUFFIXES = {"csv": ".csv", "feather": ".feather"}
+
+# run() 期间控制台日志缓冲的行数上限：攒满一次 write，而不是逐行 print
+CONSOLE_FLUSH_LINES = 1000
+
+# get_results(format=...) 支持的结果形态
+RESULT_FORMATS = ("records", "columnar", "dataframe")
+
+# 已解析的选股配置：{(绝对路径, mtime_ns): config}；参数扫描中反复创建引擎时免去重复 json.load。
+# 按最近使用淘汰，最多保留 BUY_CONFIG_CACHE_SIZE 份（配置文件改动会产生新 key）。
+BUY_CONFIG_CACHE_SIZE = 32
+_BUY_CONFIG_CACHE: "OrderedDict[Tuple[str, int], Dict[str, Any]]" = OrderedDict()
+_BUY_CONFIG_LOCK = threading.Lock()
+
+
+def _load_buy_config(path: Path) -> Dict[str, Any]:
+    """
+    读取选股配置；文件未改动（mtime 不变）时复用上次解析的结果。
+    返回的是深拷贝：调用方（如参数扫描改写 params）修改它不会污染缓存。
+    """
+    path = Path(path).resolve()
+    key = (str(path), path.stat().st_mtime_ns)
+    with _BUY_CONFIG_LOCK:
+        config = _BUY_CONFIG_CACHE.get(key)
+        if config is not None:
+            _BUY_CONFIG_CACHE.move_to_end(key)
+    if config is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        with _BUY_CONFIG_LOCK:
+            _BUY_CONFIG_CACHE[key] = config
+            while len(_BUY_CONFIG_CACHE) > BUY_CONFIG_CACHE_SIZE:
+                _BUY_CONFIG_CACHE.popitem(last=False)
+    return copy.deepcopy(config)
+
+
+# 逐股文件的读取线程数：读盘与 C 层解析（read_csv / pickle / Arrow）大多释放 GIL
+DATA_LOAD_THREADS = min(8, os.cpu_count() or 1)
+
+
+def _read_csv_arrow(csv_file: Path) -> Optional[pd.DataFrame]:
+    """
+    用 pyarrow.csv 解析行情 CSV：C++ 解析、释放 GIL，date 列直接解析为时间戳，
+    省去逐行的 pd.to_datetime。未安装 pyarrow 或解析失败时返回 None，由调用方退回 pd.read_csv。
+    价格列始终按 float64 解析，price_dtype 的转换留给 _cast_price_columns，
+    保证 float32 结果与“先 float64 再转换”逐位一致。
+    """
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pa_csv
+    except ImportError:
+        return None
+    try:
+        table = pa_csv.read_csv(
+            str(csv_file),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={'date': pa.timestamp('ns')},
+                timestamp_parsers=[pa_csv.ISO8601, '%Y/%m/%d', '%Y%m%d'],
+            ),
+        )
+    except pa.ArrowException:
+        return None
+    return table.to_pandas()
+
+
+def _split_by_code(df_all: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    把指标库返回的多股票表拆成 {code: 按日期升序的 DataFrame}。
+
+    code 列先转为 Categorical：每行只存一个整数编码，拆出的各股票 DataFrame 共用同一张
+    类别表，而不是每行各持有一个字符串对象。查询已按 (code, date) 排序时，分组边界是编码
+    变化的位置，一次比较整列求出，不必对字符串逐行哈希分组；日期已升序时也不再排序。
+    同一代码不连续时退回 groupby。
+    """
+    codes = pd.Categorical(df_all['code'])
+    df_all['code'] = codes
+    c = codes.codes
+    starts = np.flatnonzero(np.r_[True, c[1:] != c[:-1]])
+    if len(starts) != len(codes.categories):
+        groups = df_all.groupby('code', observed=True)
+    else:
+        ends = np.r_[starts[1:], len(c)]
+        groups = ((codes.categories[c[lo]], df_all.iloc[lo:hi]) for lo, hi in zip(starts, ends))
+
+    result: Dict[str, pd.DataFrame] = {}
+    for code, group in groups:
+        if not group['date'].is_monotonic_increasing:
+            group = group.sort_values('date')
+        result[code] = group.reset_index(drop=True)
+    return result
+
+
+# ══════════════════════════════════════════════════════════════════
+# [优化P1-3] 每日行情快照：OHLCV 面板的行视图
+# ══════════════════════════════════════════════════════════════════
+
+PANEL_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+_PANEL_FIELD_INDEX = {field: i for i, field in enumerate(PANEL_FIELDS)}
+
+
+class QuoteRow:
+    """单只股票当日的 OHLCV，支持 row['close'] / row.get('volume', 0)。
+
+    values 是面板当日 (n_fields, n_codes) 块中的一列（按 PANEL_FIELDS 顺序）。
+    """
+
+    __slots__ = ('_values',)
+
+    def __init__(self, values: np.ndarray):
+        self._values = values
+
+    def __getitem__(self, field: str):
+        return self._values[_PANEL_FIELD_INDEX[field]]
+
+    def get(self, field: str, default=None):
+        idx = _PANEL_FIELD_INDEX.get(field)
+        return default if idx is None else self._values[idx]
+
+    def __contains__(self, field) -> bool:
+        return field in _PANEL_FIELD_INDEX
+
+
+class QuoteField(Mapping):
+    """
+    当日某字段的 {股票代码: float} 只读视图，只含当日有数据的股票。
+
+    只在被查询时才读单个元素，不为全市场构造 dict；
+    供只按持仓 / 信号代码零星取价的调用方（如换仓）使用。
+    """
+
+    __slots__ = ('_values', '_present', '_codes', '_col')
+
+    def __init__(self, values: np.ndarray, present: np.ndarray,
+                 codes: List[str], col: Dict[str, int]):
+        self._values = values
+        self._present = present
+        self._codes = codes
+        self._col = col
+
+    def __getitem__(self, code: str) -> float:
+        j = self._col.get(code)
+        if j is None or not self._present[j]:
+            raise KeyError(code)
+        return float(self._values[j])
+
+    def __contains__(self, code) -> bool:
+        j = self._col.get(code)
+        return j is not None and bool(self._present[j])
+
+    def __iter__(self):
+        codes = self._codes
+        for j in np.flatnonzero(self._present):
+            yield codes[j]
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._present))
+
+
+class DailyQuotes(Mapping):
+    """
+    某个交易日的行情快照：{股票代码: QuoteRow}，只含当日有数据的股票。
+
+    底层直接引用面板的一行 (n_fields, n_codes)，构造开销与股票数无关；
+    每个字段在当日是一段连续数组，可用 column() / prices() 整列读取。
+    prev_closes 为各股票自身上一行的收盘价（停牌跨越时即停牌前最后收盘），供 T+1 撮合判断涨跌停。
+    """
+
+    __slots__ = ('_values', '_present', '_codes', '_col', '_prev_close')
+
+    def __init__(self, values: np.ndarray, present: np.ndarray,
+                 codes: List[str], col: Dict[str, int],
+                 prev_closes: Optional[np.ndarray] = None):
+        self._values = values
+        self._present = present
+        self._codes = codes
+        self._col = col
+        self._prev_close = prev_closes
+
+    def __getitem__(self, code: str) -> QuoteRow:
+        j = self._col.get(code)
+        if j is None or not self._present[j]:
+            raise KeyError(code)
+        return QuoteRow(self._values[:, j])
+
+    def column(self, field: str) -> np.ndarray:
+        """当日某字段的整列 (n_codes,)，与面板股票顺序一致，无数据处为 NaN。"""
+        return self._values[_PANEL_FIELD_INDEX[field]]
+
+    def take(self, codes: List[str], fields: Tuple[str, ...]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        一次 fancy-index 取出若干股票的若干字段。
+
+        Returns:
+            (present, values)：present[i] 表示 codes[i] 当日有数据；
+            values 形状为 (len(fields), len(codes))，present 为 False 处的值无意义
+        """
+        cols = np.fromiter((self._col.get(c, -1) for c in codes), dtype=np.intp, count=len(codes))
+        known = cols >= 0
+        cols[~known] = 0
+        present = known & self._present[cols]
+        rows = [_PANEL_FIELD_INDEX[field] for field in fields]
+        return present, self._values[np.ix_(rows, cols)]
+
+    def prev_close(self, code: str) -> float:
+        """code 上一行的收盘价；当日无数据、没有更早的行或未提供 prev_closes 时为 NaN。"""
+        j = self._col.get(code)
+        if j is None or self._prev_close is None or not self._present[j]:
+            return float('nan')
+        return float(self._prev_close[j])
+
+    def prices(self, field: str = 'close') -> Dict[str, float]:
+        """{股票代码: 当日 field 值}，只含当日有数据的股票；整列一次取出，不逐只构造 QuoteRow。"""
+        cols = np.flatnonzero(self._present)
+        codes = self._codes
+        return dict(zip([codes[j] for j in cols], self.column(field)[cols].tolist()))
+
+    def price_view(self, field: str = 'close') -> QuoteField:
+        """prices() 的惰性版本：按代码取值时才读数组，不构造全市场 dict。"""
+        return QuoteField(self.column(field), self._present, self._codes, self._col)
+
+    def __contains__(self, code) -> bool:
+        j = self._col.get(code)
+        return j is not None and bool(self._present[j])
+
+    def __iter__(self):
+        codes = self._codes
+        for j in np.flatnonzero(self._present):
+            yield codes[j]
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._present))
+
+
+class DaySlices(Mapping):
+    """
+    某个交易日的历史切片：{股票代码: 截至当日（含）的 DataFrame 视图}。
+
+    切片终点来自 _build_panel 预算好的 _panel_end 行；视图在首次访问时才构造并缓存，
+    当天只被访问的股票（持仓、信号）不必为全市场逐只切片。
+    视图与 market_data 共享内存，选股器 / 卖出策略只能读取，不得原地修改。
+    memo 供选股器缓存由当日切片派生的只读结果（如全市场最新行快照），
+    同一天的多个选股器共用，次日随新的 DaySlices 自然失效。
+    """
+
+    __slots__ = ('_frames', '_ends', '_codes', '_col', '_views', 'memo')
+
+    def __init__(self, frames: List[pd.DataFrame], ends: np.ndarray,
+                 codes: List[str], col: Dict[str, int]):
+        self._frames = frames
+        self._ends = ends
+        self._codes = codes
+        self._col = col
+        self._views: Dict[str, pd.DataFrame] = {}
+        self.memo: Dict[Any, Any] = {}
+
+    def __getitem__(self, code: str) -> pd.DataFrame:
+        view = self._views.get(code)
+        if view is None:
+            j = self._col.get(code)
+            if j is None or self._ends[j] == 0:
+                raise KeyError(code)
+            view = self._frames[j].iloc[:int(self._ends[j])]   # 视图，无拷贝
+            self._views[code] = view
+        return view
+
+    def __contains__(self, code) -> bool:
+        j = self._col.get(code)
+        return j is not None and self._ends[j] > 0
+
+    def __iter__(self):
+        codes = self._codes
+        for j in np.flatnonzero(self._ends):
+            yield codes[j]
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._ends))
+
+    def frames_with_ends(self):
+        """
+        逐只给出 (code, 完整 DataFrame, 截至当日的行数)，只遍历截至当日有数据的股票。
+
+        选股器据此直接取最新行 / 历史窗口，不必再对每只股票 searchsorted，
+        也不必先构造切片视图。
+        """
+        codes, frames, ends = self._codes, self._frames, self._ends
+        for j in np.flatnonzero(ends):
+            yield codes[j], frames[j], int(ends[j])
+
+    def restrict(self, codes: Iterable[str]) -> 'DaySlices':
+        """
+        只保留 codes 中的股票（不在当日切片中的代码忽略）。
+
+        新对象共享 frames 与日期索引，只复制一行切片终点；供声明了 required_codes 的
+        选股器使用，遍历与切片都只涉及它关心的股票。
+        """
+        col = self._col
+        idx = [col[c] for c in codes if c in col]
+        ends = np.zeros_like(self._ends)
+        ends[idx] = self._ends[idx]
+        return DaySlices(self._frames, ends, self._codes, col)
+
+
 # ══════════════════════════════════════════════════════════════════
 # BacktestEngine
 # ══════════════════════════════════════════════════════════════════
@@ -172,6 +571,15 @@ class BacktestEngine:
         rotation_no_score_policy: str = "skip",
         # ── 并行选股 ──────────────────────────────────────────────
         parallel_workers: int = 0,   # 0 = 自动检测 CPU 核数
+        selector_threads: int = 0,   # >1 时各选股器在线程池中并发运行；0/1 = 串行
+        price_dtype: str = "float64",  # OHLCV 列精度："float64"（默认）或 "float32"
+        data_format: str = "csv",      # 行情文件格式："csv"（默认）或 "feather"
+        csv_cache: bool = True,        # CSV 解析结果是否落盘缓存
+        csv_cache_dir: Optional[str] = None,  # 缓存目录；None = data_dir/.csv_cache
+        # ── 日志 ──────────────────────────────────────────────────
+        verbose: bool = True,
+        capture_logs: bool = True,
+        log_capacity: int = 0,       # >0 时 self.logs 只保留最近的这么多行
     ):
         """
         Initialize backtesting engine.
@@ -191,6 +599,34 @@ class BacktestEngine:
             use_indicator_db: Whether to use pre-computed indicator database
             indicator_db_path: Path to indicator database
             parallel_workers: Worker processes for parallel stock screening (0 = auto)
+            selector_threads: Threads for running independent selectors
+                concurrently (0 or 1 = sequential)
+            price_dtype: dtype for the OHLCV/amount columns of the per-stock
+                history frames. "float32" halves their memory and bandwidth;
+                prices are then only exact to ~7 significant digits, so fills,
+                P&L and indicator thresholds can differ slightly from a float64
+                run. Integer volume columns are narrowed to int32 instead
+                when every value fits. The daily OHLCV panel and cash
+                accounting stay float64.
+            data_format: On-disk format of the per-stock files in data_dir
+                when not using the indicator database. "feather" reads
+                <code>.feather files (see scripts/convert_csv_to_feather.py)
+                memory-mapped via pyarrow, skipping CSV text parsing.
+            csv_cache: Cache parsed CSV files as pickles so later runs skip
+                text parsing. Turn off to never write next to (or outside)
+                the data; a cache directory that cannot be written is also
+                skipped silently.
+            csv_cache_dir: Where the parse cache lives (default:
+                data_dir/.csv_cache). Point it elsewhere for read-only data
+                directories.
+            verbose: Emit per-day summaries and per-signal / per-order detail
+                logs (run-level banners, warnings and errors are always logged)
+            capture_logs: Keep every log line in self.logs. Callers that never
+                read self.logs (e.g. jobs streaming through log_callback) can
+                turn this off so long runs do not accumulate the full log.
+            log_capacity: When > 0, self.logs is a ring buffer holding only the
+                most recent log_capacity lines, so memory stays constant however
+                long the backtest runs (0 = keep every line)
         """
         self.data_dir = Path(data_dir)
         self.buy_config_path = buy_config_path
@@ -230,8 +666,30 @@ class BacktestEngine:
         # key: stock_code, value: numpy datetime64[ns] 数组（已排序）
         self._date_arrays: Dict[str, np.ndarray] = {}
 
+        # ── [优化P1-3] OHLCV 面板，由 _build_panel() 在 load_data() 末尾填充 ──
+        self._panel: Optional[np.ndarray] = None          # (n_dates, 5, n_codes)
+        self._panel_fields: Dict[str, np.ndarray] = {}    # 字段名 -> (n_dates, n_codes) 视图
+        self._panel_present: Optional[np.ndarray] = None  # (n_dates, n_codes) bool
+        self._panel_end: Optional[np.ndarray] = None      # (n_dates, n_codes) 截至当日行数
+        self._panel_today: Optional[np.ndarray] = None    # (n_dates, n_codes) 当日行位置，-1=无
+        self._panel_prev_close: Optional[np.ndarray] = None  # (n_dates, n_codes) 自身上一行收盘价
+        self._panel_frames: List[pd.DataFrame] = []       # 与 _panel_codes 对齐
+        self._panel_codes: List[str] = []
+        self._panel_col: Dict[str, int] = {}
+        self._panel_row: Dict[datetime, int] = {}
+        # run() 当前所在的 bar（交易日序号）及其日期；_bar_row() 对当日直接返回整数下标
+        self._bar: int = -1
+        self._bar_date: Optional[datetime] = None
+
         # Buy selectors
-        self.buy_selectors: List[Any] = []
+        self.buy_selectors: List[SelectorRef] = []
+
+        # legacy 路径使用的指标函数，由 _bind_indicator_functions() 绑定一次
+        self._compute_kdj_lines = None
+        self._compute_bbi = None
+        # legacy 路径的整段历史指标：code -> (J, BBI)，与 market_data[code] 行对齐；
+        # 两者都只依赖当日及以前的数据，截至某日的值即整段结果的对应行
+        self._legacy_indicators: Dict[str, Tuple[pd.DataFrame, np.ndarray, np.ndarray]] = {}
 
         # Selector combination config
         self.combination_mode = "OR"
@@ -239,7 +697,10 @@ class BacktestEngine:
         self.required_selectors = []
 
         # Signal history tracking (for TIME_WINDOW mode)
-        self.signal_history: Dict[datetime, Dict[str, List[str]]] = {}
+        # 窗口内逐日的 (date, {selector: codes})，按日期递增；
+        # _window_selectors 为其增量汇总：{code: {selector: 窗口内入选天数}}
+        self.signal_history: Deque[Tuple[datetime, Dict[str, Set[str]]]] = deque()
+        self._window_selectors: Dict[str, Dict[str, int]] = {}
 
         # Sequential confirmation settings (for SEQUENTIAL_CONFIRMATION mode)
         self.trigger_selectors: List[str] = []
@@ -255,11 +716,17 @@ class BacktestEngine:
         self.sell_strategy = None
 
         # Logging
-        self.logs: List[str] = []
+        self.logs: MutableSequence[str] = deque(maxlen=log_capacity) if log_capacity > 0 else []
         self.log_callback = log_callback
-
-        # Data preparation cache
-        self.data_cache: Dict[str, pd.DataFrame] = {}
+        self.verbose = verbose
+        self.capture_logs = capture_logs
+        # run() 期间控制台输出先缓冲，攒满 CONSOLE_FLUSH_LINES 行统一写一次 stdout
+        self._console_buf: Optional[List[str]] = None
+        # 选股 / 卖出检查的线程池也会调用 log()：缓冲的追加与写出都在锁内进行
+        self._console_lock = threading.Lock()
+
+        # Data preparation cache（交易日为 DaySlices，其余日期为 dict）
+        self.data_cache: Mapping = {}
         self.cache_date: Optional[datetime] = None
 
         # ── Score 百分位过滤 ──────────────────────────────────────
@@ -311,6 +778,31 @@ class BacktestEngine:
             )
             self.log(f"Persistent process pool created ({self.parallel_workers} workers)")
 
+        if price_dtype not in ("float64", "float32"):
+            raise ValueError(f"price_dtype must be 'float64' or 'float32', got {price_dtype!r}")
+        self.price_dtype = np.dtype(price_dtype)
+
+        if data_format not in DATA_FILE_SUFFIXES:
+            raise ValueError(f"data_format must be 'csv' or 'feather', got {data_format!r}")
+        self.data_format = data_format
+
+        # CSV 解析缓存目录（None = 不缓存）；写入失败后本引擎不再尝试写
+        if csv_cache:
+            self.csv_cache_dir: Optional[Path] = (
+                Path(csv_cache_dir) if csv_cache_dir is not None
+                else self.data_dir / CSV_CACHE_DIRNAME
+            )
+        else:
+            self.csv_cache_dir = None
+        self._csv_cache_writable = True
+
+        # 选股器线程池：由 load_buy_selectors() 按选股器数量懒创建
+        self.selector_threads = selector_threads
+        self._selector_pool: Optional[ThreadPoolExecutor] = None
+
+        # [优化P1-5] precompute_signals() 的结果：{交易日: _run_selectors 的返回值}
+        self._selection_by_date: Dict[datetime, list] = {}
+
         if self.use_indicator_db:
             self.log(f"Using indicator database: {self.indicator_db_path}")
         else:
@@ -323,6 +815,8 @@ class BacktestEngine:
                 self._executor.shutdown(wait=False)
             except Exception:
                 pass
+        if getattr(self, '_selector_pool', None) is not None:
+            self._selector_pool.shutdown(wait=False)
 
     def _ensure_project_root_on_path(self):
         """Ensure project root is on sys.path for Selector imports."""
@@ -334,6 +828,14 @@ class BacktestEngine:
         if str(root) not in sys.path:
             sys.path.insert(0, str(root))
 
+    def _bind_indicator_functions(self):
+        """[优化] 一次性导入 compute_kdj_lines / compute_bbi 并绑定到实例，避免逐信号 import。"""
+        if self._compute_kdj_lines is None:
+            self._ensure_project_root_on_path()
+            from utils.indicators import compute_kdj_lines, compute_bbi
+            self._compute_kdj_lines = compute_kdj_lines
+            self._compute_bbi = compute_bbi
+
     # ══════════════════════════════════════════════════════════════════
     # [优化P1-1] 日期索引预建与 searchsorted 数据切片
     # ══════════════════════════════════════════════════════════════════
@@ -352,19 +854,118 @@ class BacktestEngine:
             self._date_arrays[code] = df['date'].values.astype('datetime64[ns]')
         self.log(f"  Date index built for {len(self._date_arrays)} stocks")
 
-    def _build_current_market_data(self, date: datetime) -> Dict[str, pd.Series]:
+    def _build_panel(self) -> None:
+        """
+        [优化P1-3] 把所有股票的 OHLCV 对齐到交易日历，构建 (n_dates, 5, n_codes) 面板。
+
+        按字段分列存放（SoA）：某日某字段的全部股票是一段连续内存，
+        _panel_fields[field] 为该字段 (n_dates, n_codes) 的视图，整列读取无需逐只访问。
+        每只股票只遍历一次：searchsorted 求出各行在交易日历中的位置，
+        整块写入面板。当日无数据（停牌）的格子保持 NaN，并由 _panel_present 标记。
+        面板始终为 float64（price_dtype=float32 时为其无损放宽），估值与成交记账不受影响。
+        """
+        dates_np = np.array(self.trading_dates, dtype='datetime64[ns]')
+        codes = list(self.market_data.keys())
+        n_dates, n_codes = len(dates_np), len(codes)
+
+        panel = np.full((n_dates, len(PANEL_FIELDS), n_codes), np.nan)
+        # 每个交易日、每只股票当日行在其 DataFrame 中的位置；-1 表示当日无数据
+        today_rows = np.full((n_dates, n_codes), -1, dtype=np.int32)
+        # 每个交易日、每只股票截至当日（含）的行数，供 _get_data_up_to_date 直接切片
+        end_rows = np.zeros((n_dates, n_codes), dtype=np.int32)
+        # 每个交易日、每只股票自身上一行的收盘价（T+1 撮合的涨跌停基准），无上一行为 NaN
+        prev_close = np.full((n_dates, n_codes), np.nan)
+
+        for j, code in enumerate(codes):
+            df = self.market_data[code]
+            stock_dates = self._date_arrays[code]
+            end_rows[:, j] = np.searchsorted(stock_dates, dates_np, side='right')
+            rows = np.searchsorted(dates_np, stock_dates)
+            in_range = rows < n_dates
+            in_range[in_range] = dates_np[rows[in_range]] == stock_dates[in_range]
+            if not in_range.any():
+                continue
+            # 同一日期重复出现时保留第一行（与逐只 searchsorted side='left' 一致）
+            target, first = np.unique(rows[in_range], return_index=True)
+            src = np.flatnonzero(in_range)[first]
+            for k, field in enumerate(PANEL_FIELDS):
+                if field in df.columns:
+                    panel[target, k, j] = df[field].to_numpy(dtype=float)[src]
+            today_rows[target, j] = src
+            if 'close' in df.columns:
+                has_prev = src > 0
+                prev_close[target[has_prev], j] = (
+                    df['close'].to_numpy(dtype=float)[src[has_prev] - 1]
+                )
+
+        self._panel = panel
+        self._panel_fields = {field: panel[:, k, :] for k, field in enumerate(PANEL_FIELDS)}
+        self._panel_present = today_rows >= 0
+        self._panel_today = today_rows
+        self._panel_prev_close = prev_close
+        self._panel_end = end_rows
+        self._panel_frames = [self.market_data[code] for code in codes]
+        self._panel_codes = codes
+        self._panel_col = {code: j for j, code in enumerate(codes)}
+        self._panel_row = {d: i for i, d in enumerate(self.trading_dates)}
+        self.log(f"  OHLCV panel built: {n_dates} days x {n_codes} stocks")
+
+    def _virtual_last_day_frames(
+        self, last_date: datetime, virtual_date: datetime
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        强制平仓的回退行情（last_date 不在面板中时）：待成交股票的历史末尾
+        追加一行 last_date 的复制，日期改为 virtual_date。
+        """
+        # [优化] 只为有待执行卖单的股票构造虚拟行情（其余股票不会被访问），
+        # 最后一日的行用 searchsorted 定位，避免对全部股票做布尔过滤 + concat
+        last_date_np = np.datetime64(last_date, 'ns')
+        market_data_virtual: Dict[str, pd.DataFrame] = {}
+        for code in {order.code for order in self.portfolio.pending_orders}:
+            df = self.market_data.get(code)
+            if df is None:
+                continue
+            arr = self._date_array(code)
+            idx = int(np.searchsorted(arr, last_date_np, side='left'))
+            if idx < len(arr) and arr[idx] == last_date_np:
+                df_virtual = df.iloc[[idx]].copy()
+                df_virtual['date'] = virtual_date
+                market_data_virtual[code] = pd.concat([df, df_virtual], ignore_index=True)
+            else:
+                market_data_virtual[code] = df
+        return market_data_virtual
+
+    def _bar_row(self, date: datetime) -> Optional[int]:
+        """
+        date 在交易日历中的下标（非交易日为 None）。
+
+        run() 主循环按整数 bar 推进：当天的日期对象与 _bar_date 是同一个，
+        身份比较即可命中，不必对 Timestamp 求哈希查 _panel_row。
+        """
+        if date is self._bar_date:
+            return self._bar
+        return self._panel_row.get(date)
+
+    def _build_current_market_data(self, date: datetime) -> Mapping:
         """
-        高效构建当日行情快照字典。
+        当日行情快照。
 
-        [优化P1-1] 用 searchsorted O(log N) 替代原来的 df[df['date'] == date] O(N)，
-        对 5000 支股票提速约 3~5 倍。
+        [优化P1-3] 交易日直接返回 OHLCV 面板的一行视图（DailyQuotes），
+        无需逐只股票 iloc 构造 Series；非交易日回退为逐只 searchsorted。
 
         Args:
             date: 目标交易日
 
         Returns:
-            Dict[股票代码, 当日 Series]，不含当日无数据的股票
+            Mapping[股票代码, 当日行情]，不含当日无数据的股票
         """
+        row = self._bar_row(date)
+        if row is not None:
+            return DailyQuotes(
+                self._panel[row], self._panel_present[row],
+                self._panel_codes, self._panel_col, self._panel_prev_close[row],
+            )
+
         date_np = np.datetime64(date, 'ns')
         result: Dict[str, pd.Series] = {}
 
@@ -379,21 +980,105 @@ class BacktestEngine:
     # 数据加载
     # ══════════════════════════════════════════════════════════════════
 
-    def load_data(self, stock_codes: Optional[List[str]] = None, lookback_days: int = 200):
+    def load_data(
+        self,
+        stock_codes: Optional[List[str]] = None,
+        lookback_days: int = 200,
+        preloaded: Optional[tuple] = None,
+    ):
         """
         Load historical data from CSV files or indicator database.
 
         Args:
             stock_codes: List of stock codes. If None, loads all.
             lookback_days: Calendar days before start_date to load for indicator calculations.
+            preloaded: Optional (market_data, trading_dates[, indicator_lines]) from an
+                earlier load with the same data source / date range / stock pool, as
+                returned by preload_state(); skips reading entirely. The DataFrames are
+                shared, not copied, and must be treated as read-only. indicator_lines
+                is the legacy-mode KDJ/BBI cache, shared and filled in place so that
+                repeated runs (parameter sweeps) compute each stock's lines once.
         """
-        if self.use_indicator_db and self.indicator_store:
+        indicator_lines: Dict[str, tuple] = {}
+        if preloaded is not None:
+            market_data, trading_dates = preloaded[:2]
+            if len(preloaded) > 2:
+                indicator_lines = preloaded[2]
+            self.market_data = dict(market_data)
+            self.trading_dates = list(trading_dates)
+            self.log(
+                f"Using preloaded market data: {len(self.market_data)} stocks, "
+                f"{len(self.trading_dates)} trading days"
+            )
+        elif self.use_indicator_db and self.indicator_store:
             self._load_data_from_db(stock_codes, lookback_days)
         else:
             self._load_data_from_csv(stock_codes, lookback_days)
 
+        # 股票代码驻留（intern）：持仓、订单、信号、面板索引等各处字典共用同一批 str 对象，
+        # 查找时身份比较即可命中，不必逐字节比较；跨进程选股返回的代码同样驻留
+        self.market_data = {sys.intern(str(code)): df for code, df in self.market_data.items()}
+        self._legacy_indicators = indicator_lines
+
+        if self.price_dtype != np.float64:
+            self._cast_price_columns()
+
         # [优化P1-1] 数据加载完成后，立即预建日期索引
         self._build_date_index()
+        # [优化P1-3] 对齐到交易日历的 OHLCV 面板
+        self._build_panel()
+
+    def preload_state(self) -> tuple:
+        """
+        供后续引擎 load_data(preloaded=...) 复用的 (market_data, trading_dates, indicator_lines)。
+
+        行情与 legacy 指标缓存都是共享引用：之后任一引擎补算的指标线对其余引擎同样可见。
+        """
+        return dict(self.market_data), list(self.trading_dates), self._legacy_indicators
+
+    def _cast_price_columns(self):
+        """
+        把 OHLCV（及 amount）列转换为 price_dtype。
+
+        整数成交量转为 float32 会丢失精度（超过 2^24 股即不精确），
+        因此整数列改为收窄到 int32（取值放不下时保持原样）。
+        astype 生成新 DataFrame，不会改动 preloaded 传入的共享数据。
+        """
+        int32_max = np.iinfo(np.int32).max
+        for code, df in self.market_data.items():
+            casts = {}
+            for col in PANEL_FIELDS + ('amount',):
+                if col not in df.columns:
+                    continue
+                dtype = df[col].dtype
+                if dtype.kind in 'iu':
+                    if dtype.itemsize > 4 and len(df) and df[col].abs().max() <= int32_max:
+                        casts[col] = np.int32
+                elif dtype != self.price_dtype:
+                    casts[col] = self.price_dtype
+            if casts:
+                self.market_data[code] = df.astype(casts)
+        self.log(f"  OHLCV columns stored as {self.price_dtype}")
+
+    def _collect_trading_dates(self) -> List[pd.Timestamp]:
+        """
+        回测区间 [start_date, end_date] 内出现过的全部交易日（升序、去重）。
+
+        各股日期已升序：每只股票用两次 searchsorted 取出区间内的日期视图（无布尔掩码），
+        拼接后一次 np.unique 完成排序去重；仅在最后转换为 Timestamp 列表。
+        """
+        start64 = np.datetime64(self.start_date, 'ns')
+        end64 = np.datetime64(self.end_date, 'ns')
+        windows = []
+        for df in self.market_data.values():
+            dates = df['date'].to_numpy()
+            lo = dates.searchsorted(start64, side='left')
+            hi = dates.searchsorted(end64, side='right')
+            if lo < hi:
+                windows.append(dates[lo:hi])
+        if not windows:
+            return []
+        return pd.DatetimeIndex(np.unique(np.concatenate(windows))).tolist()
 
     def _load_data_from_db(self, stock_codes: Optional[List[str]], lookback_days: int):
         """从指标数据库加载数据（新模式）。"""
@@ -418,8 +1103,7 @@ class BacktestEngine:
             if df_all.empty:
                 self.log("No indicator rows returned for requested codes/date range")
             else:
-                for code, group in df_all.groupby('code'):
-                    g = group.sort_values('date').reset_index(drop=True)
+                for code, g in _split_by_code(df_all).items():
                     self.market_data[code] = g
                     loaded_count += 1
 
@@ -428,13 +1112,7 @@ class BacktestEngine:
         except Exception as e:
             self.log(f"Error loading indicators in bulk from DB: {e}")
 
-        # Build trading dates
-        all_dates = set()
-        for df in self.market_data.values():
-            backtest_dates = df[(df['date'] >= self.start_date) & (df['date'] <= self.end_date)]['date'].tolist()
-            all_dates.update(backtest_dates)
-
-        self.trading_dates = sorted(list(all_dates))
+        self.trading_dates = self._collect_trading_dates()
 
         if len(self.trading_dates) == 0:
             raise ValueError(
@@ -450,50 +1128,72 @@ class BacktestEngine:
         self.validate_data_quality()
 
     def _load_data_from_csv(self, stock_codes: Optional[List[str]], lookback_days: int):
-        """从 CSV 文件加载数据（原有逻辑）。"""
-        self.log("Loading market data from CSV files...")
+        """从 data_dir 下的逐股文件加载数据（CSV，或 data_format='feather' 时的 Feather）。"""
+        suffix = DATA_FILE_SUFFIXES[self.data_format]
+        self.log(f"Loading market data from {self.data_format.upper()} files...")
 
         data_start_date = self.start_date - timedelta(days=lookback_days)
         self.log(f"Loading data from {data_start_date.date()} (backtest starts {self.start_date.date()})")
 
         if stock_codes is None:
-            csv_files = list(self.data_dir.glob("*.csv"))
+            csv_files = list(self.data_dir.glob(f"*{suffix}"))
         else:
-            csv_files = [self.data_dir / f"{code}.csv" for code in stock_codes]
+            csv_files = [self.data_dir / f"{code}{suffix}" for code in stock_codes]
 
-        loaded_count = 0
-        for csv_file in csv_files:
+        if self.data_format == "feather":
+            try:
+                from pyarrow import feather
+            except ImportError:
+                raise ImportError("data_format='feather' 需要 pyarrow：pip install pyarrow")
+
+        start64 = np.datetime64(data_start_date)
+        end64 = np.datetime64(self.end_date)
+
+        def _load_one(csv_file: Path) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+            """读取并截取一只股票；返回 (df 或 None, 需要记录的日志或 None)。"""
             if not csv_file.exists():
-                continue
+                return None, None
             try:
-                df = pd.read_csv(csv_file)
-                if 'date' in df.columns:
-                    df['date'] = pd.to_datetime(df['date'])
+                if self.data_format == "feather":
+                    # 内存映射读取：列已是二进制类型（date 为 datetime64，已排序），无需解析
+                    df = feather.read_table(str(csv_file), memory_map=True).to_pandas()
+                    if 'date' not in df.columns:
+                        df = None
                 else:
-                    self.log(f"Warning: {csv_file.name} missing 'date' column")
-                    continue
-
-                df = df.sort_values('date').reset_index(drop=True)
-                df = df[(df['date'] >= data_start_date) & (df['date'] <= self.end_date)]
+                    df = self._read_csv_cached(csv_file)
+                if df is None:
+                    return None, f"Warning: {csv_file.name} missing 'date' column"
+
+                # [优化] 用 searchsorted 截取回看区间
+                dates = df['date'].to_numpy()
+                lo = dates.searchsorted(start64, side='left')
+                hi = dates.searchsorted(end64, side='right')
+                if lo >= hi:
+                    return None, None
+                return df.iloc[lo:hi], None
 
-                if len(df) == 0:
-                    continue
+            except Exception as e:
+                return None, f"Error loading {csv_file.name}: {e}"
 
-                code = csv_file.stem
-                self.market_data[code] = df
-                loaded_count += 1
+        # 多线程读取；map 保持文件顺序，日志与 market_data 均在主线程按原顺序写入
+        if len(csv_files) > 1 and DATA_LOAD_THREADS > 1:
+            with ThreadPoolExecutor(max_workers=DATA_LOAD_THREADS) as pool:
+                results = list(pool.map(_load_one, csv_files))
+        else:
+            results = [_load_one(f) for f in csv_files]
 
-            except Exception as e:
-                self.log(f"Error loading {csv_file.name}: {e}")
+        loaded_count = 0
+        for csv_file, (df, message) in zip(csv_files, results):
+            if message is not None:
+                self.log(message)
+            if df is None:
+                continue
+            self.market_data[csv_file.stem] = df
+            loaded_count += 1
 
         self.log(f"Loaded {loaded_count} stocks")
 
-        all_dates = set()
-        for df in self.market_data.values():
-            backtest_dates = df[(df['date'] >= self.start_date) & (df['date'] <= self.end_date)]['date'].tolist()
-            all_dates.update(backtest_dates)
-
-        self.trading_dates = sorted(list(all_dates))
+        self.trading_dates = self._collect_trading_dates()
 
         if len(self.trading_dates) == 0:
             raise ValueError(
@@ -508,6 +1208,73 @@ class BacktestEngine:
         )
         self.validate_data_quality()
 
+    @staticmethod
+    def _parse_csv(csv_file: Path) -> Optional[pd.DataFrame]:
+        """
+        解析单个 CSV：日期转换 + 升序排序；缺少 date 列时返回 None。
+
+        优先走 pyarrow.csv（见 _read_csv_arrow），否则 pd.read_csv + pd.to_datetime；
+        两条路径得到相同的列与 datetime64[ns] 日期。结果与 price_dtype 无关。
+        """
+        df = _read_csv_arrow(csv_file)
+        if df is None:
+            df = pd.read_csv(csv_file)
+        if 'date' not in df.columns:
+            return None
+        dates = df['date']
+        if dates.dtype.kind != 'M':
+            df['date'] = pd.to_datetime(dates)
+        elif dates.dtype != 'datetime64[ns]':
+            df['date'] = dates.astype('datetime64[ns]')
+        # [优化] 行情文件通常已按日期升序，跳过排序
+        if not df['date'].is_monotonic_increasing:
+            df = df.sort_values('date')
+        return df.reset_index(drop=True)
+
+    def _read_csv_cached(self, csv_file: Path) -> Optional[pd.DataFrame]:
+        """
+        [优化P1-4] 带磁盘缓存的 CSV 读取。
+
+        缓存内容为 (源文件路径, mtime_ns, size, 解析结果)；源文件变化即失效重建，
+        路径也在校验之列，多个数据目录共用一个 csv_cache_dir 时不会串用。
+        解析结果与 price_dtype 无关（转换在 load_data 中进行），不同精度的回测共用缓存。
+        csv_cache=False 时直接解析；缓存目录不可写时静默退化为直接解析。
+        """
+        cache_dir = self.csv_cache_dir
+        if cache_dir is None:
+            return self._parse_csv(csv_file)
+
+        st = csv_file.stat()
+        stamp = (str(csv_file.resolve()), st.st_mtime_ns, st.st_size)
+        cache_file = cache_dir / f"{csv_file.stem}.pkl"
+
+        try:
+            with open(cache_file, 'rb') as f:
+                cached_stamp, cached_df = pickle.load(f)
+            if cached_stamp == stamp:
+                return cached_df
+        except Exception:
+            pass
+
+        df = self._parse_csv(csv_file)
+        if not self._csv_cache_writable:
+            return df
+        # 临时文件名带进程与线程号：并发读取（多线程 / 多个引擎进程）互不覆盖
+        tmp_file = cache_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_file, 'wb') as f:
+                pickle.dump((stamp, df), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except Exception:
+            # 只读目录、磁盘满等：本次结果照常返回，之后的文件不再尝试写缓存
+            self._csv_cache_writable = False
+            try:
+                tmp_file.unlink()
+            except OSError:
+                pass
+        return df
+
     def validate_data_quality(self):
         """Check if data meets selector requirements and validate OHLC consistency."""
         self.log("\nValidating data quality...")
@@ -544,24 +1311,28 @@ class BacktestEngine:
             for issue in price_issues[:5]:
                 self.log(f"    - {issue}")
 
-        lengths_at_start = []
-        for df in self.market_data.values():
-            df_at_start = df[df['date'] <= self.start_date]
-            if len(df_at_start) > 0:
-                lengths_at_start.append(len(df_at_start))
+        # 各股票已按日期升序，截至开始日的行数即 searchsorted 的位置
+        start64 = np.datetime64(self.start_date)
+        lengths_at_start = np.fromiter(
+            (df['date'].to_numpy().searchsorted(start64, side='right')
+             for df in self.market_data.values()),
+            dtype=np.int64, count=len(self.market_data),
+        )
+        lengths_at_start = lengths_at_start[lengths_at_start > 0]
 
-        if not lengths_at_start:
+        if not len(lengths_at_start):
             self.log("  WARNING: No data available at backtest start date")
             return
 
         self.log(f"  Stocks loaded: {len(self.market_data)}")
         self.log(f"  Data available at backtest start ({self.start_date.date()}):")
-        self.log(f"    Min data length: {min(lengths_at_start)} days")
-        self.log(f"    Max data length: {max(lengths_at_start)} days")
-        self.log(f"    Median data length: {sorted(lengths_at_start)[len(lengths_at_start)//2]} days")
+        mid = len(lengths_at_start) // 2
+        self.log(f"    Min data length: {lengths_at_start.min()} days")
+        self.log(f"    Max data length: {lengths_at_start.max()} days")
+        self.log(f"    Median data length: {np.partition(lengths_at_start, mid)[mid]} days")
 
-        insufficient_60ma = sum(1 for l in lengths_at_start if l < 60)
-        insufficient_120 = sum(1 for l in lengths_at_start if l < 120)
+        insufficient_60ma = int(np.count_nonzero(lengths_at_start < 60))
+        insufficient_120 = int(np.count_nonzero(lengths_at_start < 120))
 
         self.log(f"    Stocks with <60 days (MA60 won't work): {insufficient_60ma}")
         self.log(f"    Stocks with <120 days (max_window): {insufficient_120}")
@@ -581,8 +1352,7 @@ class BacktestEngine:
         if self.buy_config is not None:
             config = self.buy_config
         else:
-            with open(self.buy_config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            config = _load_buy_config(self.buy_config_path)
 
         # Load combination settings
         if 'selector_combination' in config:
@@ -619,6 +1389,9 @@ class BacktestEngine:
             self.log("Selector combination mode: OR (default)")
 
         self._ensure_project_root_on_path()
+        self._bind_indicator_functions()
+
+        import backtest.Selector as Selector_module
 
         selectors_config = config.get('selectors', [])
         loaded = 0
@@ -632,20 +1405,32 @@ class BacktestEngine:
             params = selector_cfg.get('params', {})
 
             try:
-                import backtest.Selector as Selector_module
-                selector_cls = getattr(Selector_module, class_name)
+                selector_cls = getattr(Selector_module, class_name, None)
+                if selector_cls is None:
+                    raise AttributeError(f"Selector class not found: {class_name}")
                 instance = selector_cls(**params)
 
                 if self.use_indicator_db and self.indicator_store:
                     if hasattr(instance, 'indicator_store'):
                         instance.indicator_store = self.indicator_store
 
-                self.buy_selectors.append({
-                    'class': class_name,
-                    'alias': alias,
-                    'instance': instance,
-                    'params': params,
-                })
+                # 进程池按 (类名, 参数) 在子进程重建选股器：加载时检查一次能否跨进程传递，
+                # 不能的选股器在本进程内运行，而不是每天在 worker 中逐片失败
+                process_safe = (
+                    getattr(Selector_module, type(instance).__name__, None) is type(instance)
+                    and _is_picklable(_selector_params(instance))
+                )
+                if not process_safe and self.parallel_workers > 1:
+                    self.log(f"  {alias}: parameters not picklable, selecting in-process")
+
+                self.buy_selectors.append(SelectorRef(
+                    class_name=class_name,
+                    alias=alias,
+                    instance=instance,
+                    params=params,
+                    select=instance.select,
+                    process_safe=process_safe,
+                ))
                 self.log(f"  Loaded: {alias} ({class_name})")
                 loaded += 1
 
@@ -654,6 +1439,12 @@ class BacktestEngine:
 
         self.log(f"Loaded {loaded} buy selector(s)")
 
+        # [优化] 多个选股器时按需创建线程池，供 _run_selectors 并发执行
+        n_threads = min(self.selector_threads, len(self.buy_selectors))
+        if n_threads > 1 and self._selector_pool is None:
+            self._selector_pool = ThreadPoolExecutor(max_workers=n_threads)
+            self.log(f"Selector thread pool created ({n_threads} threads)")
+
     def load_sell_strategy(self):
         """加载卖出策略。"""
         self.log("Loading sell strategy...")
@@ -678,50 +1469,85 @@ class BacktestEngine:
     # [优化P1-1] 数据切片：searchsorted 替代布尔过滤
     # ══════════════════════════════════════════════════════════════════
 
-    def _get_data_up_to_date(self, date: datetime) -> Dict[str, pd.DataFrame]:
+    def _get_data_up_to_date(self, date: datetime) -> Mapping:
         """
         获取截至指定日期的数据（带缓存）。
 
         [优化P1-1] 使用预建的 numpy datetime64 索引 + searchsorted (O(log N))，
         替代原来的 df[df['date'] <= date] 全量布尔扫描 (O(N))。
         对 5000 支股票 × 250 天，总计减少约 125 万次布尔数组运算。
+        交易日的切片终点已由 _build_panel 一次性算好（_panel_end），返回按需切片的
+        DaySlices；同一天的卖出检查、选股、下单、换仓共享同一份视图。
 
         Args:
             date: 目标日期（含该日）
 
         Returns:
-            Dict[股票代码, DataFrame 视图（截至 date）]
+            Mapping[股票代码, DataFrame 视图（截至 date）]
         """
         # 同一天直接返回缓存（最常见情况）
         if date == self.cache_date and self.data_cache:
             return self.data_cache
 
-        date_np = np.datetime64(date, 'ns')
-        self.data_cache = {}
+        row = self._bar_row(date)
+        if row is not None and len(self._panel_codes) == len(self.market_data):
+            self.data_cache = DaySlices(
+                self._panel_frames, self._panel_end[row], self._panel_codes, self._panel_col,
+            )
+            self.cache_date = date
+            return self.data_cache
 
+        self.data_cache = {}
+        date_np = np.datetime64(date, 'ns')
         for code, df in self.market_data.items():
-            arr = self._date_arrays.get(code)
-            if arr is None:
-                # fallback（不应发生，但作为防御）
-                df_filtered = df[df['date'] <= date]
-                if len(df_filtered) > 0:
-                    self.data_cache[code] = df_filtered
-            else:
-                # searchsorted: 找到第一个 > date 的位置，取 [0:idx] 即为 <= date 的所有行
-                idx = int(np.searchsorted(arr, date_np, side='right'))
-                if idx > 0:
-                    self.data_cache[code] = df.iloc[:idx]   # 视图，无拷贝
+            # searchsorted: 找到第一个 > date 的位置，取 [0:idx] 即为 <= date 的所有行
+            idx = int(np.searchsorted(self._date_array(code), date_np, side='right'))
+            if idx > 0:
+                self.data_cache[code] = df.iloc[:idx]   # 视图，无拷贝
 
         self.cache_date = date
         return self.data_cache
 
+    def _date_array(self, code: str) -> np.ndarray:
+        """
+        某只股票的 datetime64[ns] 日期数组；_build_date_index 之后才加入的股票按需补建，
+        保证所有日期定位都走 searchsorted，而不是退化为布尔过滤。
+        """
+        arr = self._date_arrays.get(code)
+        if arr is None:
+            arr = self.market_data[code]['date'].values.astype('datetime64[ns]')
+            self._date_arrays[code] = arr
+        return arr
+
+    def _today_row(self, code: str, date: datetime) -> Optional[pd.Series]:
+        """
+        [优化P1-1] 返回某只股票 date 当日的行，无数据时返回 None。
+
+        交易日直接查 _build_panel 预建的当日行位置表（O(1)），其余日期用 searchsorted。
+        """
+        row = self._bar_row(date)
+        j = self._panel_col.get(code)
+        if row is not None and j is not None:
+            i = int(self._panel_today[row, j])
+            return self._panel_frames[j].iloc[i] if i >= 0 else None
+
+        df = self.market_data.get(code)
+        if df is None:
+            return None
+        arr = self._date_array(code)
+        date_np = np.datetime64(date, 'ns')
+        idx = int(np.searchsorted(arr, date_np, side='left'))
+        if idx < len(arr) and arr[idx] == date_np:
+            return df.iloc[idx]
+        return None
+
     # ══════════════════════════════════════════════════════════════════
     # [优化P0-1/P0-2] 并行选股
     # ══════════════════════════════════════════════════════════════════
 
     def _parallel_select(
         self,
-        selector,
+        selector: SelectorRef,
         date: datetime,
         data_up_to_date: Dict[str, pd.DataFrame],
     ) -> List[str]:
@@ -737,22 +1563,22 @@ class BacktestEngine:
 
         CSV 模式下保留旧逻辑（传入 data_chunk），确保向后兼容。
         """
-        codes = list(data_up_to_date.keys())
         n = self.parallel_workers
+        data_up_to_date = self._restrict_to_required(selector, data_up_to_date)
 
-        # 单进程 或 股票数少于 worker 数：直接走串行
-        if self._executor is None or n <= 1 or len(codes) <= n:
+        # 单进程、股票数少于 worker 数、或选股器无法在子进程重建：直接走串行
+        if (self._executor is None or n <= 1 or len(data_up_to_date) <= n
+                or not selector.process_safe):
             return selector.select(date, data_up_to_date)
 
+        codes = list(data_up_to_date.keys())
+        instance = selector.instance
         # 将股票池均匀分片
         chunk_size = max(1, math.ceil(len(codes) / n))
         chunks = [codes[i:i + chunk_size] for i in range(0, len(codes), chunk_size)]
 
-        selector_class_name = type(selector).__name__
-        selector_params = {
-            k: v for k, v in vars(selector).items()
-            if not k.startswith('_') and k != 'indicator_store'
-        }
+        selector_class_name = type(instance).__name__
+        selector_params = _selector_params(instance)
         indicator_db_path = self.indicator_db_path if self.use_indicator_db else None
 
         if self.use_indicator_db:
@@ -775,72 +1601,153 @@ class BacktestEngine:
         futures = {self._executor.submit(_selector_chunk_worker, task): task for task in tasks}
         for future in as_completed(futures):
             try:
-                picks.extend(future.result())
+                picks.extend(map(sys.intern, future.result()))
             except Exception as e:
                 self.log(f"  [parallel_select] chunk error: {e}")
 
         return picks
 
-    # ══════════════════════════════════════════════════════════════════
-    # 买入信号相关
-    # ══════════════════════════════════════════════════════════════════
+    @staticmethod
+    def _restrict_to_required(
+        selector: SelectorRef, data_up_to_date: Mapping,
+    ) -> Mapping:
+        """
+        可选协议：选股器实例的 required_codes（股票代码集合）非 None 时，
+        只把这些股票的切片交给它；未声明时原样返回全市场切片。
+        """
+        required = getattr(selector.instance, 'required_codes', None)
+        if required is None:
+            return data_up_to_date
+        if isinstance(data_up_to_date, DaySlices):
+            return data_up_to_date.restrict(required)
+        return {c: data_up_to_date[c] for c in required if c in data_up_to_date}
+
+    def _run_selectors(
+        self,
+        date: datetime,
+        data_up_to_date: Dict[str, pd.DataFrame],
+        cancel_event: Optional[Any] = None,
+    ) -> List[Tuple[Dict[str, Any], Optional[List[str]], Optional[Exception], Optional[str], float]]:
+        """
+        对当日数据运行全部选股器。
 
-    def get_buy_signals(self, date: datetime, cancel_check=None) -> List[BuySignal]:
-        """获取当日原始买入信号（未经 score 百分位过滤）。"""
-        self.log(f"\n{'='*80}")
-        self.log(f"GETTING BUY SIGNALS FOR {date.date()}")
-        self.log(f"{'='*80}")
+        选股器之间只读共享 data_up_to_date、互不依赖：启用 _selector_pool 时并发执行
+        （类属性 thread_safe = False 的选股器除外），否则串行。
+        结果始终按 buy_selectors 的顺序返回，每项为
+        (selector_info, picked_codes, 异常, traceback 文本, 耗时秒数)；
+        cancel_event 置位后不再启动新的选股器。
+        """
+        cached = self._selection_by_date.get(date)
+        if cached is not None:
+            return cached
 
-        t0 = _time.perf_counter()
-        data_up_to_date = self._get_data_up_to_date(date)
-        self.log(f"  Data slice ready: {len(data_up_to_date)} stocks in {_time.perf_counter()-t0:.3f}s")
+        def _select_one(selector_info):
+            t1 = _time.perf_counter()
+            try:
+                picks = self._parallel_select(selector_info, date, data_up_to_date)
+                return selector_info, picks, None, None, _time.perf_counter() - t1
+            except Exception as e:
+                import traceback
+                return selector_info, None, e, traceback.format_exc(), _time.perf_counter() - t1
 
-        signals_by_selector: Dict[str, List[BuySignal]] = {}
+        results = []
+        if self._selector_pool is None:
+            for selector_info in self.buy_selectors:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                results.append(_select_one(selector_info))
+            return results
 
+        # 声明 thread_safe = False 的选股器（实例带可变状态）不进线程池，
+        # 在当前线程中逐个执行，同时与池中的其他选股器重叠
+        futures = []
         for selector_info in self.buy_selectors:
-            if cancel_check and cancel_check():
+            if cancel_event is not None and cancel_event.is_set():
                 break
+            if getattr(selector_info.instance, 'thread_safe', True):
+                futures.append(self._selector_pool.submit(_select_one, selector_info))
+            else:
+                futures.append(None)
+        inline = [
+            _select_one(selector_info) if future is None else None
+            for selector_info, future in zip(self.buy_selectors, futures)
+        ]
+        return [
+            result if future is None else future.result()
+            for result, future in zip(inline, futures)
+        ]
 
-            alias      = selector_info['alias']
-            class_name = selector_info['class']
-            selector   = selector_info['instance']
+    def precompute_signals(self, workers: int = 0) -> None:
+        """
+        [优化P1-5] 按交易日并行预计算全部选股结果。
 
-            try:
-                self.log(f"  Running {alias}...")
-                t1 = _time.perf_counter()
-
-                picked_codes: List[str] = self._parallel_select(selector, date, data_up_to_date)
-                self.log(f"    → {len(picked_codes)} picks in {_time.perf_counter()-t1:.3f}s ({self.parallel_workers} workers)")
-
-                signals: List[BuySignal] = []
-                for code in picked_codes:
-                    if code not in data_up_to_date:
-                        continue
-                    df_code  = data_up_to_date[code]
-                    last_row = df_code.iloc[-1]
-                    ind = self._extract_indicators(code, last_row, df_code)
-                    signal = BuySignal(
-                        code=code,
-                        date=date,
-                        strategy_name=class_name,
-                        strategy_alias=alias,
-                        kdj_j=ind['kdj_j'],
-                        volume_ratio=ind['volume_ratio'],
-                        daily_return=ind['daily_return'],
-                        bbi_slope=ind['bbi_slope'],
-                    )
-                    signals.append(signal)
+        选股器是 (date, 截至 date 的历史) 的纯函数，与组合状态无关，因此可以
+        提前在 fork 出的子进程中按日期并行跑完；run() 中 _run_selectors 直接查表。
+        组合逻辑（TIME_WINDOW / SEQUENTIAL_CONFIRMATION 的跨日状态）仍在主循环中执行。
 
-                signals_by_selector[class_name] = signals
+        需在 load_data() 与 load_buy_selectors() 之后调用。workers=0 时取
+        parallel_workers；workers <= 1 或平台不支持 fork 时不做任何事
+        （主循环照常逐日选股，结果一致）。
+        """
+        global _precompute_engine
 
-            except Exception as e:
-                import traceback
-                self.log(f"  ERROR in {alias}: {e}\n{traceback.format_exc()}")
-                signals_by_selector[class_name] = []
+        n = workers if workers > 0 else self.parallel_workers
+        if n <= 1 or not self.buy_selectors or not self.trading_dates:
+            return
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            self.log("precompute_signals: fork unavailable, selecting day by day")
+            return
+
+        dates = list(self.trading_dates)
+        t0 = _time.perf_counter()
+        _precompute_engine = self
+        try:
+            with ProcessPoolExecutor(
+                max_workers=n,
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_precompute_init,
+            ) as pool:
+                chunksize = max(1, len(dates) // (n * 4))
+                per_date = list(pool.map(_precompute_select_worker, dates, chunksize=chunksize))
+        finally:
+            _precompute_engine = None
+
+        for date, rows in zip(dates, per_date):
+            self._selection_by_date[date] = [
+                (selector_info, picks, None if err is None else RuntimeError(err), tb, elapsed)
+                for selector_info, (picks, err, tb, elapsed) in zip(self.buy_selectors, rows)
+            ]
+        self.log(
+            f"Precomputed selections for {len(dates)} trading days "
+            f"in {_time.perf_counter() - t0:.1f}s ({n} processes)"
+        )
+
+    # ══════════════════════════════════════════════════════════════════
+    # 买入信号相关
+    # ══════════════════════════════════════════════════════════════════
+
+    def get_buy_signals(self, date: datetime, cancel_event=None) -> List[BuySignal]:
+        """获取当日原始买入信号（未经 score 百分位过滤）。"""
+        if self.verbose:
+            self.log(f"\n{'='*80}")
+            self.log(f"GETTING BUY SIGNALS FOR {date.date()}")
+            self.log(f"{'='*80}")
+
+        t0 = _time.perf_counter()
+        data_up_to_date = self._get_data_up_to_date(date)
+        self.debug("  Data slice ready: %d stocks in %.3fs", len(data_up_to_date), _time.perf_counter() - t0)
+
+        def _on_error(alias: str, exc: Exception, tb: Optional[str]) -> None:
+            self.log(f"  ERROR in {alias}: {exc}\n{tb}")
+
+        selector_results = self._run_selectors(date, data_up_to_date, cancel_event)
+        signals_by_selector = self._collect_signals(
+            date, data_up_to_date, selector_results, _on_error
+        )
 
         final_signals = self._apply_combination_logic(signals_by_selector, date)
-        final_signals.sort(key=lambda s: s.score, reverse=True)
-        self.log(f"  Total signals after combination: {len(final_signals)}")
+        final_signals.sort(key=_BY_SCORE, reverse=True)
+        self.debug("  Total signals after combination: %d", len(final_signals))
         return final_signals
 
     def _get_raw_signals_for_date(
@@ -862,49 +1769,85 @@ class BacktestEngine:
 
         try:
             data_up_to_date = self._get_data_up_to_date(date)
-            signals_by_selector: Dict[str, List[BuySignal]] = {}
 
-            for selector_info in self.buy_selectors:
-                alias      = selector_info['alias']
-                class_name = selector_info['class']
-                selector   = selector_info['instance']
-                try:
-                    picked_codes: List[str] = self._parallel_select(selector, date, data_up_to_date)
-                    signals: List[BuySignal] = []
-                    for code in picked_codes:
-                        if code not in data_up_to_date:
-                            continue
-                        df_code  = data_up_to_date[code]
-                        last_row = df_code.iloc[-1]
-                        ind = self._extract_indicators(code, last_row, df_code)
-                        signals.append(BuySignal(
-                            code=code,
-                            date=date,
-                            strategy_name=class_name,
-                            strategy_alias=alias,
-                            kdj_j=ind['kdj_j'],
-                            volume_ratio=ind['volume_ratio'],
-                            daily_return=ind['daily_return'],
-                            bbi_slope=ind['bbi_slope'],
-                        ))
-                    signals_by_selector[class_name] = signals
-                except Exception as e:
-                    import traceback
-                    err_msg = f"{date.date()} [{alias}]: {e} | {traceback.format_exc().splitlines()[-1]}"
-                    if silent:
-                        errors.append(err_msg)
-                    else:
-                        self.log(f"  ERROR in {alias}: {e}\n{traceback.format_exc()}")
-                    signals_by_selector[class_name] = []
+            def _on_error(alias: str, exc: Exception, tb: Optional[str]) -> None:
+                if silent:
+                    errors.append(f"{date.date()} [{alias}]: {exc} | {tb.splitlines()[-1]}")
+                else:
+                    self.log(f"  ERROR in {alias}: {exc}\n{tb}")
+
+            signals_by_selector = self._collect_signals(
+                date, data_up_to_date, self._run_selectors(date, data_up_to_date), _on_error
+            )
 
             final = self._apply_combination_logic(signals_by_selector, date)
-            final.sort(key=lambda s: s.score, reverse=True)
+            final.sort(key=_BY_SCORE, reverse=True)
             return final, errors
 
         finally:
             if silent:
                 self.log = orig_log
 
+    def _collect_signals(
+        self,
+        date: datetime,
+        data_up_to_date: Mapping,
+        selector_results: List[Tuple[SelectorRef, Optional[List[str]], Optional[Exception], Optional[str], float]],
+        on_error,
+    ) -> Dict[str, List[BuySignal]]:
+        """
+        把当日各选股器的结果物化为 {class_name: [BuySignal]}，供 _apply_combination_logic 使用。
+
+        先按列收集 class_name → (alias, 入选代码)（同名选股器后者覆盖前者），再构造 BuySignal。
+        指标与 score 只取决于股票本身、按天缓存；OR 模式的组合对每只股票只保留最先出现的
+        信号（score 相同），因此已被前面选股器选中的股票不再重复构造 BuySignal。
+        on_error(alias, 异常, traceback 文本) 处理单个选股器的失败，该选股器记为无信号。
+        """
+        picks_by_selector: Dict[str, Tuple[str, Optional[List[str]]]] = {}
+        for selector_info, picked_codes, exc, tb, elapsed in selector_results:
+            alias = selector_info.alias
+            if exc is not None:
+                on_error(alias, exc, tb)
+                picked_codes = None
+            else:
+                self.debug(
+                    "  %s → %d picks in %.3fs (%d workers)",
+                    alias, len(picked_codes), elapsed, self.parallel_workers,
+                )
+            picks_by_selector[selector_info.class_name] = (alias, picked_codes)
+
+        seen: Optional[set] = set() if self.combination_mode == "OR" else None
+        indicator_cache: Dict[str, Dict[str, float]] = {}
+        signals_by_selector: Dict[str, List[BuySignal]] = {}
+        for class_name, (alias, codes) in picks_by_selector.items():
+            signals: List[BuySignal] = []
+            if codes:
+                if seen is not None:
+                    codes = [code for code in codes if code not in seen]
+                try:
+                    indicators = self._extract_indicators_batch(codes, data_up_to_date, indicator_cache)
+                except Exception as e:
+                    import traceback
+                    on_error(alias, e, traceback.format_exc())
+                    indicators = {}
+                signals = [
+                    BuySignal(
+                        code=code,
+                        date=date,
+                        strategy_name=class_name,
+                        strategy_alias=alias,
+                        kdj_j=ind['kdj_j'],
+                        volume_ratio=ind['volume_ratio'],
+                        daily_return=ind['daily_return'],
+                        bbi_slope=ind['bbi_slope'],
+                    )
+                    for code, ind in indicators.items()
+                ]
+                if seen is not None:
+                    seen.update(indicators)
+            signals_by_selector[class_name] = signals
+        return signals_by_selector
+
     def _apply_combination_logic(
         self,
         signals_by_selector: Dict[str, List[BuySignal]],
@@ -912,18 +1855,7 @@ class BacktestEngine:
     ) -> List[BuySignal]:
         """Apply selector combination logic."""
         if self.combination_mode == "OR":
-            all_signals = []
-            for signals in signals_by_selector.values():
-                all_signals.extend(signals)
-
-            signals_by_code: Dict[str, BuySignal] = {}
-            for signal in all_signals:
-                if signal.code not in signals_by_code:
-                    signals_by_code[signal.code] = signal
-                elif signal.score > signals_by_code[signal.code].score:
-                    signals_by_code[signal.code] = signal
-
-            return list(signals_by_code.values())
+            return _best_per_code(chain.from_iterable(signals_by_selector.values()))
 
         elif self.combination_mode == "AND":
             required = self.required_selectors if self.required_selectors else list(signals_by_selector.keys())
@@ -941,7 +1873,7 @@ class BacktestEngine:
             for code, signals in signals_by_code_list.items():
                 selector_names = {s.strategy_name for s in signals}
                 if len(selector_names) >= len(required):
-                    best_signal = max(signals, key=lambda s: s.score)
+                    best_signal = max(signals, key=_BY_SCORE)
                     final_signals.append(best_signal)
 
             return final_signals
@@ -949,35 +1881,16 @@ class BacktestEngine:
         elif self.combination_mode == "TIME_WINDOW":
             self._update_signal_history(signals_by_selector, current_date)
 
-            final_signals = []
-            window_dates = [
-                d for d in self.signal_history.keys()
-                if (current_date - d).days <= self.time_window_days
-            ]
-
-            for selector_name, signals in signals_by_selector.items():
-                for signal in signals:
-                    code = signal.code
-                    picked_by_selectors = {selector_name}
-
-                    for hist_date in window_dates:
-                        for hist_selector, hist_codes in self.signal_history[hist_date].items():
-                            if code in hist_codes:
-                                picked_by_selectors.add(hist_selector)
-
-                    required_count = len(self.required_selectors) if self.required_selectors else 2
-
-                    if len(picked_by_selectors) >= required_count:
-                        final_signals.append(signal)
-
-            signals_by_code_dedup: Dict[str, BuySignal] = {}
-            for signal in final_signals:
-                if signal.code not in signals_by_code_dedup:
-                    signals_by_code_dedup[signal.code] = signal
-                elif signal.score > signals_by_code_dedup[signal.code].score:
-                    signals_by_code_dedup[signal.code] = signal
-
-            return list(signals_by_code_dedup.values())
+            # [优化] 窗口内每只股票的入选选股器已增量汇总（含当日），
+            # 每个信号 O(1) 判断，不再逐日逐选股器重扫历史
+            window_selectors = self._window_selectors
+            required_count = len(self.required_selectors) if self.required_selectors else 2
+            return _best_per_code(
+                signal
+                for signals in signals_by_selector.values()
+                for signal in signals
+                if len(window_selectors.get(signal.code, ())) >= required_count
+            )
 
         elif self.combination_mode == "SEQUENTIAL_CONFIRMATION":
             return self._apply_sequential_confirmation(signals_by_selector, current_date)
@@ -990,14 +1903,47 @@ class BacktestEngine:
         signals_by_selector: Dict[str, List[BuySignal]],
         current_date: datetime
     ):
-        """Update signal history for TIME_WINDOW mode."""
-        self.signal_history[current_date] = {}
-        for selector_name, signals in signals_by_selector.items():
-            self.signal_history[current_date][selector_name] = [s.code for s in signals]
+        """
+        Update signal history for TIME_WINDOW mode.
+
+        当日入选结果追加到窗口右端并计入 _window_selectors；
+        移出窗口（距今超过 time_window_days 天）的日期从左端弹出并扣减。
+        同一日期重复调用时以最后一次为准。
+        """
+        history = self.signal_history
+        if history and history[-1][0] >= current_date:
+            if history[-1][0] > current_date:
+                # 日期回退（重新开始的回测）：窗口从头累积
+                history.clear()
+                self._window_selectors.clear()
+            else:
+                self._count_window_picks(history.pop()[1], -1)
+
+        while history and (current_date - history[0][0]).days > self.time_window_days:
+            self._count_window_picks(history.popleft()[1], -1)
 
-        cutoff_date = current_date - timedelta(days=self.time_window_days + 1)
-        for d in [d for d in self.signal_history.keys() if d < cutoff_date]:
-            del self.signal_history[d]
+        picks = {
+            selector_name: {s.code for s in signals}
+            for selector_name, signals in signals_by_selector.items()
+        }
+        history.append((current_date, picks))
+        self._count_window_picks(picks, 1)
+
+    def _count_window_picks(self, picks: Dict[str, Set[str]], delta: int) -> None:
+        """把一天的 {selector: codes} 计入 (delta=1) 或移出 (delta=-1) _window_selectors。"""
+        window = self._window_selectors
+        for selector_name, codes in picks.items():
+            for code in codes:
+                counts = window.get(code)
+                if counts is None:
+                    counts = window[code] = {}
+                n = counts.get(selector_name, 0) + delta
+                if n > 0:
+                    counts[selector_name] = n
+                else:
+                    counts.pop(selector_name, None)
+                    if not counts:
+                        del window[code]
 
     def _apply_sequential_confirmation(
         self,
@@ -1024,7 +1970,10 @@ class BacktestEngine:
                     'expiration_date': expiration_date,
                     'trigger_signal': signal,
                 }
-                self.log(f"  TRIGGER: {signal.code} ({signal.strategy_alias}) - awaiting confirmation by {expiration_date.date()}")
+                self.debug(
+                    "  TRIGGER: %s (%s) - awaiting confirmation by %s",
+                    signal.code, signal.strategy_alias, expiration_date.date(),
+                )
 
         confirmed_codes = self._evaluate_confirm_logic(confirm_signals)
         confirmed_signals = []
@@ -1032,7 +1981,10 @@ class BacktestEngine:
         for code in confirmed_codes:
             if code in self.pending_triggers:
                 pending = self.pending_triggers[code]
-                self.log(f"  CONFIRMED: {code} (trigger: {pending['trigger_date'].date()}, confirm: {current_date.date()})")
+                self.debug(
+                    "  CONFIRMED: %s (trigger: %s, confirm: %s)",
+                    code, pending['trigger_date'].date(), current_date.date(),
+                )
 
                 if self.buy_timing == "trigger_day":
                     buy_signal = pending['trigger_signal']
@@ -1059,7 +2011,7 @@ class BacktestEngine:
         ]
         for code in expired_codes:
             pending = self.pending_triggers[code]
-            self.log(f"  EXPIRED: {code} (triggered {pending['trigger_date'].date()}, no confirmation)")
+            self.debug("  EXPIRED: %s (triggered %s, no confirmation)", code, pending['trigger_date'].date())
             del self.pending_triggers[code]
 
         return confirmed_signals
@@ -1070,18 +2022,7 @@ class BacktestEngine:
     ) -> List[BuySignal]:
         """Evaluate trigger logic (AND/OR) on trigger_selectors."""
         if self.trigger_logic == "OR":
-            all_signals = []
-            for signals in trigger_signals.values():
-                all_signals.extend(signals)
-
-            signals_by_code: Dict[str, BuySignal] = {}
-            for signal in all_signals:
-                if signal.code not in signals_by_code:
-                    signals_by_code[signal.code] = signal
-                elif signal.score > signals_by_code[signal.code].score:
-                    signals_by_code[signal.code] = signal
-
-            return list(signals_by_code.values())
+            return _best_per_code(chain.from_iterable(trigger_signals.values()))
 
         elif self.trigger_logic == "AND":
             if len(trigger_signals) < len(self.trigger_selectors):
@@ -1098,7 +2039,7 @@ class BacktestEngine:
             for code, signals in signals_by_code_list.items():
                 selector_names = {s.strategy_name for s in signals}
                 if len(selector_names) >= len(self.trigger_selectors):
-                    best_signal = max(signals, key=lambda s: s.score)
+                    best_signal = max(signals, key=_BY_SCORE)
                     final_signals.append(best_signal)
 
             return final_signals
@@ -1144,21 +2085,31 @@ class BacktestEngine:
     # ══════════════════════════════════════════════════════════════════
 
     def check_sell_signals(
-        self, date: datetime, cancel_check: Optional[Any] = None
+        self,
+        date: datetime,
+        cancel_event: Optional[Any] = None,
+        today_rows: Optional[Mapping] = None,
+        quotes: Optional[Mapping] = None,
     ) -> List[Tuple[str, str]]:
         """
         Check sell conditions for all positions.
 
         [优化P1-2] 使用 ThreadPoolExecutor 并行检查持仓：
-        - 持仓间完全独立，无共享可变状态
+        - 持仓间完全独立；卖出策略若在实例上缓存状态（如 MultipleRExitStrategy
+          的初始风险），须自行保证并发调用安全
         - pandas/numpy 计算在 C 层释放 GIL，线程并行有效
         - 使用 searchsorted 代替布尔过滤获取当日行数据
+        - 卖出策略支持批量判断时（supports_batch），改为对全部持仓的一次向量化调用
 
         CRITICAL: Prevents lookahead bias by only using data up to current date.
 
         Args:
             date: Current date
-            cancel_check: Optional callable to check if backtest is cancelled
+            cancel_event: Optional event (threading/multiprocessing Event);
+                checking stops once it is set
+            today_rows: Optional {code: 当日行}，run() 第 3 步已为持仓取好的当日行；
+                缺省时逐只调用 _today_row
+            quotes: Optional 当日行情快照（DailyQuotes）；批量判断时从中一次取出全部持仓收盘价
 
         Returns:
             List of (code, exit_reason) tuples
@@ -1166,16 +2117,19 @@ class BacktestEngine:
         # 确保缓存已更新（_parallel_select 可能已经调用过，这里只是确认）
         self._get_data_up_to_date(date)
 
-        positions = list(self.portfolio.positions.values())
+        # 持仓簿缓存的持仓列表（开仓 / 平仓后才重建），不必每日复制 positions.values()；只读
+        positions = self.portfolio.position_book()[1]
         if not positions:
             return []
 
-        date_np = np.datetime64(date, 'ns')
+        if self.sell_strategy.supports_batch():
+            return self._check_sell_signals_batch(date, positions, cancel_event, today_rows, quotes)
 
-        def _check_one(position) -> Optional[Tuple[str, str]]:
-            if cancel_check and cancel_check():
+        def _check_one(item: Tuple[int, Any]) -> Optional[Tuple[str, str]]:
+            if cancel_event is not None and cancel_event.is_set():
                 return None
 
+            i, position = item
             code = position.code
 
             # 从缓存获取截至今日的历史数据
@@ -1183,46 +2137,127 @@ class BacktestEngine:
             if df_up_to_date is None or len(df_up_to_date) == 0:
                 return None
 
-            # [优化P1-1] searchsorted 查找今日数据行
-            arr = self._date_arrays.get(code)
-            if arr is not None:
-                idx = int(np.searchsorted(arr, date_np, side='left'))
-                if idx < len(arr) and arr[idx] == date_np:
-                    current_data = self.market_data[code].iloc[idx]
-                else:
-                    return None   # 今日无数据（可能停牌）
+            if today_rows is not None:
+                current_data = today_rows.get(code)
             else:
-                # fallback
-                df_today = df_up_to_date[df_up_to_date['date'] == date]
-                if len(df_today) == 0:
-                    return None
-                current_data = df_today.iloc[-1]
+                current_data = self._today_row(code, date)
+            if current_data is None:
+                return None   # 今日无数据（可能停牌）
 
             try:
-                should_sell, reason = self.sell_strategy.should_sell(
-                    position=position,
-                    current_date=date,
-                    current_data=current_data,
-                    hist_data=df_up_to_date,
-                    indicators=current_data if self.use_indicator_db else None
-                )
+                if batch_part:
+                    should_sell, reason = self.sell_strategy.should_sell(
+                        position=position,
+                        current_date=date,
+                        current_data=current_data,
+                        hist_data=df_up_to_date,
+                        indicators=current_data if self.use_indicator_db else None,
+                        batch_part=batch_part,
+                        batch_row=i,
+                    )
+                else:
+                    should_sell, reason = self.sell_strategy.should_sell(
+                        position=position,
+                        current_date=date,
+                        current_data=current_data,
+                        hist_data=df_up_to_date,
+                        indicators=current_data if self.use_indicator_db else None
+                    )
                 return (code, reason) if should_sell else None
 
             except Exception as e:
                 self.log(f"Error checking sell for {code}: {e}")
                 return None
 
+        # 组合策略中只依赖收盘价的子规则：对全部持仓一次向量化求值，
+        # 逐只检查时只需再跑依赖历史的子规则（ALL 组合下未通过预筛的持仓直接跳过）
+        batch_part = None
+        batch_part_fn = getattr(self.sell_strategy, 'batch_part', None)
+        if batch_part_fn is not None and getattr(quotes, 'take', None) is not None:
+            _, _, shares, cost = self.portfolio.position_book()
+            _, (close, _, _, _) = self.portfolio.book_quotes(quotes)
+            try:
+                batch_part = batch_part_fn(
+                    positions, close,
+                    PositionArrays(positions, shares=shares, cost_basis=cost),
+                )
+            except Exception as e:
+                self.log(f"Error checking sells in batch: {e}")
+
         # 持仓少时直接串行，避免线程创建开销
         if len(positions) <= 3:
-            return [r for r in (_check_one(p) for p in positions) if r is not None]
+            return [r for r in map(_check_one, enumerate(positions)) if r is not None]
 
         # 持仓多时并行化（ThreadPoolExecutor，共享 data_cache 内存，无需序列化）
         n_threads = min(8, len(positions))
         with ThreadPoolExecutor(max_workers=n_threads) as pool:
-            results = list(pool.map(_check_one, positions))
+            results = list(pool.map(_check_one, enumerate(positions)))
 
         return [r for r in results if r is not None]
 
+    def _check_sell_signals_batch(
+        self,
+        date: datetime,
+        positions: List[Any],
+        cancel_event: Optional[Any],
+        today_rows: Optional[Mapping],
+        quotes: Optional[Mapping],
+    ) -> List[Tuple[str, str]]:
+        """
+        卖出规则只依赖持仓状态与当日收盘价时（sell_strategy.supports_batch()），
+        把全部持仓的收盘价收集成一个数组，一次调用 should_sell_batch 得出结果。
+
+        跳过条件与逐只路径一致：无历史数据或今日无行情（停牌）的持仓不检查。
+        传入面板快照时，收盘价由 DailyQuotes.take 一次 gather（当日有行情即有历史）。
+        """
+        if cancel_event is not None and cancel_event.is_set():
+            return []
+
+        if getattr(quotes, 'take', None) is not None:
+            # 与第 3 步持仓指标更新共用同一次 gather（PortfolioManager.book_quotes 单日缓存）
+            _, book_positions, shares, cost = self.portfolio.position_book()
+            present, (close, _, _, _) = self.portfolio.book_quotes(quotes)
+            idx = np.flatnonzero(present)
+            if len(idx) == 0:
+                return []
+            checked = [book_positions[i] for i in idx]
+            # 持仓簿里已有的股数 / 成本列直接复用，不再逐个 Position 读取
+            arrays = PositionArrays(checked, shares=shares[idx], cost_basis=cost[idx])
+            return self._dispatch_sell_batch(checked, close[idx], arrays)
+
+        checked = []
+        closes = []
+        for position in positions:
+            code = position.code
+            df_up_to_date = self.data_cache.get(code)
+            if df_up_to_date is None or len(df_up_to_date) == 0:
+                continue
+            if today_rows is not None:
+                current_data = today_rows.get(code)
+            else:
+                current_data = self._today_row(code, date)
+            if current_data is None:
+                continue
+            checked.append(position)
+            closes.append(current_data['close'])
+
+        if not checked:
+            return []
+        return self._dispatch_sell_batch(checked, np.asarray(closes, dtype=float))
+
+    def _dispatch_sell_batch(
+        self, checked: List[Any], close: np.ndarray,
+        arrays: Optional[PositionArrays] = None,
+    ) -> List[Tuple[str, str]]:
+        """对已筛出的持仓调用一次 should_sell_batch，返回 (code, reason) 列表。"""
+        try:
+            mask, reasons = self.sell_strategy.should_sell_batch(checked, close, arrays)
+        except Exception as e:
+            self.log(f"Error checking sells in batch: {e}")
+            return []
+
+        return [(checked[i].code, reasons[i]) for i in np.flatnonzero(mask)]
+
     # ══════════════════════════════════════════════════════════════════
     # 买入订单处理
     # ══════════════════════════════════════════════════════════════════
@@ -1231,7 +2266,7 @@ class BacktestEngine:
         self,
         date: datetime,
         buy_signals: List[BuySignal],
-        current_market_data: Dict[str, pd.Series]
+        current_market_data: Mapping
     ) -> int:
         """
         Process buy signals with fallback mechanism.
@@ -1242,7 +2277,16 @@ class BacktestEngine:
         signals_attempted = 0
         orders_created = 0
 
-        for signal in buy_signals:
+        # 面板快照：全部信号的当日收盘价一次 gather，循环内按下标取值
+        take = getattr(current_market_data, 'take', None)
+        if take is not None and buy_signals:
+            signal_present, (signal_close,) = take(
+                [signal.code for signal in buy_signals], ('close',)
+            )
+        else:
+            signal_present = signal_close = None
+
+        for i, signal in enumerate(buy_signals):
             if not self.portfolio.can_open_new_position():
                 self.log(
                     f"  Position limit reached ({self.portfolio.max_positions}), "
@@ -1250,17 +2294,27 @@ class BacktestEngine:
                 )
                 break
 
-            if signal.code not in current_market_data:
+            if signal_present is not None:
+                has_quote = bool(signal_present[i])
+            else:
+                has_quote = signal.code in current_market_data
+            if not has_quote:
                 signals_attempted += 1
-                self.log(f"  SKIPPED: {signal.code} ({signal.strategy_alias}) - no market data")
+                self.debug("  SKIPPED: %s (%s) - no market data", signal.code, signal.strategy_alias)
                 continue
 
-            current_price = current_market_data[signal.code]['close']
+            if signal_close is not None:
+                current_price = signal_close[i]
+            else:
+                current_price = current_market_data[signal.code]['close']
 
             df_up_to_date = self.data_cache.get(signal.code)
             if df_up_to_date is None:
                 df = self.market_data[signal.code]
-                df_up_to_date = df[df['date'] <= date]
+                end = int(np.searchsorted(
+                    self._date_array(signal.code), np.datetime64(date, 'ns'), side='right'
+                ))
+                df_up_to_date = df.iloc[:end]
 
             order = self.portfolio.generate_buy_order(
                 code=signal.code,
@@ -1275,14 +2329,14 @@ class BacktestEngine:
 
             if order:
                 orders_created += 1
-                self.log(
-                    f"  BUY SIGNAL #{orders_created}: {signal.code} "
-                    f"({signal.strategy_alias}) {order.shares} shares @ ~{current_price:.2f}"
+                self.debug(
+                    "  BUY SIGNAL #%d: %s (%s) %s shares @ ~%.2f",
+                    orders_created, signal.code, signal.strategy_alias, order.shares, current_price,
                 )
             else:
-                self.log(
-                    f"  SKIPPED: {signal.code} ({signal.strategy_alias}) @ {current_price:.2f} - "
-                    f"insufficient cash or duplicate position"
+                self.debug(
+                    "  SKIPPED: %s (%s) @ %.2f - insufficient cash or duplicate position",
+                    signal.code, signal.strategy_alias, current_price,
                 )
 
         self.log(
@@ -1345,17 +2399,22 @@ class BacktestEngine:
             self.log("warmup_score_history: no selectors loaded, skipping")
             return
 
-        warmup_date_set: set = set()
-        for df in self.market_data.values():
-            pre_dates = df[df['date'] < self.start_date]['date']
-            warmup_date_set.update(pre_dates.tolist())
-        all_warmup_dates = sorted(warmup_date_set)
+        # 各股票日期已排序：开始日之前的部分就是日期数组的前缀
+        start64 = np.datetime64(self.start_date, 'ns')
+        pre_parts = []
+        for code in self.market_data:
+            arr = self._date_array(code)
+            pre_parts.append(arr[:int(np.searchsorted(arr, start64, side='left'))])
+        # 在 datetime64 数组上去重、取尾部，只把实际要用的日期转换为 Timestamp
+        all_warmup_dates = (
+            np.unique(np.concatenate(pre_parts)) if pre_parts else np.empty(0, 'datetime64[ns]')
+        )
 
-        if not all_warmup_dates:
+        if not len(all_warmup_dates):
             self.log("warmup_score_history: no warmup dates available (check lookback_days)")
             return
 
-        warmup_dates = all_warmup_dates[-self.score_warmup_lookback_days:]
+        warmup_dates = pd.DatetimeIndex(all_warmup_dates[-self.score_warmup_lookback_days:]).tolist()
         skipped = len(all_warmup_dates) - len(warmup_dates)
         if skipped > 0:
             self.log(
@@ -1372,7 +2431,7 @@ class BacktestEngine:
         if force_legacy and self.use_indicator_db:
             self.use_indicator_db = False
             for info in self.buy_selectors:
-                sel = info['instance']
+                sel = info.instance
                 if hasattr(sel, 'indicator_store'):
                     saved_selector_stores[id(sel)] = sel.indicator_store
                     sel.indicator_store = None
@@ -1393,7 +2452,7 @@ class BacktestEngine:
             if force_legacy and saved_engine_db:
                 self.use_indicator_db = saved_engine_db
                 for info in self.buy_selectors:
-                    sel = info['instance']
+                    sel = info.instance
                     if id(sel) in saved_selector_stores:
                         sel.indicator_store = saved_selector_stores[id(sel)]
 
@@ -1416,12 +2475,18 @@ class BacktestEngine:
     # 主事件循环
     # ══════════════════════════════════════════════════════════════════
 
-    def run(self, progress_callback: Optional[Any] = None, cancel_check: Optional[Any] = None):
+    def run(self, progress_callback: Optional[Any] = None, cancel_event: Optional[Any] = None):
         """
         Run backtest.
 
         Main event loop over trading dates.
         [优化P0-1] run() 结束后（无论正常还是异常）在 finally 块中关闭进程池。
+
+        Args:
+            progress_callback: Optional callable(done, total, date)
+            cancel_event: Optional event object exposing is_set()
+                (threading.Event / multiprocessing.Event)；每个交易日开始时
+                直接读取标志，不再经由 Python 回调闭包
         """
         self.log("\n" + "="*80)
         self.log("BACKTEST START")
@@ -1432,54 +2497,94 @@ class BacktestEngine:
         self.portfolio.set_trading_dates(self.trading_dates)
         # ──────────────────────────────────────────────────────────────
 
+        self._console_buf = []
         try:
             total_days = len(self.trading_dates)
 
-            for idx, date in enumerate(self.trading_dates, start=1):
-                if cancel_check and cancel_check():
+            for bar, date in enumerate(self.trading_dates):
+                if cancel_event is not None and cancel_event.is_set():
                     self.log("BACKTEST CANCELLED")
                     break
-
-                self.log(f"\n--- {date.date()} ---")
-                self.log(
-                    f"  Cash: {self.portfolio.cash:,.2f}, "
-                    f"Available: {self.portfolio.get_available_cash():,.2f}, "
-                    f"Positions: {len(self.portfolio.positions)}"
-                )
+                self._bar, self._bar_date = bar, date
+
+                if self.verbose:
+                    self.log(f"\n--- {date.date()} ---")
+                    self.log(
+                        f"  Cash: {self.portfolio.cash:,.2f}, "
+                        f"Available: {self.portfolio.get_available_cash():,.2f}, "
+                        f"Positions: {len(self.portfolio.positions)}"
+                    )
 
                 # 1. Process T+1 settlement
                 self.portfolio.process_settlement(date)
 
                 proceeds = self.portfolio.settlement_tracker.pending_proceeds.get(date, 0)
-                if proceeds > 0:
+                if proceeds > 0 and self.verbose:
                     self.log(f"  Settlement: +{proceeds:,.2f} proceeds received")
 
+                # [优化P1-1] 当日行情快照（交易日为面板一行的视图），T+1 撮合与持仓估值共用
+                current_market_data = self._build_current_market_data(date)
+
+                # 无挂单时跳过撮合，（撮合后仍）空仓时跳过第 3-4 步：回测初期、空仓观望期
+                # 的“安静日”不为不存在的订单 / 持仓取行情、建当日行
+                portfolio = self.portfolio
+                has_orders = bool(portfolio.pending_orders)
+
                 # 2. Execute pending buy orders from T-1
-                executed_orders = self.portfolio.execute_pending_orders(date, self.market_data)
-                from .data_structures import OrderAction, OrderStatus
+                # 交易日的快照带有前收盘，撮合不必逐单在 DataFrame 中定位当日行
+                executed_orders = portfolio.execute_pending_orders(
+                    date,
+                    current_market_data if isinstance(current_market_data, DailyQuotes)
+                    else self.market_data,
+                ) if has_orders else []
                 for order in executed_orders:
                     if order.status.value == "EXECUTED":
-                        self.log(f"  EXECUTED {order.action.value}: {order.code} x {order.shares} @ {order.execution_price:.2f}")
+                        self.debug(
+                            "  EXECUTED %s: %s x %s @ %.2f",
+                            order.action.value, order.code, order.shares, order.execution_price,
+                        )
                     else:
-                        self.log(f"  FAILED {order.action.value}: {order.code} - {order.reason}")
-
-                # 3. Update position metrics
-                # [优化P1-1] 用 searchsorted 替代全量布尔过滤构建当日行情快照
-                current_market_data = self._build_current_market_data(date)
-
-                self.portfolio.update_positions(date, current_market_data)
-
-                # 4. Check sell signals
-                # [优化P1-2] 并行检查卖出信号（ThreadPoolExecutor）
-                sell_signals = self.check_sell_signals(date, cancel_check=cancel_check)
+                        self.debug("  FAILED %s: %s - %s", order.action.value, order.code, order.reason)
+
+                sell_signals: List[Tuple[str, str]] = []
+                if portfolio.positions:
+                    # 3. Update position metrics
+                    portfolio.update_positions(date, current_market_data)
+
+                    # 逐只卖出检查需要当日行：只为持仓取一次；
+                    # 批量检查只用收盘价，直接从面板快照 gather
+                    position_rows = None
+                    if not self.sell_strategy.supports_batch():
+                        if not self.use_indicator_db and isinstance(current_market_data, DailyQuotes):
+                            # [优化] 卖出策略只读 OHLCV：直接用面板快照的 QuoteRow，
+                            # 不再为每只持仓构造一条 pd.Series
+                            position_rows = {
+                                code: current_market_data[code]
+                                for code in portfolio.positions
+                                if code in current_market_data
+                            }
+                        else:
+                            # DB 模式下当日行还要作为 indicators 传给策略，需保留全部列
+                            position_rows = {}
+                            for code in portfolio.positions:
+                                today = self._today_row(code, date)
+                                if today is not None:
+                                    position_rows[code] = today
+
+                    # 4. Check sell signals
+                    # [优化P1-2] 并行检查卖出信号（ThreadPoolExecutor）
+                    sell_signals = self.check_sell_signals(
+                        date, cancel_event=cancel_event,
+                        today_rows=position_rows, quotes=current_market_data,
+                    )
                 sell_triggered_codes: set = set()
                 for code, reason in sell_signals:
-                    if code in current_market_data:
+                    if self.verbose and code in current_market_data:
                         current_price = current_market_data[code]['close']
                         position = self.portfolio.get_position(code)
                         if position:
                             unrealized_pnl_pct = position.unrealized_pnl_pct(current_price) * 100
-                            self.log(f"  SELL SIGNAL: {code} ({reason}) P&L: {unrealized_pnl_pct:+.2f}%")
+                            self.debug("  SELL SIGNAL: %s (%s) P&L: %+.2f%%", code, reason, unrealized_pnl_pct)
                     self.portfolio.generate_sell_order(code, date, reason)
                     sell_triggered_codes.add(code)
 
@@ -1489,10 +2594,14 @@ class BacktestEngine:
 
                 # 5.5. Rotation（换仓）
                 if self.rotation_manager is not None and buy_signals:
-                    current_prices = {
-                        code: float(current_market_data[code]['close'])
-                        for code in current_market_data
-                    }
+                    if isinstance(current_market_data, DailyQuotes):
+                        # 换仓只按持仓与信号代码取价：惰性视图，不每天重建全市场 dict
+                        current_prices = current_market_data.price_view('close')
+                    else:
+                        current_prices = {
+                            code: float(current_market_data[code]['close'])
+                            for code in current_market_data
+                        }
                     rotation_pairs = self.rotation_manager.find_rotation_pairs(
                         positions=self.portfolio.positions,
                         good_signals=buy_signals,
@@ -1521,9 +2630,10 @@ class BacktestEngine:
                 # 7. Update equity curve
                 self.portfolio.update_equity_curve(date, current_market_data)
 
-                self.log(f"  Portfolio: {len(self.portfolio.positions)} positions, Cash: {self.portfolio.cash:,.0f}, Total: {self.portfolio.total_value:,.0f}")
+                if self.verbose:
+                    self.log(f"  Portfolio: {len(self.portfolio.positions)} positions, Cash: {self.portfolio.cash:,.0f}, Total: {self.portfolio.total_value:,.0f}")
                 if progress_callback:
-                    progress_callback(idx, total_days, date)
+                    progress_callback(bar + 1, total_days, date)
 
             # ── 强制平仓（回测结束）──────────────────────────────────
             if len(self.portfolio.positions) > 0:
@@ -1542,24 +2652,32 @@ class BacktestEngine:
 
                 self.portfolio.process_settlement(virtual_execution_date)
 
-                market_data_virtual = {}
-                for code, df in self.market_data.items():
-                    df_last = df[df['date'] == last_date]
-                    if len(df_last) > 0:
-                        df_virtual = df_last.copy()
-                        df_virtual['date'] = virtual_execution_date
-                        market_data_virtual[code] = pd.concat([df, df_virtual], ignore_index=True)
-                    else:
-                        market_data_virtual[code] = df
+                # 虚拟执行日的行情 = 最后一日的行情，前收盘 = 最后一日收盘。
+                # 最后一日在面板中时直接复用面板那一行（DailyQuotes），不必为每只待成交股票
+                # 复制整段历史再 concat 一行
+                last_row = self._bar_row(last_date)
+                if last_row is not None:
+                    market_data_virtual: Mapping = DailyQuotes(
+                        self._panel[last_row], self._panel_present[last_row],
+                        self._panel_codes, self._panel_col,
+                        self._panel_fields['close'][last_row],
+                    )
+                else:
+                    market_data_virtual = self._virtual_last_day_frames(
+                        last_date, virtual_execution_date
+                    )
 
                 executed_orders = self.portfolio.execute_pending_orders(virtual_execution_date, market_data_virtual)
 
                 from .data_structures import OrderAction, OrderStatus
                 for order in executed_orders:
                     if order.status.value == "EXECUTED":
-                        self.log(f"  EXECUTED {order.action.value}: {order.code} x {order.shares} @ {order.execution_price:.2f}")
+                        self.debug(
+                            "  EXECUTED %s: %s x %s @ %.2f",
+                            order.action.value, order.code, order.shares, order.execution_price,
+                        )
                     else:
-                        self.log(f"  FAILED {order.action.value}: {order.code} - {order.reason}")
+                        self.debug("  FAILED %s: %s - %s", order.action.value, order.code, order.reason)
 
                 # [优化P1-1] 强制平仓后的最终行情也用 searchsorted
                 final_market_data = self._build_current_market_data(last_date)
@@ -1575,6 +2693,13 @@ class BacktestEngine:
             self.log("="*80 + "\n")
 
         finally:
+            self._bar, self._bar_date = -1, None
+            with self._console_lock:
+                self._flush_console_locked()
+                self._console_buf = None
+            if self._selector_pool is not None:
+                self._selector_pool.shutdown(wait=True)
+                self._selector_pool = None
             # [优化P0-1] 无论正常结束还是异常，都关闭长驻进程池
             if self._executor is not None:
                 self._executor.shutdown(wait=True)
@@ -1585,14 +2710,31 @@ class BacktestEngine:
     # 结果 & 日志
     # ══════════════════════════════════════════════════════════════════
 
-    def get_results(self) -> Dict[str, Any]:
-        """Get backtest results."""
+    def get_results(self, format: str = 'records') -> Dict[str, Any]:
+        """
+        Get backtest results.
+
+        format 决定 equity_curve / trades 的形态：
+          - 'records'：list[dict]，逐行一个 dict（默认，保持兼容；长回测时分配量最大）
+          - 'columnar'：dict[列名, list]，每列一个列表
+          - 'dataframe'：直接返回 DataFrame，需要 records 的调用方自行按需转换
+        """
+        if format not in RESULT_FORMATS:
+            raise ValueError(
+                f"Unknown results format: {format!r} (expected one of {RESULT_FORMATS})"
+            )
         equity_curve = self.portfolio.get_equity_curve_df()
         trades = self.portfolio.get_trades_df()
+        if format == 'records':
+            equity_curve = equity_curve.to_dict('records') if not equity_curve.empty else []
+            trades = trades.to_dict('records') if not trades.empty else []
+        elif format == 'columnar':
+            equity_curve = equity_curve.to_dict('list')
+            trades = trades.to_dict('list')
 
         results = {
-            'equity_curve': equity_curve.to_dict('records') if not equity_curve.empty else [],
-            'trades': trades.to_dict('records') if not trades.empty else [],
+            'equity_curve': equity_curve,
+            'trades': trades,
             'final_value': self.portfolio.total_value,
             'total_return': (self.portfolio.total_value - self.portfolio.initial_capital) / self.portfolio.initial_capital,
             'num_trades': len(self.portfolio.trades),
@@ -1605,19 +2747,108 @@ class BacktestEngine:
         return results
 
     def log(self, message: str):
-        """Log message to console and internal log."""
-        print(message)
-        self.logs.append(message)
+        """
+        Log message to console and internal log.
+
+        run() 期间控制台输出先进缓冲，满 CONSOLE_FLUSH_LINES 行或回测结束时一次写出。
+        """
+        with self._console_lock:
+            buf = self._console_buf
+            if buf is not None:
+                buf.append(message)
+                if len(buf) >= CONSOLE_FLUSH_LINES:
+                    self._flush_console_locked()
+        if buf is None:
+            print(message)
+        if self.capture_logs:
+            self.logs.append(message)
         if self.log_callback:
             try:
                 self.log_callback(message)
             except Exception:
                 pass
 
+    def debug(self, fmt: str, *args):
+        """
+        [优化] 逐信号/逐订单的明细日志：verbose=False 时直接返回，
+        不做任何字符串格式化（参数按 % 风格延迟格式化）。
+        """
+        if self.verbose:
+            self.log(fmt % args if args else fmt)
+
+    def _flush_console(self):
+        """把缓冲的控制台日志一次性写出。"""
+        with self._console_lock:
+            self._flush_console_locked()
+
+    def _flush_console_locked(self):
+        """_flush_console 的实际写出；调用方须持有 _console_lock。"""
+        buf = self._console_buf
+        if buf:
+            self._console_buf = []
+            sys.stdout.write('\n'.join(buf) + '\n')
+
     # ══════════════════════════════════════════════════════════════════
     # 指标提取
     # ══════════════════════════════════════════════════════════════════
 
+    def _extract_indicators_batch(
+        self,
+        codes: List[str],
+        data_up_to_date: Dict[str, pd.DataFrame],
+        cache: Dict[str, Dict[str, float]],
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        批量提取一组入选股票的指标。
+
+        cache 由调用方按交易日持有：同一天被多个选股器选中的股票只计算一次。
+        不在 data_up_to_date 中的代码直接跳过。
+        """
+        result: Dict[str, Dict[str, float]] = {}
+        for code in codes:
+            df_code = data_up_to_date.get(code)
+            if df_code is None:
+                continue
+            ind = cache.get(code)
+            if ind is None:
+                ind = self._extract_indicators(code, df_code.iloc[-1], df_code)
+                cache[code] = ind
+            result[code] = ind
+        return result
+
+    def _legacy_indicator_lines(
+        self, code: str, df_full: pd.DataFrame
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        legacy 模式下截至 df_full 末行的 (J, BBI) 序列。
+
+        KDJ（滚动极值 + adjust=False 的 ewm）与 BBI（滚动均值）都是因果的：
+        截至某日的值与只用该日之前数据算出的值逐位相同。因此每只股票只在首次用到时
+        对 market_data 中的整段历史计算一次并缓存，之后按 df_full 的长度截取，
+        不再每个信号日对整段前缀重算（整个回测 O(T) 而非 O(T²)）。
+        df_full 不是 market_data[code] 的前缀时直接对它计算。
+
+        缓存项记录计算所用的 DataFrame，只有它仍是当前的 market_data[code] 时才复用：
+        经 preload_state() 在多次回测间共享缓存时，price_dtype 转换换掉的行情不会误用旧结果。
+        """
+        self._bind_indicator_functions()
+        n = len(df_full)
+        full = self.market_data.get(code)
+        if (
+            full is None or len(full) < n
+            or full.index[n - 1] != df_full.index[-1]
+        ):
+            # 只需 J 末值：compute_kdj_lines 不复制 df_full
+            _, _, j_values = self._compute_kdj_lines(df_full)
+            return j_values, np.asarray(self._compute_bbi(df_full), dtype=float)
+
+        lines = self._legacy_indicators.get(code)
+        if lines is None or lines[0] is not full:
+            _, _, j_values = self._compute_kdj_lines(full)
+            lines = (full, j_values, np.asarray(self._compute_bbi(full), dtype=float))
+            self._legacy_indicators[code] = lines
+        return lines[1][:n], lines[2][:n]
+
     def _extract_indicators(
         self,
         code: str,
@@ -1647,7 +2878,10 @@ class BacktestEngine:
                 ma20_vol = float(last_row['ma20_volume'])
                 volume_ratio = volume / ma20_vol if ma20_vol > 0 else 0.0
             elif df_full is not None and len(df_full) >= 2 and 'volume' in df_full.columns:
-                avg_vol = float(df_full['volume'].tail(20).mean())
+                # [优化] 直接在 ndarray 上取最近 20 个有效值求均值
+                recent_vol = df_full['volume'].to_numpy(dtype=float)[-20:]
+                recent_vol = recent_vol[~np.isnan(recent_vol)]
+                avg_vol = float(recent_vol.mean()) if recent_vol.size else float('nan')
                 volume_ratio = volume / avg_vol if avg_vol > 0 else 0.0
             else:
                 volume_ratio = 0.0
@@ -1655,25 +2889,23 @@ class BacktestEngine:
             if 'daily_return' in last_row.index and not pd.isna(last_row['daily_return']):
                 daily_return = float(last_row['daily_return'])
             elif df_full is not None and len(df_full) >= 2 and 'close' in df_full.columns:
-                df_sorted = df_full.sort_values('date')
-                prev = float(df_sorted['close'].iloc[-2])
-                curr = float(df_sorted['close'].iloc[-1])
+                # 行情在 load_data 中已按日期排序，无需再 sort_values
+                close = df_full['close'].to_numpy(dtype=float)
+                prev = float(close[-2])
+                curr = float(close[-1])
                 daily_return = (curr - prev) / prev if prev > 0 else 0.0
             else:
                 daily_return = 0.0
 
-            if 'bbi' in last_row.index and df_full is not None and len(df_full) >= 2:
-                bbi_series = df_full['bbi'] if 'bbi' in df_full.columns else None
-                if bbi_series is not None and len(bbi_series.dropna()) >= 2:
-                    recent = bbi_series.dropna().tail(2)
-                    if len(recent) == 2:
-                        bbi_slope = float(recent.iloc[-1]) - float(recent.iloc[-2])
-                    else:
-                        bbi_slope = 0.0
-                else:
-                    bbi_slope = 0.0
-            else:
-                bbi_slope = 0.0
+            bbi_slope = 0.0
+            if (
+                'bbi' in last_row.index and df_full is not None
+                and len(df_full) >= 2 and 'bbi' in df_full.columns
+            ):
+                bbi = df_full['bbi'].to_numpy(dtype=float)
+                valid = np.flatnonzero(~np.isnan(bbi))
+                if valid.size >= 2:
+                    bbi_slope = float(bbi[valid[-1]]) - float(bbi[valid[-2]])
 
             return {
                 'kdj_j': kdj_j if not np.isnan(kdj_j) else 0.0,
@@ -1685,27 +2917,32 @@ class BacktestEngine:
         # 路径2：legacy 模式，实时计算指标
         if df_full is not None and len(df_full) > 0:
             try:
-                from utils.indicators import compute_kdj, compute_bbi
-                kdj_result = compute_kdj(df_full)
-                kdj_j = float(kdj_result['J'].iloc[-1]) if 'J' in kdj_result.columns else 0.0
+                j_values, bbi = self._legacy_indicator_lines(code, df_full)
+                kdj_j = float(j_values[-1])
 
+                # [优化] 以下均在 ndarray 上取值，避免 .iloc / .tail 的 Series 构造开销
                 if len(df_full) >= 2 and 'volume' in df_full.columns:
-                    avg_vol = float(df_full['volume'].tail(20).mean())
-                    curr_vol = float(df_full['volume'].iloc[-1])
+                    vol = df_full['volume'].to_numpy(dtype=float)
+                    recent_vol = vol[-20:]
+                    recent_vol = recent_vol[~np.isnan(recent_vol)]
+                    avg_vol = float(recent_vol.mean()) if recent_vol.size else float('nan')
+                    curr_vol = float(vol[-1])
                     volume_ratio = curr_vol / avg_vol if avg_vol > 0 else 0.0
                 else:
                     volume_ratio = 0.0
 
                 if len(df_full) >= 2 and 'close' in df_full.columns:
-                    prev = float(df_full['close'].iloc[-2])
-                    curr = float(df_full['close'].iloc[-1])
+                    close = df_full['close'].to_numpy(dtype=float)
+                    prev = float(close[-2])
+                    curr = float(close[-1])
                     daily_return = (curr - prev) / prev if prev > 0 else 0.0
                 else:
                     daily_return = 0.0
 
-                bbi_series = compute_bbi(df_full)
-                recent = bbi_series.dropna().tail(2)
-                bbi_slope = float(recent.iloc[-1]) - float(recent.iloc[-2]) if len(recent) == 2 else 0.0
+                valid = np.flatnonzero(~np.isnan(bbi))
+                bbi_slope = (
+                    float(bbi[valid[-1]]) - float(bbi[valid[-2]]) if valid.size >= 2 else 0.0
+                )
 
                 return {
                     'kdj_j': kdj_j,
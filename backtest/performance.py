@@ -96,7 +96,10 @@ class PerformanceAnalyzer:
             if len(self.equity_curve) > 0:
                 start_date = pd.to_datetime(self.equity_curve['date'].iloc[0])
                 end_date = pd.to_datetime(self.equity_curve['date'].iloc[-1])
-                df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
+                dates = df['date'].to_numpy()
+                lo = dates.searchsorted(np.datetime64(start_date, 'ns'), side='left')
+                hi = dates.searchsorted(np.datetime64(end_date, 'ns'), side='right')
+                df = df.iloc[lo:hi]
 
             self.benchmark_data = df
             logger.info(f"Loaded benchmark {self.benchmark_name}: {len(df)} records")
@@ -212,12 +215,8 @@ class PerformanceAnalyzer:
         if len(self.equity_curve) < 2:
             return {}
 
-        # Calculate daily returns
-        equity = self.equity_curve.copy()
-        equity['daily_return'] = equity['total_value'].pct_change()
-
-        # Drop NaN
-        daily_returns = equity['daily_return'].dropna()
+        # Calculate daily returns (drop the leading NaN)
+        daily_returns = self.equity_curve['total_value'].pct_change().dropna()
 
         if len(daily_returns) == 0:
             return {}
@@ -269,12 +268,11 @@ class PerformanceAnalyzer:
         max_dd = self._calculate_max_drawdown()
 
         # Calculate drawdown duration
-        equity = self.equity_curve.copy()
-        equity['cummax'] = equity['total_value'].cummax()
-        equity['drawdown'] = (equity['total_value'] - equity['cummax']) / equity['cummax']
+        total_value = self.equity_curve['total_value']
+        cummax = total_value.cummax()
 
         # Find drawdown periods
-        in_drawdown = equity['drawdown'] < 0
+        in_drawdown = (total_value - cummax) / cummax < 0
         drawdown_periods = []
         current_period_length = 0
 
@@ -304,17 +302,19 @@ class PerformanceAnalyzer:
         if len(self.equity_curve) == 0:
             return {'max_drawdown': 0, 'max_drawdown_pct': 0}
 
-        equity = self.equity_curve.copy()
-        equity['cummax'] = equity['total_value'].cummax()
-        equity['drawdown'] = equity['total_value'] - equity['cummax']
-        equity['drawdown_pct'] = equity['drawdown'] / equity['cummax'] * 100
+        # 只读 equity_curve：回撤按列（Series）计算，不复制整张表
+        equity = self.equity_curve
+        total_value = equity['total_value']
+        cummax = total_value.cummax()
+        drawdown = total_value - cummax
+        drawdown_pct = drawdown / cummax * 100
 
-        max_dd_idx = equity['drawdown'].idxmin()
-        max_dd = equity.loc[max_dd_idx, 'drawdown']
-        max_dd_pct = equity.loc[max_dd_idx, 'drawdown_pct']
+        max_dd_idx = drawdown.idxmin()
+        max_dd = drawdown.loc[max_dd_idx]
+        max_dd_pct = drawdown_pct.loc[max_dd_idx]
 
         # Find peak before max drawdown
-        peak_idx = equity.loc[:max_dd_idx, 'total_value'].idxmax()
+        peak_idx = total_value.loc[:max_dd_idx].idxmax()
 
         return {
             'max_drawdown': max_dd,
@@ -333,7 +333,7 @@ class PerformanceAnalyzer:
                 'win_rate': 0.0
             }
 
-        trades = self.trades.copy()
+        trades = self.trades
 
         # Winning and losing trades
         winning_trades = trades[trades['net_pnl'] > 0]
@@ -388,7 +388,7 @@ class PerformanceAnalyzer:
         if len(self.trades) == 0:
             return {}
 
-        trades = self.trades.copy()
+        trades = self.trades
 
         # Exit reason distribution
         exit_reasons = trades['exit_reason'].value_counts().to_dict()
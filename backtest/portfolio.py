@@ -15,8 +15,9 @@ v2 (current):
   FIX-5  get_available_cash: 扣除 pending buy orders 成本，但只计算真实交易日的订单
 """
 
+from bisect import bisect_right
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Dict, List, Mapping, Optional, Set, Tuple
 import pandas as pd
 import numpy as np
 
@@ -24,6 +25,13 @@ from .data_structures import Position, Order, Trade, OrderAction, OrderStatus
 from .execution import ExecutionEngine, T1SettlementTracker
 
 
+# book_quotes() 一次取出的持仓行情字段：估值、持仓指标更新、卖出检查共用
+BOOK_QUOTE_FIELDS = ('close', 'high', 'low', 'volume')
+
+# T+1 撮合校验所需的当日行情字段（execute_pending_orders 对当日到期订单一次取出）
+FILL_QUOTE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
 class PortfolioManager:
     """
     Manages portfolio positions and cash.
@@ -46,6 +54,14 @@ class PortfolioManager:
 
         # Positions
         self.positions: Dict[str, Position] = {}
+        # 持仓的列式视图 (codes, positions, shares, cost_basis)，与 positions 同序；
+        # 开仓 / 平仓时置 None，下次 position_book() 调用时重建
+        self._book: Optional[Tuple[List[str], List[Position], np.ndarray, np.ndarray]] = None
+        # (当日快照, 持仓簿, present, values)：book_quotes() 的单日缓存
+        self._book_quotes: Optional[tuple] = None
+        # (持仓簿, (n, 5) 极值数组)：持仓以来的最高 / 最低价，随持仓簿重建，
+        # 每日只在数组上原地刷新，不再逐持仓收集属性
+        self._book_extremes: Optional[tuple] = None
 
         # Orders
         self.pending_orders: List[Order] = []
@@ -76,11 +92,15 @@ class PortfolioManager:
         若 trading_dates 未注入（旧用法兼容），退化为日历 +1 天。
         这是修复"周末僵尸订单"的关键：周五信号 → 下一个交易日是下周一，
         而非日历上的周六（周六永远不会被 execute_pending_orders 处理到）。
+
+        [优化] 交易日历已排序：bisect 二分定位（O(log D)），
+        不再对每笔订单从头线性扫描整个日历。
         """
-        if self._trading_dates:
-            for td in self._trading_dates:
-                if td > signal_date:
-                    return td
+        dates = self._trading_dates
+        if dates:
+            i = bisect_right(dates, signal_date)
+            if i < len(dates):
+                return dates[i]
         # 未注入或超出范围，退化为 +1
         return signal_date + timedelta(days=1)
 
@@ -93,12 +113,52 @@ class PortfolioManager:
     # Equity curve
     # ──────────────────────────────────────────────────────────────
 
+    def position_book(self) -> Tuple[List[str], List[Position], np.ndarray, np.ndarray]:
+        """
+        持仓的列式视图：(codes, positions, shares, cost_basis)，顺序与 self.positions 一致。
+
+        股数与成本在持仓期间不变，只在开仓 / 平仓后重建一次；
+        每日的估值与指标更新直接对数组运算，不再逐个读 Position 属性。
+        """
+        if self._book is None:
+            codes = list(self.positions)
+            positions = list(self.positions.values())
+            n = len(positions)
+            shares = np.fromiter((p.shares for p in positions), dtype=float, count=n)
+            cost = np.fromiter((p.cost_basis for p in positions), dtype=float, count=n)
+            self._book = (codes, positions, shares, cost)
+        return self._book
+
+    def book_quotes(self, market_data: Mapping) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        持仓簿在当日快照（DailyQuotes）上的行情：(present, values)，
+        values 形状为 (len(BOOK_QUOTE_FIELDS), n_positions)。
+
+        同一快照、同一持仓簿只 gather 一次：持仓指标更新、卖出检查与收盘估值
+        在同一个 bar 内读取的是同一块数组。开仓 / 平仓会重建持仓簿，缓存随之失效。
+        """
+        book = self.position_book()
+        cached = self._book_quotes
+        if cached is not None and cached[0] is market_data and cached[1] is book:
+            return cached[2], cached[3]
+        present, values = market_data.take(book[0], BOOK_QUOTE_FIELDS)
+        self._book_quotes = (market_data, book, present, values)
+        return present, values
+
     def update_equity_curve(self, date: datetime, market_data: Dict[str, pd.Series]):
         position_value = 0.0
-        for code, position in self.positions.items():
-            if code in market_data:
-                current_price = market_data[code]['close']
-                position_value += position.shares * current_price
+        take = getattr(market_data, 'take', None)
+        if take is not None and self.positions:
+            # 面板行情（DailyQuotes）：一次取出全部持仓收盘价，逐项累加保持与逐只路径相同的求和顺序
+            shares = self.position_book()[2]
+            present, (close, _, _, _) = self.book_quotes(market_data)
+            for value in (shares * close)[present].tolist():
+                position_value += value
+        else:
+            for code, position in self.positions.items():
+                if code in market_data:
+                    current_price = market_data[code]['close']
+                    position_value += position.shares * current_price
 
         self.total_value = self.cash + position_value
 
@@ -113,19 +173,62 @@ class PortfolioManager:
         })
 
     def update_positions(self, date: datetime, market_data: Dict[str, pd.Series]):
+        take = getattr(market_data, 'take', None)
+        if take is not None:
+            self._update_positions_panel(date, market_data)
+            return
+
+        active: List[Position] = []
+        prices: List[Tuple[float, float, float]] = []
         for code, position in self.positions.items():
             if code in market_data:
                 data = market_data[code]
                 if float(data.get('volume', 0)) == 0:
                     continue
-                position.update_price_stats(
-                    date=date,
-                    close=float(data['close']),
-                    high=float(data['high']),
-                    low=float(data['low'])
-                )
+                active.append(position)
+                prices.append((data['close'], data['high'], data['low']))
                 position.increment_days_held()
 
+        # 逐持仓路径直接改写 Position 属性，面板路径的极值数组随之失效
+        self._book_extremes = None
+        if not active:
+            return
+
+        price_arr = np.array(prices, dtype=float)
+        Position.update_price_stats_batch(
+            active, date,
+            close=price_arr[:, 0],
+            high=price_arr[:, 1],
+            low=price_arr[:, 2],
+        )
+
+    def _update_positions_panel(self, date: datetime, market_data: Mapping) -> None:
+        """update_positions 的面板版本：全部持仓的行情一次取出，按数组筛选停牌（成交量为 0）。"""
+        if not self.positions:
+            return
+        book = self.position_book()
+        positions = book[1]
+        present, (close, high, low, volume) = self.book_quotes(market_data)
+        idx = np.flatnonzero(present & (volume != 0))
+        if len(idx) == 0:
+            return
+
+        cached = self._book_extremes
+        if cached is None or cached[0] is not book:
+            cached = (book, Position.collect_extremes(positions))
+            self._book_extremes = cached
+        extremes = cached[1]
+
+        active = [positions[i] for i in idx]
+        for position in active:
+            position.increment_days_held()
+        current = extremes[idx]
+        Position.update_price_stats_batch(
+            active, date, close=close[idx], high=high[idx], low=low[idx],
+            current=current,
+        )
+        extremes[idx] = current
+
     # ──────────────────────────────────────────────────────────────
     # Position limits
     # ──────────────────────────────────────────────────────────────
@@ -246,12 +349,16 @@ class PortfolioManager:
             raise ValueError(f"Unknown position sizing method: {self.position_sizing}")
 
     def _calculate_atr(self, df: pd.DataFrame, period: int = 14) -> Optional[float]:
-        if len(df) < period:
+        n = len(df)
+        if n < period:
             return None
 
-        high = df['high'].values.astype(float)
-        low = df['low'].values.astype(float)
-        close = df['close'].values.astype(float)
+        # 只读取最后 period + 1 行：末尾 period 根 K 线的 TR 只依赖这些行，
+        # 结果与对整段历史计算后取尾部相同，但每笔买单的开销不再随历史长度增长
+        start = max(0, n - period - 1)
+        high = df['high'].to_numpy()[start:].astype(float)
+        low = df['low'].to_numpy()[start:].astype(float)
+        close = df['close'].to_numpy()[start:].astype(float)
 
         # 用切片对齐替代 np.roll（避免边界问题）
         prev_close = np.concatenate([[close[0]], close[:-1]])
@@ -296,10 +403,10 @@ class PortfolioManager:
             signal_date=signal_date,
             execution_date=execution_date,
             buy_strategy=buy_strategy,
+            signal_score=signal_score,
         )
         estimated_cost = self.execution_engine.estimate_buy_cost(shares, price)
         order.total_cost = estimated_cost
-        order._signal_score = signal_score
 
         self.pending_orders.append(order)
         return order
@@ -343,10 +450,31 @@ class PortfolioManager:
     def execute_pending_orders(
         self,
         current_date: datetime,
-        market_data: Dict[str, pd.DataFrame],
+        market_data: Mapping,
     ) -> List[Order]:
+        """
+        执行 execution_date 为 current_date 的挂单。
+
+        market_data 可以是 {code: 完整历史 DataFrame}，也可以是引擎的当日快照
+        （DailyQuotes，带 prev_close()）：后者直接给出当日行与前收盘，O(1) 取价。
+        快照路径下当日到期订单的 OHLCV 一次 take 取出并转成 Python float，
+        校验与撮合逐字段读取的是普通 dict，而不是逐次索引面板得到的 numpy 标量。
+        """
         executed_orders = []
         remaining_orders = []
+        # 当日平仓的 (卖单, 原持仓)，循环结束后批量生成 Trade
+        closed: List[Tuple[Order, Position]] = []
+        quote_prev_close = getattr(market_data, 'prev_close', None)
+        due_rows: Dict[str, Dict[str, float]] = {}
+        if quote_prev_close is not None:
+            due = [o.code for o in self.pending_orders if o.execution_date == current_date]
+            if due:
+                present, values = market_data.take(due, FILL_QUOTE_FIELDS)
+                due_rows = {
+                    code: dict(zip(FILL_QUOTE_FIELDS, row))
+                    for code, ok, row in zip(due, present.tolist(), values.T.tolist())
+                    if ok
+                }
 
         for order in self.pending_orders:
             # FIX-4: 过期订单（execution_date 已过但从未执行）→ 直接取消
@@ -371,23 +499,35 @@ class PortfolioManager:
                 executed_orders.append(order)
                 continue
 
-            df = market_data[order.code]
-            df_today = df[df['date'] == current_date]
-
-            if len(df_today) == 0:
-                order.fail()
-                executed_orders.append(order)
-                continue
+            if quote_prev_close is not None:
+                # 当日快照只含当日有数据的股票；NaN 前收盘对应“没有更早的行”
+                current_data = due_rows[order.code]
+                prev_close = quote_prev_close(order.code)
+                if np.isnan(prev_close):
+                    order.fail()
+                    executed_orders.append(order)
+                    continue
+            else:
+                df = market_data[order.code]
+                # [优化] searchsorted 定位当日行：date 列已按升序排列，
+                # 左侧插入点之前的行即为 < current_date 的历史行
+                dates = df['date'].values
+                idx = int(np.searchsorted(dates, np.datetime64(current_date, 'ns'), side='left'))
+
+                if idx >= len(dates) or dates[idx] != np.datetime64(current_date, 'ns'):
+                    order.fail()
+                    executed_orders.append(order)
+                    continue
 
-            current_data = df_today.iloc[-1]
+                current_data = df.iloc[idx]
 
-            df_prev = df[df['date'] < current_date]
-            if len(df_prev) == 0:
-                order.fail()
-                executed_orders.append(order)
-                continue
+                if idx == 0:
+                    order.fail()
+                    executed_orders.append(order)
+                    continue
 
-            prev_close = df_prev.iloc[-1]['close']
+                # float()：行情列可能是 float32（price_dtype），记账统一用 Python float
+                prev_close = float(df.iloc[idx - 1]['close'])
 
             if not self.execution_engine.validate_data(current_data):
                 order.fail()
@@ -403,18 +543,21 @@ class PortfolioManager:
                 executed_orders.append(order)
                 continue
 
-            open_price = current_data['open']
+            open_price = float(current_data['open'])
             success = self.execution_engine.execute_order(order, open_price)
 
             if success:
                 if order.action == OrderAction.BUY:
                     self._execute_buy(order, current_date)
                 else:
-                    self._execute_sell(order, current_date, current_data)
+                    position = self._execute_sell(order, current_date, current_data)
+                    if position is not None:
+                        closed.append((order, position))
 
             executed_orders.append(order)
 
         self.pending_orders = remaining_orders
+        self._record_trades(closed, current_date)
         return executed_orders
 
     # ──────────────────────────────────────────────────────────────
@@ -455,7 +598,7 @@ class PortfolioManager:
         )
 
         # 写入 entry_score
-        entry_score: float = getattr(order, '_signal_score', 0.0)
+        entry_score: float = order.signal_score
         is_rotation = False
         if not entry_score and order.reason and 'entry_score=' in (order.reason or ''):
             try:
@@ -472,47 +615,57 @@ class PortfolioManager:
             }
 
         self.positions[order.code] = position
+        self._book = None
         self.settlement_tracker.freeze_position(
             order.code,
             execution_date + timedelta(days=1)
         )
 
-    def _execute_sell(self, order: Order, execution_date: datetime, current_data: pd.Series):
+    def _execute_sell(
+        self, order: Order, execution_date: datetime, current_data: pd.Series
+    ) -> Optional[Position]:
         """Execute sell order and close position.
+
+        Returns the closed position; the matching Trade is built afterwards
+        by _record_trades together with the other fills of the day.
         """
         if order.code not in self.positions:
             print(f"WARNING: _execute_sell called for {order.code} but position not found. Skipping.")
             order.fail()
-            return
+            return None
 
         position = self.positions[order.code]
 
-        max_unrealized_pnl_pct = (
-            (position.highest_price_since_entry - position.entry_price)
-            / position.entry_price
-        )
-
-        trade = Trade(
-            code=order.code,
-            entry_date=position.entry_date,
-            entry_price=position.entry_price,
-            shares=position.shares,
-            entry_cost=position.cost_basis,
-            buy_strategy=position.buy_strategy,
-            exit_date=execution_date,
-            exit_price=order.execution_price,
-            exit_proceeds=order.net_proceeds,
-            exit_reason=order.reason or "Unknown",
-            holding_days=position.days_held,
-            max_unrealized_pnl_pct=max_unrealized_pnl_pct,
-        )
-        self.trades.append(trade)
-
         # FIX-1: 只加一次 cash，不再调用 add_pending_proceeds
         # A 股规则：卖出当日资金即可用于新买入（T+0 资金可用）
         self.cash += order.net_proceeds
 
         del self.positions[order.code]
+        self._book = None
+        return position
+
+    def _record_trades(self, closed: List[Tuple[Order, Position]], execution_date: datetime) -> None:
+        """Append one Trade per closed position, built in a single batch."""
+        if not closed:
+            return
+
+        self.trades.extend(Trade.from_arrays(
+            codes=[o.code for o, _ in closed],
+            entry_dates=[p.entry_date for _, p in closed],
+            entry_prices=[p.entry_price for _, p in closed],
+            shares=[p.shares for _, p in closed],
+            entry_costs=[p.cost_basis for _, p in closed],
+            exit_dates=[execution_date] * len(closed),
+            exit_prices=[o.execution_price for o, _ in closed],
+            exit_proceeds=[o.net_proceeds for o, _ in closed],
+            buy_strategies=[p.buy_strategy for _, p in closed],
+            exit_reasons=[o.reason or "Unknown" for o, _ in closed],
+            holding_days=[p.days_held for _, p in closed],
+            max_unrealized_pnl_pcts=[
+                (p.highest_price_since_entry - p.entry_price) / p.entry_price
+                for _, p in closed
+            ],
+        ))
 
     # ──────────────────────────────────────────────────────────────
     # FIX-2: process_settlement — 不再重复加 cash
@@ -548,4 +701,26 @@ class PortfolioManager:
     def get_trades_df(self) -> pd.DataFrame:
         if not self.trades:
             return pd.DataFrame()
-        return pd.DataFrame([trade.to_dict() for trade in self.trades])
\ No newline at end of file
+
+        # [优化] 列式组装：数值列一次 np.round，日期列一次 strftime，
+        # 不再逐笔调用 round()/strftime
+        trades = self.trades
+        cols = {
+            'code': [t.code for t in trades],
+            'entry_date': pd.DatetimeIndex([t.entry_date for t in trades]).strftime('%Y-%m-%d'),
+            'entry_price': np.round([t.entry_price for t in trades], 2),
+            'exit_date': pd.DatetimeIndex([t.exit_date for t in trades]).strftime('%Y-%m-%d'),
+            'exit_price': np.round([t.exit_price for t in trades], 2),
+            'shares': [t.shares for t in trades],
+            'holding_days': [t.holding_days for t in trades],
+            'gross_pnl': np.round([t.gross_pnl for t in trades], 2),
+            'gross_pnl_pct': np.round(np.array([t.gross_pnl_pct for t in trades]) * 100, 2),
+            'net_pnl': np.round([t.net_pnl for t in trades], 2),
+            'net_pnl_pct': np.round(np.array([t.net_pnl_pct for t in trades]) * 100, 2),
+            'max_unrealized_pnl_pct': np.round(
+                np.array([t.max_unrealized_pnl_pct for t in trades]) * 100, 2
+            ),
+            'exit_reason': [t.exit_reason for t in trades],
+            'buy_strategy': [t.buy_strategy or 'Unknown' for t in trades],
+        }
+        return pd.DataFrame(cols)
\ No newline at end of file
@@ -6,12 +6,76 @@ Defines abstract SellStrategy class and composite pattern for combining strategi
 
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Union, Dict, Any, List, Tuple
+from typing import Union, Dict, Any, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
 from ..data_structures import Position
 
 
+def find_date_label(hist_data: pd.DataFrame, date) -> Optional[Any]:
+    """
+    Return the index label of the first row whose 'date' equals date, or None.
+
+    hist_data is assumed sorted by date (the engine guarantees this), so the
+    lookup is a searchsorted instead of a full-column equality scan.
+    """
+    dates = hist_data['date'].to_numpy()
+    target = np.datetime64(pd.Timestamp(date), 'ns')
+    pos = int(np.searchsorted(dates, target, side='left'))
+    if pos < len(dates) and dates[pos] == target:
+        return hist_data.index[pos]
+    return None
+
+
+def atr_tail(df: pd.DataFrame, period: int) -> Optional[float]:
+    """
+    Average true range over the last `period` bars, or None with fewer than
+    period + 1 rows.
+
+    Same value as computing TR over the whole history and averaging its tail,
+    but only the last period + 1 rows are read, so the cost of a per-position
+    check no longer grows with the length of the history.
+    """
+    n = len(df)
+    if n < period + 1:
+        return None
+
+    start = n - period - 1
+    high = df['high'].to_numpy()[start + 1:]
+    low = df['low'].to_numpy()[start + 1:]
+    prev_close = df['close'].to_numpy()[start:n - 1]
+
+    # True Range = max(high-low, |high-prev_close|, |low-prev_close|)
+    tr = np.maximum(
+        high - low,
+        np.maximum(np.abs(high - prev_close), np.abs(low - prev_close))
+    )
+    return float(np.mean(tr))
+
+
+def last_precomputed(hist_data: pd.DataFrame, column: str) -> Tuple[bool, Optional[float]]:
+    """
+    Latest value of a precomputed indicator column.
+
+    Returns (usable, value): usable is False when the column is missing or
+    entirely NaN (callers then compute the indicator themselves); value is
+    None when only the latest row is NaN. The full-column NaN scan only runs
+    in that last case.
+    """
+    if column not in hist_data.columns:
+        return False, None
+    values = hist_data[column]
+    if len(values) == 0:
+        return False, None
+    last = values.iat[-1]
+    if not pd.isna(last):
+        return True, float(last)
+    if values.isna().all():
+        return False, None
+    return True, None
+
+
 class SellStrategy(ABC):
     """
     Abstract base class for sell strategies.
@@ -40,6 +104,8 @@ class SellStrategy(ABC):
         Determine if position should be sold.
 
         CRITICAL: Only use data up to current_date to prevent lookahead bias.
+        hist_data is a view sharing memory with the engine's market data and is
+        not copied per call: read it, never modify it in place.
 
         Args:
             position: Current position
@@ -52,11 +118,91 @@ class SellStrategy(ABC):
         """
         pass
 
+    def supports_batch(self) -> bool:
+        """
+        Whether should_sell_batch() is implemented.
+
+        Only strategies whose rule depends on position state and today's
+        close (no history, no indicators) can be evaluated as array predicates.
+        """
+        return False
+
+    def should_sell_batch(
+        self,
+        positions: List[Position],
+        close: np.ndarray,
+        arrays: Optional["PositionArrays"] = None,
+    ) -> Tuple[np.ndarray, List[str]]:
+        """
+        Evaluate should_sell() for several positions at once.
+
+        Args:
+            positions: Positions to check
+            close: Today's close for each position, aligned with positions
+            arrays: Optional PositionArrays over the same positions; callers
+                evaluating several strategies pass one shared instance so
+                position attributes are extracted only once
+
+        Returns:
+            (bool mask, reasons) — reasons[i] is "" where mask[i] is False
+        """
+        raise NotImplementedError(f"{self.get_name()} does not support batch evaluation")
+
     def get_name(self) -> str:
         """Get strategy name."""
         return self.__class__.__name__
 
 
+class PositionArrays:
+    """
+    Columnar view of a list of positions for should_sell_batch().
+
+    Each attribute array is built from the Position objects on first access
+    and then reused, so a composite strategy walks the positions once per
+    attribute per day, however many sub-strategies read it. Columns the
+    caller already holds (e.g. the portfolio's position book) can be passed
+    in directly.
+    """
+
+    __slots__ = ('positions', '_columns')
+
+    _DTYPES = {
+        'shares': float,
+        'cost_basis': float,
+        'entry_price': float,
+        'highest_price_since_entry': float,
+        'days_held': np.int64,
+    }
+
+    def __init__(self, positions: List[Position], **columns: np.ndarray):
+        self.positions = positions
+        self._columns: Dict[str, np.ndarray] = dict(columns)
+
+    def column(self, attr: str) -> np.ndarray:
+        """Array of getattr(position, attr) over positions."""
+        arr = self._columns.get(attr)
+        if arr is None:
+            arr = np.fromiter(
+                (getattr(p, attr) for p in self.positions),
+                dtype=self._DTYPES.get(attr, float), count=len(self.positions),
+            )
+            self._columns[attr] = arr
+        return arr
+
+    def pnl_pct(self, close: np.ndarray, idx: Optional[np.ndarray] = None) -> np.ndarray:
+        """Vectorized Position.unrealized_pnl_pct (same formula), optionally at rows idx."""
+        shares = self.column('shares')
+        cost = self.column('cost_basis')
+        if idx is not None:
+            shares, cost, close = shares[idx], cost[idx], close[idx]
+        return (shares * close - cost) / cost
+
+
+def pnl_pct_batch(positions: List[Position], close: np.ndarray) -> np.ndarray:
+    """Vectorized Position.unrealized_pnl_pct over positions (same formula)."""
+    return PositionArrays(positions).pnl_pct(close)
+
+
 class CompositeSellStrategy(SellStrategy):
     """
     Composite sell strategy combining multiple strategies.
@@ -97,9 +243,56 @@ class CompositeSellStrategy(SellStrategy):
             current_data: Current day's data
             hist_data: Historical data up to current_date
 
+            batch_part: Optional result of batch_part() for the day's positions;
+                with batch_row, batchable sub-strategies are read from it
+            batch_row: Index of position within the positions given to batch_part()
+
         Returns:
             (should_sell, reason) tuple
         """
+        batch_part = kwargs.pop('batch_part', None)
+        batch_row = kwargs.pop('batch_row', None)
+        if batch_part and self.combination_logic == "ALL":
+            # 任一可批量子策略未触发即不可能卖出：数组预筛，
+            # 依赖历史数据的子策略只对通过预筛的持仓计算
+            if not all(part[0][batch_row] for part in batch_part.values()):
+                return False, ""
+            reasons = []
+            for i, strategy in enumerate(self.strategies):
+                part = batch_part.get(i)
+                if part is not None:
+                    reason = part[1][batch_row]
+                else:
+                    try:
+                        should_sell, reason = strategy.should_sell(
+                            position, current_date, current_data, hist_data, **kwargs
+                        )
+                    except Exception:
+                        return False, ""
+                    if not should_sell:
+                        return False, ""
+                if reason:
+                    reasons.append(f"{strategy.get_name()}: {reason}")
+            return True, " AND ".join(reasons)
+
+        if batch_part and self.combination_logic == "ANY":
+            # 第一个触发的子策略即为结果，其后的子策略无需再算；
+            # 可批量的子策略已在 batch_part() 中对全部持仓一次算好
+            for i, strategy in enumerate(self.strategies):
+                part = batch_part.get(i)
+                if part is not None:
+                    should_sell, reason = bool(part[0][batch_row]), part[1][batch_row]
+                else:
+                    try:
+                        should_sell, reason = strategy.should_sell(
+                            position, current_date, current_data, hist_data, **kwargs
+                        )
+                    except Exception:
+                        continue
+                if should_sell:
+                    return True, f"{strategy.get_name()}: {reason}"
+            return False, ""
+
         results = []
 
         for strategy in self.strategies:
@@ -127,6 +320,72 @@ class CompositeSellStrategy(SellStrategy):
                 return True, combined_reason
             return False, ""
 
+    def supports_batch(self) -> bool:
+        """Batchable when every sub-strategy is."""
+        return all(strategy.supports_batch() for strategy in self.strategies)
+
+    def batch_part(
+        self,
+        positions: List[Position],
+        close: np.ndarray,
+        arrays: Optional[PositionArrays] = None,
+    ) -> Dict[int, Tuple[np.ndarray, List[str]]]:
+        """
+        Evaluate only the batchable sub-strategies, once over all positions.
+
+        For a mix of batchable and history-based rules: the result is passed
+        back to should_sell() (batch_part=..., batch_row=i) so the
+        per-position check reads those rules from arrays and only runs the
+        remaining ones. Under ALL logic a position rejected by any batchable
+        rule skips the history-based rules entirely. Returns {} when there
+        is nothing to share.
+
+        Returns:
+            {sub-strategy index: (mask, reasons)} aligned with positions
+        """
+        if arrays is None:
+            arrays = PositionArrays(positions)
+        return {
+            i: strategy.should_sell_batch(positions, close, arrays)
+            for i, strategy in enumerate(self.strategies)
+            if strategy.supports_batch()
+        }
+
+    def should_sell_batch(
+        self,
+        positions: List[Position],
+        close: np.ndarray,
+        arrays: Optional[PositionArrays] = None,
+    ) -> Tuple[np.ndarray, List[str]]:
+        """Combine sub-strategy masks with the same ANY/ALL rules as should_sell()."""
+        n = len(positions)
+        if arrays is None:
+            arrays = PositionArrays(positions)
+        results = [
+            (*strategy.should_sell_batch(positions, close, arrays), strategy.get_name())
+            for strategy in self.strategies
+        ]
+
+        if self.combination_logic == "ANY":
+            mask = np.zeros(n, dtype=bool)
+            reasons = [""] * n
+            for sub_mask, sub_reasons, name in results:
+                for i in np.flatnonzero(sub_mask & ~mask):
+                    reasons[i] = f"{name}: {sub_reasons[i]}"
+                mask |= sub_mask
+            return mask, reasons
+
+        # ALL
+        mask = np.ones(n, dtype=bool)
+        for sub_mask, _, _ in results:
+            mask &= sub_mask
+        reasons = [""] * n
+        for i in np.flatnonzero(mask):
+            reasons[i] = " AND ".join(
+                f"{name}: {sub_reasons[i]}" for _, sub_reasons, name in results if sub_reasons[i]
+            )
+        return mask, reasons
+
     def get_name(self) -> str:
         """Get composite strategy name."""
         strategy_names = [s.get_name() for s in self.strategies]
@@ -152,6 +411,17 @@ class SimpleHoldStrategy(SellStrategy):
         """Never sell."""
         return False, ""
 
+    def supports_batch(self) -> bool:
+        return True
+
+    def should_sell_batch(
+        self,
+        positions: List[Position],
+        close: np.ndarray,
+        arrays: Optional[PositionArrays] = None,
+    ) -> Tuple[np.ndarray, List[str]]:
+        return np.zeros(len(positions), dtype=bool), [""] * len(positions)
+
     def get_name(self) -> str:
         return "HoldForever"
 
@@ -76,12 +76,12 @@ class KDJOverboughtExitStrategy(SellStrategy):
         if "kdj_j" in hist_data.columns and not hist_data["kdj_j"].isna().all():
             j_series = hist_data["kdj_j"]
         else:
-            # [优化] fallback：复用 utils 向量化版本（已无自有 Python 循环）
-            from utils.indicators import compute_kdj
-            kdj = compute_kdj(hist_data, n=9)
-            if kdj is None or kdj.empty:
+            # [优化] fallback：复用 utils 向量化版本，只取 J 线，不复制 hist_data
+            from utils.indicators import compute_kdj_lines
+            if hist_data.empty:
                 return False, ""
-            j_series = kdj["J"]
+            _, _, j_values = compute_kdj_lines(hist_data, n=9)
+            j_series = pd.Series(j_values, index=hist_data.index)
 
         if len(j_series) == 0:
             return False, ""
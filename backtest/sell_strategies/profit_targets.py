@@ -6,12 +6,13 @@ Implements 2 profit target strategies:
 2. MultipleRExitStrategy - Exit at N× initial risk (R-multiple)
 """
 
+import threading
 from datetime import datetime
-from typing import Tuple
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
 import numpy as np
 
-from .base import SellStrategy
+from .base import PositionArrays, SellStrategy, atr_tail, find_date_label
 from ..data_structures import Position
 
 
@@ -63,6 +64,27 @@ class FixedProfitTargetStrategy(SellStrategy):
 
         return False, ""
 
+    def supports_batch(self) -> bool:
+        return True
+
+    def should_sell_batch(
+        self,
+        positions: List[Position],
+        close: np.ndarray,
+        arrays: Optional[PositionArrays] = None,
+    ) -> Tuple[np.ndarray, List[str]]:
+        """Vectorized should_sell() over positions."""
+        if arrays is None:
+            arrays = PositionArrays(positions)
+        profit_pct = arrays.pnl_pct(close)
+        mask = profit_pct >= self.target_pct
+
+        exit_type = "Partial" if self.partial_exit else "Full"
+        reasons = [""] * len(positions)
+        for i in np.flatnonzero(mask):
+            reasons[i] = f"{exit_type} Profit Target ({self.target_pct*100:.1f}%) reached at {close[i]:.2f} (P&L: {profit_pct[i]*100:+.2f}%)"
+        return mask, reasons
+
     def get_name(self) -> str:
         exit_type = "Partial" if self.partial_exit else "Full"
         return f"{exit_type}ProfitTarget({self.target_pct*100:.1f}%)"
@@ -100,6 +122,15 @@ class MultipleRExitStrategy(SellStrategy):
         self.r_multiple = r_multiple
         self.atr_period = atr_period
         self.stop_multiplier = stop_multiplier
+        # 初始风险只取决于入场日及以前的数据，持仓期间不变：按持仓缓存，不再每日重算。
+        # 只保留仍在检查中的持仓：_risk_today 记录当日查过的持仓，换日时取代
+        # _initial_risk，已平仓（不再被检查）的条目随之释放，缓存大小不超过两日的持仓数。
+        self._initial_risk: Dict[Tuple[str, datetime, float], float] = {}
+        self._risk_today: Dict[Tuple[str, datetime, float], float] = {}
+        self._risk_date: Optional[datetime] = None
+        # check_sell_signals 在线程池中并发调用 should_sell：换日交换在锁内进行，
+        # 各线程随后只读写当日取到的两个 dict（单次 get / 赋值在 GIL 下是原子的）
+        self._risk_lock = threading.Lock()
 
     def should_sell(
         self,
@@ -110,13 +141,43 @@ class MultipleRExitStrategy(SellStrategy):
         **kwargs
     ) -> Tuple[bool, str]:
         """Check if R-multiple target reached."""
+        with self._risk_lock:
+            if current_date != self._risk_date:
+                self._initial_risk = self._risk_today
+                self._risk_today = {}
+                self._risk_date = current_date
+            risk_today, risk_previous = self._risk_today, self._initial_risk
+
+        key = (position.code, position.entry_date, position.entry_price)
+        initial_risk_pct = risk_today.get(key)
+        if initial_risk_pct is None:
+            initial_risk_pct = risk_previous.get(key)
+            if initial_risk_pct is None:
+                initial_risk_pct = self._compute_initial_risk(position, hist_data)
+                if initial_risk_pct is None:
+                    return False, ""
+            risk_today[key] = initial_risk_pct
+
+        # Target profit = R × r_multiple
+        target_profit_pct = initial_risk_pct * self.r_multiple
+
+        # Check if target reached
+        current_close = current_data['close']
+        current_profit_pct = position.unrealized_pnl_pct(current_close)
+
+        if current_profit_pct >= target_profit_pct:
+            return True, f"{self.r_multiple}R Target reached at {current_close:.2f} (R={initial_risk_pct*100:.2f}%, P&L: {current_profit_pct*100:+.2f}%)"
+
+        return False, ""
+
+    def _compute_initial_risk(self, position: Position, hist_data: pd.DataFrame) -> Optional[float]:
+        """Initial risk (fraction of entry price) from the ATR on the entry date; None if entry not in history."""
         # Calculate initial R (risk at entry)
-        entry_idx = hist_data[hist_data['date'] == position.entry_date].index
+        entry_idx = find_date_label(hist_data, position.entry_date)
 
-        if len(entry_idx) == 0:
-            return False, ""
+        if entry_idx is None:
+            return None
 
-        entry_idx = entry_idx[0]
         entry_row = hist_data.loc[entry_idx]
 
         # ── 优先从数据库预计算列读取入场当日 ATR ──────────────────────
@@ -143,38 +204,11 @@ class MultipleRExitStrategy(SellStrategy):
             # Risk = (ATR × stop_multiplier) / entry_price
             initial_risk_pct = (atr_at_entry * self.stop_multiplier) / position.entry_price
 
-        # Target profit = R × r_multiple
-        target_profit_pct = initial_risk_pct * self.r_multiple
-
-        # Check if target reached
-        current_close = current_data['close']
-        current_profit_pct = position.unrealized_pnl_pct(current_close)
-
-        if current_profit_pct >= target_profit_pct:
-            return True, f"{self.r_multiple}R Target reached at {current_close:.2f} (R={initial_risk_pct*100:.2f}%, P&L: {current_profit_pct*100:+.2f}%)"
-
-        return False, ""
+        return initial_risk_pct
 
     def _calculate_atr(self, df: pd.DataFrame, period: int) -> float:
         """Calculate ATR."""
-        if len(df) < period + 1:
-            return None
-
-        high = df['high'].values
-        low = df['low'].values
-        close = df['close'].values
-
-        tr = np.maximum(
-            high - low,
-            np.maximum(
-                np.abs(high - np.roll(close, 1)),
-                np.abs(low - np.roll(close, 1))
-            )
-        )
-        tr[0] = high[0] - low[0]
-
-        atr = np.mean(tr[-period:])
-        return float(atr)
+        return atr_tail(df, period)
 
     def get_name(self) -> str:
         return f"MultipleRTarget({self.r_multiple}R)"
\ No newline at end of file
@@ -9,11 +9,11 @@ Implements:
 """
 
 from datetime import datetime
-from typing import Tuple
+from typing import List, Optional, Tuple
 import pandas as pd
 import numpy as np
 
-from .base import SellStrategy
+from .base import PositionArrays, SellStrategy
 from ..data_structures import Position
 
 
@@ -51,6 +51,31 @@ class TimedExitStrategy(SellStrategy):
             )
         return False, ""
 
+    def supports_batch(self) -> bool:
+        return True
+
+    def should_sell_batch(
+        self,
+        positions: List[Position],
+        close: np.ndarray,
+        arrays: Optional[PositionArrays] = None,
+    ) -> Tuple[np.ndarray, List[str]]:
+        """Vectorized should_sell() over positions."""
+        if arrays is None:
+            arrays = PositionArrays(positions)
+        mask = arrays.column('days_held') >= self.max_holding_days
+
+        reasons = [""] * len(positions)
+        hit = np.flatnonzero(mask)
+        if len(hit):
+            pnl_pct = arrays.pnl_pct(close, hit) * 100
+            for i, pct in zip(hit, pnl_pct):
+                reasons[i] = (
+                    f"Max Holding Period ({self.max_holding_days} days) reached "
+                    f"(P&L: {pct:+.2f}%)"
+                )
+        return mask, reasons
+
     def get_name(self) -> str:
         return f"TimedExit({self.max_holding_days}d)"
 
@@ -123,21 +148,24 @@ class EarlyExitStrategy(SellStrategy):
             entry_date = entry_date.date()
 
         if "date" in hist_data.columns:
-            date_col = pd.to_datetime(hist_data["date"])
+            dates = hist_data["date"].to_numpy()
         else:
-            date_col = pd.to_datetime(hist_data.index)
+            dates = hist_data.index.to_numpy()
+        if not np.issubdtype(dates.dtype, np.datetime64):
+            dates = pd.to_datetime(dates).to_numpy()
 
-        entry_ts = pd.Timestamp(entry_date)
-        since_entry = hist_data[date_col >= entry_ts].copy()
+        # [优化] 历史已按日期升序：searchsorted 定位入场行，
+        # 不再对整段历史做布尔比较 + 行筛选
+        entry_ts = np.datetime64(pd.Timestamp(entry_date), 'ns')
+        start = int(np.searchsorted(dates, entry_ts, side='left'))
 
         # 需要 consecutive_days + 1 行：第 0 行作为基准，后续 N 行各算一次涨幅
         required_rows = self.consecutive_days + 1
-        if len(since_entry) < required_rows:
+        if len(dates) - start < required_rows:
             return False, ""
 
         # ── 取入场后完整的前 N 天窗口（固定窗口，非滚动）────────────────
-        window = since_entry.iloc[:required_rows]
-        closes = window["close"].values.astype(float)
+        closes = hist_data["close"].to_numpy(dtype=float)[start:start + required_rows]
 
         prev_closes = closes[:-1]
         curr_closes = closes[1:]
@@ -8,11 +8,11 @@ Implements 3 trailing stop strategies:
 """
 
 from datetime import datetime
-from typing import Tuple
+from typing import List, Optional, Tuple
 import pandas as pd
 import numpy as np
 
-from .base import SellStrategy
+from .base import PositionArrays, SellStrategy, atr_tail, find_date_label, last_precomputed
 from ..data_structures import Position
 
 
@@ -50,10 +50,8 @@ class ATRTrailingStopStrategy(SellStrategy):
         """Check if current price hit ATR trailing stop."""
         # ── 优先使用数据库预计算列 ──────────────────────────────────────
         atr_col = f'atr{self.atr_period}' if f'atr{self.atr_period}' in hist_data.columns else 'atr'
-        if atr_col in hist_data.columns and not hist_data[atr_col].isna().all():
-            atr_val = hist_data[atr_col].iloc[-1]
-            atr = float(atr_val) if not pd.isna(atr_val) else None
-        else:
+        usable, atr = last_precomputed(hist_data, atr_col)
+        if not usable:
             # 回退：实时计算
             atr = self._calculate_atr(hist_data, self.atr_period)
         # ────────────────────────────────────────────────────────────────
@@ -84,29 +82,7 @@ class ATRTrailingStopStrategy(SellStrategy):
         Returns:
             ATR value or None if insufficient data
         """
-        if len(df) < period + 1:
-            return None
-
-        high = df['high'].values
-        low = df['low'].values
-        close = df['close'].values
-
-        # True Range = max(high-low, |high-prev_close|, |low-prev_close|)
-        tr = np.maximum(
-            high - low,
-            np.maximum(
-                np.abs(high - np.roll(close, 1)),
-                np.abs(low - np.roll(close, 1))
-            )
-        )
-
-        # First TR is just high - low
-        tr[0] = high[0] - low[0]
-
-        # ATR = average of last N true ranges
-        atr = np.mean(tr[-period:])
-
-        return float(atr)
+        return atr_tail(df, period)
 
     def get_name(self) -> str:
         return f"ATRTrailingStop({self.atr_multiplier}x)"
@@ -154,10 +130,8 @@ class ChandelierStopStrategy(SellStrategy):
         """Check if current price hit Chandelier stop."""
         # ── 优先使用数据库预计算列 ──────────────────────────────────────
         atr_col = f'atr{self.atr_period}' if f'atr{self.atr_period}' in hist_data.columns else 'atr'
-        if atr_col in hist_data.columns and not hist_data[atr_col].isna().all():
-            atr_val = hist_data[atr_col].iloc[-1]
-            atr = float(atr_val) if not pd.isna(atr_val) else None
-        else:
+        usable, atr = last_precomputed(hist_data, atr_col)
+        if not usable:
             # 回退：实时计算
             atr = self._calculate_atr(hist_data, self.atr_period)
         # ────────────────────────────────────────────────────────────────
@@ -166,11 +140,10 @@ class ChandelierStopStrategy(SellStrategy):
             return False, ""
 
         # Highest high in lookback period (since entry)
-        entry_idx = hist_data[hist_data['date'] == position.entry_date].index
-        if len(entry_idx) == 0:
+        entry_idx = find_date_label(hist_data, position.entry_date)
+        if entry_idx is None:
             return False, ""
 
-        entry_idx = entry_idx[0]
         data_since_entry = hist_data.loc[entry_idx:]
 
         if len(data_since_entry) == 0:
@@ -194,24 +167,7 @@ class ChandelierStopStrategy(SellStrategy):
 
     def _calculate_atr(self, df: pd.DataFrame, period: int) -> float:
         """Calculate ATR."""
-        if len(df) < period + 1:
-            return None
-
-        high = df['high'].values
-        low = df['low'].values
-        close = df['close'].values
-
-        tr = np.maximum(
-            high - low,
-            np.maximum(
-                np.abs(high - np.roll(close, 1)),
-                np.abs(low - np.roll(close, 1))
-            )
-        )
-        tr[0] = high[0] - low[0]
-
-        atr = np.mean(tr[-period:])
-        return float(atr)
+        return atr_tail(df, period)
 
     def get_name(self) -> str:
         return f"ChandelierStop({self.atr_multiplier}x)"
@@ -274,6 +230,34 @@ class PercentageTrailingStopStrategy(SellStrategy):
 
         return False, ""
 
+    def supports_batch(self) -> bool:
+        return True
+
+    def should_sell_batch(
+        self,
+        positions: List[Position],
+        close: np.ndarray,
+        arrays: Optional[PositionArrays] = None,
+    ) -> Tuple[np.ndarray, List[str]]:
+        """Vectorized should_sell() over positions."""
+        if arrays is None:
+            arrays = PositionArrays(positions)
+        highest = arrays.column('highest_price_since_entry')
+        stop_level = highest * (1 - self.trailing_pct)
+        mask = close <= stop_level
+
+        if self.activate_after_profit_pct > 0:
+            entry = arrays.column('entry_price')
+            mask &= (highest - entry) / entry >= self.activate_after_profit_pct
+
+        reasons = [""] * len(positions)
+        hit = np.flatnonzero(mask)
+        if len(hit):
+            pnl_pct = arrays.pnl_pct(close, hit) * 100
+            for i, pct in zip(hit, pnl_pct):
+                reasons[i] = f"Percentage Trailing Stop ({self.trailing_pct*100:.1f}%) hit at {close[i]:.2f} (stop: {stop_level[i]:.2f}, P&L: {pct:+.2f}%)"
+        return mask, reasons
+
     def get_name(self) -> str:
         if self.activate_after_profit_pct > 0:
             return f"PercentageTrailingStop({self.trailing_pct*100:.1f}%, activate>{self.activate_after_profit_pct*100:.1f}%)"
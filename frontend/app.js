@@ -472,8 +472,11 @@ async function pollBacktest(jobId) {
       if (["COMPLETED", "FAILED", "CANCELLED"].includes(status.status)) {
         clearInterval(state.polling);
         state.polling = null;
-        if (status.result) {
-          renderResults(status.result);
+        if (status.status === "COMPLETED") {
+          const detail = await api.get(`/api/backtests/${jobId}?include=result`);
+          if (detail.result) {
+            renderResults(detail.result);
+          }
         }
         await refreshHistory();
         await refreshRankings();
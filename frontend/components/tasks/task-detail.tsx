@@ -22,7 +22,7 @@ interface TaskDetailProps {
 }
 
 export function TaskDetail({ backtestId }: TaskDetailProps) {
-  const { data, isLoading, mutate } = useBacktest(backtestId);
+  const { data, isLoading, mutate } = useBacktest(backtestId, false);
   const [cancelling, setCancelling] = useState(false);
 
   async function handleCancel() {
@@ -91,7 +91,7 @@ export interface BacktestSummary {
 
 export interface BacktestDetail extends BacktestSummary {
   payload: BacktestPayload | null;
-  result: BacktestResult | null;
+  result?: BacktestResult | null;
   logs: Array<{ ts: string; message: string }>;
 }
 
@@ -130,8 +130,10 @@ export async function createBacktest(payload: BacktestPayload) {
   });
 }
 
-export async function getBacktest(id: string) {
-  return fetchAPI<BacktestDetail>(`/api/backtests/${id}`);
+export async function getBacktest(id: string, includeResult = true) {
+  return fetchAPI<BacktestDetail>(
+    `/api/backtests/${id}${includeResult ? "?include=result" : ""}`
+  );
 }
 
 export async function cancelBacktest(id: string) {
@@ -29,9 +29,10 @@ export function useBacktests() {
   return { data, error, isLoading };
 }
 
-export function useBacktest(id: string | null) {
-  const { data, error, isLoading, mutate } = useSWR(id ? `backtest-${id}` : null, () =>
-    id ? getBacktest(id) : null,
+export function useBacktest(id: string | null, includeResult = true) {
+  const key = id ? `backtest-${id}${includeResult ? "-result" : ""}` : null;
+  const { data, error, isLoading, mutate } = useSWR(key, () =>
+    id ? getBacktest(id, includeResult) : null,
     {
       refreshInterval: (data) =>
         data?.status === "RUNNING" || data?.status === "PENDING" ? 1500 : 0,
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+把 data 目录下的逐股 CSV 行情转换为 Feather 文件，供 data_format='feather' 回测使用。
+
+Feather 按列存放二进制数据（date 已是 datetime64 并按升序排好），回测加载时以
+内存映射方式读取，跳过 CSV 的文本解析与日期转换。源 CSV 未变化时跳过该文件。
+
+Usage:
+    python scripts/convert_csv_to_feather.py
+    python scripts/convert_csv_to_feather.py --data-dir ./data --out-dir ./data
+    python scripts/run_backtest.py --data-format feather
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backtest.engine import BacktestEngine
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def convert_csv_to_feather(csv_file: Path, out_dir: Path) -> bool:
+    """
+    转换单个 CSV；返回是否写入了新文件。
+
+    解析与回测 CSV 路径共用 BacktestEngine._parse_csv，两种格式读出的数据一致。
+    """
+    from pyarrow import feather
+
+    out_file = out_dir / f"{csv_file.stem}.feather"
+    if out_file.exists() and out_file.stat().st_mtime_ns >= csv_file.stat().st_mtime_ns:
+        return False
+
+    df = BacktestEngine._parse_csv(csv_file)
+    if df is None:
+        print(f"  Skipped {csv_file.name}: missing 'date' column")
+        return False
+
+    tmp_file = out_file.with_suffix(".feather.tmp")
+    # 不压缩：压缩块无法内存映射，读取时需要解压拷贝
+    feather.write_feather(df, str(tmp_file), compression="uncompressed")
+    tmp_file.replace(out_file)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert per-stock CSV files to Feather")
+    parser.add_argument(
+        '--data-dir',
+        default=str(PROJECT_ROOT / 'data'),
+        help=f'Directory with CSV K-line data (default: {PROJECT_ROOT}/data)'
+    )
+    parser.add_argument(
+        '--out-dir',
+        default=None,
+        help='Output directory for .feather files (default: same as --data-dir)'
+    )
+    args = parser.parse_args()
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("ERROR: pyarrow is required: pip install pyarrow")
+        sys.exit(1)
+
+    data_dir = Path(args.data_dir)
+    out_dir = Path(args.out_dir) if args.out_dir else data_dir
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    csv_files = sorted(data_dir.glob("*.csv"))
+    written = 0
+    for csv_file in csv_files:
+        try:
+            if convert_csv_to_feather(csv_file, out_dir):
+                written += 1
+        except Exception as e:
+            print(f"  Error converting {csv_file.name}: {e}")
+
+    print(f"Converted {written} of {len(csv_files)} CSV file(s) to {out_dir}")
+
+
+if __name__ == '__main__':
+    main()
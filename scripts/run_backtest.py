@@ -37,6 +37,7 @@ Example:
         --save-results ./backtest_results/conservative_2025.json
 """
 
+import os
 import sys
 import argparse
 import json
@@ -279,6 +280,35 @@ def build_parser() -> argparse.ArgumentParser:
         metavar='N',
         help='Parallel worker processes for stock screening (0 = auto-detect CPU count, default: 0)'
     )
+    perf.add_argument(
+        '--selector-threads',
+        type=int,
+        default=0,
+        metavar='N',
+        help='Run independent buy selectors concurrently on N threads '
+             '(0 or 1 = one after another, default: 0)'
+    )
+    perf.add_argument(
+        '--price-dtype',
+        choices=['float64', 'float32'],
+        default='float64',
+        help='Storage dtype for OHLCV columns; float32 halves memory at ~7 significant '
+             'digits of price precision (default: float64)'
+    )
+    perf.add_argument(
+        '--data-format',
+        choices=['csv', 'feather'],
+        default='csv',
+        help='Format of the per-stock files in --data-dir; feather files are read '
+             'memory-mapped (see scripts/convert_csv_to_feather.py, default: csv)'
+    )
+    perf.add_argument(
+        '--precompute-signals',
+        action='store_true',
+        default=False,
+        help='Run all selectors for every trading day up front, one day per worker process '
+             '(requires fork; uses --workers processes)'
+    )
 
     # ── 输出 ──────────────────────────────────────────────────────
     out = parser.add_argument_group("Output")
@@ -371,6 +401,14 @@ def main():
         rotation_no_score_policy=args.rotation_no_score_policy,
         # 并行
         parallel_workers=args.workers,
+        selector_threads=args.selector_threads,
+        price_dtype=args.price_dtype,
+        data_format=args.data_format,
+        # --quiet 且不保存结果时跳过逐信号/逐订单明细日志的格式化；
+        # --save-results 写出的 .log 始终保留完整明细，--quiet 只影响控制台
+        verbose=not args.quiet or bool(args.save_results),
+        # engine.logs 只在 --save-results 时写入 .log 文件
+        capture_logs=bool(args.save_results),
     )
 
     # ── 加载数据 ──────────────────────────────────────────────────
@@ -400,27 +438,32 @@ def main():
     if args.score_filter or args.rotation:
         engine.warmup_score_history(force_legacy=args.warmup_force_legacy)
 
+    # ── 选股预计算（按交易日并行）─────────────────────────────────
+    if args.precompute_signals:
+        engine.precompute_signals()
+
     # ── 运行回测 ──────────────────────────────────────────────────
     print("=" * 80)
     print("RUNNING BACKTEST")
     print("=" * 80 + "\n")
 
+    # --quiet 时控制台输出直接丢弃（写入 os.devnull），不在内存里攒一份整次回测的日志
     if args.quiet:
-        import io
         old_stdout = sys.stdout
-        sys.stdout = io.StringIO()
+        sys.stdout = open(os.devnull, 'w', encoding='utf-8')
 
     try:
         engine.run()
     finally:
         if args.quiet:
+            sys.stdout.close()
             sys.stdout = old_stdout
 
     # ── 结果分析 ──────────────────────────────────────────────────
-    results = engine.get_results()
+    results = engine.get_results(format='dataframe')
 
-    equity_df = engine.portfolio.get_equity_curve_df()
-    trades_df = engine.portfolio.get_trades_df()
+    equity_df = results['equity_curve']
+    trades_df = results['trades']
 
     if not equity_df.empty:
         analyzer = PerformanceAnalyzer(
@@ -465,6 +508,9 @@ def main():
 
     # ── 保存结果 ──────────────────────────────────────────────────
     if args.save_results:
+        # 只有落盘时才展开成逐行 records（保持 JSON 结果文件格式不变）
+        results['equity_curve'] = equity_df.to_dict('records')
+        results['trades'] = trades_df.to_dict('records')
         save_results(results, args.save_results)
 
         log_path = Path(args.save_results).with_suffix('.log')
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+测试 CSV 解析缓存与 price_dtype 转换的正确性
+
+验证：
+1. 经缓存读取（首次解析写入 / 再次命中）的结果与直接 pd.read_csv 一致
+2. 源文件 mtime 或大小变化时缓存失效并重新解析
+3. csv_cache=False / csv_cache_dir / 缓存目录不可写时的行为
+4. price_dtype='float32' 时价格列为 float32、整数成交量收窄为 int32，且与直接读取后转换一致
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backtest.engine import BacktestEngine, CSV_CACHE_DIRNAME
+
+
+CSV_HEADER = "date,open,high,low,close,volume,amount\n"
+CSV_ROWS = {
+    '000001': [
+        "2025-01-02,10.01,10.35,9.87,10.22,123456789,1261728383.58\n",
+        "2025-01-03,10.22,10.48,10.11,10.37,98765432,1024197529.84\n",
+        "2025-01-06,10.37,10.37,9.95,10.03,87654321,879172839.63\n",
+        "2025-01-07,10.03,10.66,10.01,10.61,134567890,1427765312.90\n",
+    ],
+    '000002': [
+        "2025-01-02,20.13,20.50,19.88,20.47,5432101,111195107.47\n",
+        "2025-01-03,20.47,20.47,19.61,19.70,6543210,128901237.00\n",
+        "2025-01-06,19.70,19.99,19.52,19.93,4321098,86119483.14\n",
+        "2025-01-07,19.93,20.31,19.90,20.28,5678901,115168112.28\n",
+    ],
+}
+EXTRA_ROW = "2025-01-08,10.61,10.95,10.50,10.88,112233445,1221100881.60\n"
+
+
+def write_csv_files(data_dir: Path):
+    for code, rows in CSV_ROWS.items():
+        (data_dir / f"{code}.csv").write_text(CSV_HEADER + "".join(rows), encoding="utf-8")
+
+
+def read_reference(csv_file: Path) -> pd.DataFrame:
+    """不经缓存的直接读取"""
+    df = pd.read_csv(csv_file)
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def make_engine(data_dir: Path, **kwargs) -> BacktestEngine:
+    return BacktestEngine(
+        data_dir=str(data_dir),
+        buy_config_path="./configs.json",
+        sell_strategy_config={},
+        start_date="2025-01-02",
+        end_date="2025-01-08",
+        use_indicator_db=False,
+        parallel_workers=1,
+        verbose=False,
+        **kwargs,
+    )
+
+
+def count_parses(engine: BacktestEngine) -> list:
+    """让 engine 的 _parse_csv 记录被调用的文件，返回记录列表"""
+    calls = []
+    parse = BacktestEngine._parse_csv
+
+    def counting(csv_file):
+        calls.append(csv_file.name)
+        return parse(csv_file)
+
+    engine._parse_csv = counting
+    return calls
+
+
+def test_cache_matches_read_csv():
+    """测试缓存读取与直接 read_csv 一致"""
+    print("="*80)
+    print("测试 1: 缓存结果与 pd.read_csv 一致")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        write_csv_files(data_dir)
+        csv_file = data_dir / "000001.csv"
+        reference = read_reference(csv_file)
+
+        engine = make_engine(data_dir)
+        calls = count_parses(engine)
+
+        first = engine._read_csv_cached(csv_file)
+        assert calls == ["000001.csv"]
+        assert (data_dir / CSV_CACHE_DIRNAME / "000001.pkl").exists(), "cache file not written"
+        pd.testing.assert_frame_equal(first, reference)
+
+        # 新引擎再次读取：命中缓存，不再解析
+        engine2 = make_engine(data_dir)
+        calls2 = count_parses(engine2)
+        second = engine2._read_csv_cached(csv_file)
+        assert calls2 == [], "unchanged file should be served from cache"
+        pd.testing.assert_frame_equal(second, reference)
+
+        # 缓存目录不会被当作行情文件扫描
+        assert sorted(p.name for p in data_dir.glob("*.csv")) == ["000001.csv", "000002.csv"]
+
+    print("✅ 缓存一致性测试通过")
+    print()
+
+
+def test_cache_invalidation():
+    """测试源文件 mtime / 大小变化时缓存失效"""
+    print("="*80)
+    print("测试 2: 缓存失效")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        write_csv_files(data_dir)
+        csv_file = data_dir / "000001.csv"
+
+        engine = make_engine(data_dir)
+        calls = count_parses(engine)
+        engine._read_csv_cached(csv_file)
+        engine._read_csv_cached(csv_file)
+        assert calls == ["000001.csv"]
+
+        # 仅 mtime 变化（内容相同）
+        st = csv_file.stat()
+        os.utime(csv_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        df = engine._read_csv_cached(csv_file)
+        assert len(calls) == 2, "mtime change should invalidate the cache"
+        pd.testing.assert_frame_equal(df, read_reference(csv_file))
+
+        # 仅大小变化（追加一行后恢复原 mtime）
+        st = csv_file.stat()
+        with open(csv_file, "a", encoding="utf-8") as f:
+            f.write(EXTRA_ROW)
+        os.utime(csv_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+        df = engine._read_csv_cached(csv_file)
+        assert len(calls) == 3, "size change should invalidate the cache"
+        assert len(df) == len(CSV_ROWS['000001']) + 1
+        pd.testing.assert_frame_equal(df, read_reference(csv_file))
+
+        # 重建后的缓存再次命中
+        engine._read_csv_cached(csv_file)
+        assert len(calls) == 3
+
+    print("✅ 缓存失效测试通过")
+    print()
+
+
+def test_cache_options():
+    """测试 csv_cache / csv_cache_dir 与不可写缓存目录"""
+    print("="*80)
+    print("测试 3: 缓存开关与缓存目录")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp) / "data"
+        data_dir.mkdir()
+        write_csv_files(data_dir)
+        csv_file = data_dir / "000002.csv"
+        reference = read_reference(csv_file)
+
+        # 关闭缓存：每次解析，不写任何文件
+        engine = make_engine(data_dir, csv_cache=False)
+        calls = count_parses(engine)
+        pd.testing.assert_frame_equal(engine._read_csv_cached(csv_file), reference)
+        pd.testing.assert_frame_equal(engine._read_csv_cached(csv_file), reference)
+        assert len(calls) == 2
+        assert not (data_dir / CSV_CACHE_DIRNAME).exists()
+
+        # 自定义缓存目录：数据目录保持不变
+        cache_dir = Path(tmp) / "cache"
+        engine = make_engine(data_dir, csv_cache_dir=str(cache_dir))
+        engine._read_csv_cached(csv_file)
+        assert (cache_dir / "000002.pkl").exists()
+        assert not (data_dir / CSV_CACHE_DIRNAME).exists()
+
+        # 缓存目录无法创建（父路径是普通文件）：静默退化为直接解析
+        blocker = Path(tmp) / "not_a_dir"
+        blocker.write_text("")
+        engine = make_engine(data_dir, csv_cache_dir=str(blocker / "cache"))
+        calls = count_parses(engine)
+        pd.testing.assert_frame_equal(engine._read_csv_cached(csv_file), reference)
+        assert engine._csv_cache_writable is False
+        pd.testing.assert_frame_equal(engine._read_csv_cached(csv_file), reference)
+        assert len(calls) == 2
+
+    print("✅ 缓存开关测试通过")
+    print()
+
+
+def test_price_dtype_float32():
+    """测试 float32 价格列与 int32 成交量，以及不同精度共用缓存"""
+    print("="*80)
+    print("测试 4: price_dtype='float32'")
+    print("="*80)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = Path(tmp)
+        write_csv_files(data_dir)
+
+        # float64 引擎先加载并写缓存
+        engine64 = make_engine(data_dir)
+        engine64.load_data(lookback_days=0)
+        for code in CSV_ROWS:
+            pd.testing.assert_frame_equal(
+                engine64.market_data[code], read_reference(data_dir / f"{code}.csv")
+            )
+
+        # float32 引擎复用同一份缓存，加载后转换
+        engine32 = make_engine(data_dir, price_dtype="float32")
+        calls = count_parses(engine32)
+        engine32.load_data(lookback_days=0)
+        assert calls == [], "float32 load should reuse the float64-built cache"
+
+        casts = {col: np.float32 for col in ('open', 'high', 'low', 'close', 'amount')}
+        casts['volume'] = np.int32
+        for code in CSV_ROWS:
+            df = engine32.market_data[code]
+            for col in ('open', 'high', 'low', 'close', 'amount'):
+                assert df[col].dtype == np.float32, f"{code}.{col}: {df[col].dtype}"
+            assert df['volume'].dtype == np.int32, f"{code}.volume: {df['volume'].dtype}"
+            expected = read_reference(data_dir / f"{code}.csv").astype(casts)
+            pd.testing.assert_frame_equal(df, expected)
+
+        # 超过 2^24 的成交量在 int32 中保持精确
+        assert int(engine32.market_data['000001']['volume'].iloc[0]) == 123456789
+
+    print("✅ float32 加载测试通过")
+    print()
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*80)
+    print("CSV 解析缓存测试")
+    print("="*80 + "\n")
+
+    try:
+        test_cache_matches_read_csv()
+        test_cache_invalidation()
+        test_cache_options()
+        test_price_dtype_float32()
+
+        print("\n" + "="*80)
+        print("✅ 所有测试通过！")
+        print("="*80)
+
+    except AssertionError as e:
+        print("\n" + "="*80)
+        print("❌ 测试失败")
+        print("="*80)
+        print(f"\n错误: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print("\n" + "="*80)
+        print("❌ 测试异常")
+        print("="*80)
+        print(f"\n异常: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+测试持仓极值的批量更新与逐个更新一致
+
+验证：
+1. Position.update_price_stats_batch 与逐个 update_price_stats 结果一致（含创新高 / 新低的日期）
+2. 传入 current 极值数组时原地刷新，与从属性重新收集的结果一致
+3. PortfolioManager.update_positions 的面板路径（持仓簿 + 极值数组缓存）与逐只字典路径，
+   连续多日（含停牌、零成交量、中途开仓）后都与逐个更新的参考结果一致
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backtest.data_structures import EXTREME_FIELDS, Position
+from backtest.engine import DailyQuotes, PANEL_FIELDS
+from backtest.portfolio import PortfolioManager
+
+
+TRACKED_FIELDS = EXTREME_FIELDS + (
+    'highest_close_date',
+    'lowest_close_date',
+    'highest_high_date',
+    'lowest_low_date',
+    'days_held',
+)
+
+ENTRIES = {
+    '000001': (datetime(2025, 1, 2), 10.0, 1000),
+    '000002': (datetime(2025, 1, 2), 20.0, 500),
+    '000003': (datetime(2025, 1, 6), 5.0, 2000),   # 第 3 天开仓
+}
+
+# 每日行情 {code: (close, high, low, volume)}；缺失 = 停牌，volume 为 0 的当日不更新
+DAYS = [
+    (datetime(2025, 1, 3), {
+        '000001': (10.5, 10.8, 9.9, 1e5),
+        '000002': (19.5, 20.1, 19.0, 2e5),
+        '000003': (5.1, 5.2, 5.0, 3e5),
+    }),
+    (datetime(2025, 1, 6), {
+        '000001': (10.2, 10.6, 9.7, 1e5),
+        '000003': (5.0, 5.1, 4.9, 3e5),
+    }),
+    (datetime(2025, 1, 7), {
+        '000001': (10.5, 10.9, 10.0, 1e5),        # 收盘与前高持平：日期不刷新
+        '000002': (21.0, 21.5, 19.0, 0.0),        # 零成交量：跳过
+        '000003': (5.2, 5.3, 4.9, 3e5),
+    }),
+    (datetime(2025, 1, 8), {
+        '000001': (9.6, 10.1, 9.5, 1e5),
+        '000002': (20.5, 21.0, 18.8, 2e5),
+        '000003': (4.8, 5.25, 4.7, 3e5),
+    }),
+    (datetime(2025, 1, 9), {
+        '000001': (11.0, 11.2, 9.5, 1e5),         # 最低价与前低持平
+        '000002': (20.5, 20.9, 20.0, 2e5),
+        '000003': (5.5, 5.6, 5.0, 3e5),
+    }),
+]
+
+CODES = sorted(ENTRIES)
+
+
+def new_position(code):
+    entry_date, entry_price, shares = ENTRIES[code]
+    return Position(
+        code=code,
+        entry_date=entry_date,
+        entry_price=entry_price,
+        shares=shares,
+        cost_basis=entry_price * shares * 1.0003,
+    )
+
+
+def held_codes(date):
+    """截至 date（开仓日当天收盘后才开始跟踪）已持有的股票"""
+    return [code for code in CODES if ENTRIES[code][0] < date]
+
+
+def daily_quotes(bars):
+    """由 {code: (close, high, low, volume)} 构造当日 DailyQuotes（open 取 close）"""
+    col = {code: j for j, code in enumerate(CODES)}
+    values = np.full((len(PANEL_FIELDS), len(CODES)), np.nan)
+    present = np.zeros(len(CODES), dtype=bool)
+    for code, (close, high, low, volume) in bars.items():
+        j = col[code]
+        values[:, j] = (close, high, low, close, volume)
+        present[j] = True
+    return DailyQuotes(values, present, CODES, col)
+
+
+def reference_positions():
+    """参考结果：逐个 increment_days_held + update_price_stats"""
+    positions = {}
+    for date, bars in DAYS:
+        for code in held_codes(date):
+            if code not in positions:
+                positions[code] = new_position(code)
+            if code in bars and bars[code][3] != 0:
+                close, high, low, _ = bars[code]
+                positions[code].increment_days_held()
+                positions[code].update_price_stats(date, close, high, low)
+    return positions
+
+
+def assert_same_stats(actual, expected, label):
+    assert sorted(actual) == sorted(expected), f"{label}: positions differ"
+    for code, ref in expected.items():
+        for name in TRACKED_FIELDS:
+            a, b = getattr(actual[code], name), getattr(ref, name)
+            assert a == b, f"{label} {code}.{name}: {a!r} != {b!r}"
+
+
+def test_update_price_stats_batch():
+    """测试 update_price_stats_batch 与逐个更新一致"""
+    print("="*80)
+    print("测试 1: update_price_stats_batch")
+    print("="*80)
+
+    single = {code: new_position(code) for code in CODES}
+    batch = {code: new_position(code) for code in CODES}
+    tracked = {code: new_position(code) for code in CODES}
+    current = Position.collect_extremes(list(tracked.values()))
+    assert current.shape == (len(CODES), len(EXTREME_FIELDS))
+
+    for date, bars in DAYS:
+        codes = [code for code in CODES if code in bars]
+        idx = [CODES.index(code) for code in codes]
+        prices = np.array([bars[code][:3] for code in codes], dtype=float)
+
+        for code in codes:
+            single[code].update_price_stats(date, *bars[code][:3])
+
+        Position.update_price_stats_batch(
+            [batch[code] for code in codes], date,
+            close=prices[:, 0], high=prices[:, 1], low=prices[:, 2],
+        )
+
+        # 调用方维护的极值数组：原地刷新后写回
+        sub = current[idx]
+        Position.update_price_stats_batch(
+            [tracked[code] for code in codes], date,
+            close=prices[:, 0], high=prices[:, 1], low=prices[:, 2],
+            current=sub,
+        )
+        current[idx] = sub
+
+    assert_same_stats(batch, single, "batch")
+    assert_same_stats(tracked, single, "batch(current)")
+    assert np.array_equal(current, Position.collect_extremes(list(tracked.values())))
+
+    # 空持仓直接返回
+    Position.update_price_stats_batch([], DAYS[0][0], np.array([]), np.array([]), np.array([]))
+
+    print("✅ update_price_stats_batch 测试通过")
+    print()
+
+
+def test_portfolio_update_positions_panel():
+    """测试面板路径（持仓簿 + 极值数组缓存）多日更新与逐个更新一致"""
+    print("="*80)
+    print("测试 2: update_positions（DailyQuotes 面板路径）")
+    print("="*80)
+
+    portfolio = PortfolioManager(initial_capital=1_000_000)
+    for date, bars in DAYS:
+        for code in held_codes(date):
+            if code not in portfolio.positions:
+                portfolio.positions[code] = new_position(code)
+                portfolio._book = None   # 同 _execute_buy：开仓后持仓簿重建
+        portfolio.update_positions(date, daily_quotes(bars))
+
+        # 极值数组缓存与 Position 属性保持同步
+        book, extremes = portfolio._book_extremes
+        assert book is portfolio.position_book()
+        assert np.array_equal(extremes, Position.collect_extremes(book[1]))
+
+    assert_same_stats(portfolio.positions, reference_positions(), "panel")
+
+    print(f"   - {len(portfolio.positions)} 只持仓、{len(DAYS)} 个交易日结果一致")
+    print("✅ 面板路径测试通过")
+    print()
+
+
+def test_portfolio_update_positions_dict():
+    """测试逐只字典路径多日更新与逐个更新一致"""
+    print("="*80)
+    print("测试 3: update_positions（逐只字典路径）")
+    print("="*80)
+
+    portfolio = PortfolioManager(initial_capital=1_000_000)
+    for date, bars in DAYS:
+        for code in held_codes(date):
+            if code not in portfolio.positions:
+                portfolio.positions[code] = new_position(code)
+        market_data = {
+            code: pd.Series({'close': close, 'high': high, 'low': low, 'volume': volume})
+            for code, (close, high, low, volume) in bars.items()
+        }
+        portfolio.update_positions(date, market_data)
+
+    assert_same_stats(portfolio.positions, reference_positions(), "dict")
+
+    print("✅ 字典路径测试通过")
+    print()
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*80)
+    print("持仓极值批量更新测试")
+    print("="*80 + "\n")
+
+    try:
+        test_update_price_stats_batch()
+        test_portfolio_update_positions_panel()
+        test_portfolio_update_positions_dict()
+
+        print("\n" + "="*80)
+        print("✅ 所有测试通过！")
+        print("="*80)
+
+    except AssertionError as e:
+        print("\n" + "="*80)
+        print("❌ 测试失败")
+        print("="*80)
+        print(f"\n错误: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print("\n" + "="*80)
+        print("❌ 测试异常")
+        print("="*80)
+        print(f"\n异常: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_all_tests()
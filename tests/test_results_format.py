@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+测试 get_results(format=...) 的各种结果形态
+
+验证：
+1. 'records'（默认）与原实现一致：equity_curve / trades 为逐行 dict 的列表
+2. 'columnar' 为 {列名: list}，逐行还原后与 'records' 相同
+3. 'dataframe' 直接返回 DataFrame，内容与 'records' 相同
+4. 未知格式抛出 ValueError
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backtest.data_structures import Trade
+from backtest.engine import BacktestEngine, RESULT_FORMATS
+
+
+def make_engine(with_history=True) -> BacktestEngine:
+    engine = BacktestEngine(
+        data_dir="./data",
+        buy_config_path="./configs.json",
+        sell_strategy_config={},
+        start_date="2025-01-01",
+        end_date="2025-01-31",
+        initial_capital=1000000,
+        use_indicator_db=False,
+        parallel_workers=1,
+        verbose=False,
+    )
+    if not with_history:
+        return engine
+
+    portfolio = engine.portfolio
+    for i, total in enumerate([1_000_000.0, 1_012_345.67, 998_765.43]):
+        portfolio.equity_curve.append({
+            'date': datetime(2025, 1, 2 + i),
+            'cash': 500_000.0,
+            'position_value': total - 500_000.0,
+            'total_value': total,
+            'num_positions': 2,
+            'frozen_cash': 0.0,
+            'pending_proceeds': 0.0,
+        })
+    portfolio.total_value = 998_765.43
+    portfolio.trades = [
+        Trade(
+            code='000001', entry_date=datetime(2025, 1, 2), entry_price=10.01,
+            shares=1000, entry_cost=10013.0, exit_date=datetime(2025, 1, 3),
+            exit_price=11.52, exit_proceeds=11491.2, buy_strategy='少妇战法',
+            exit_reason='Full Profit Target (15.0%) reached', holding_days=1,
+            max_unrealized_pnl_pct=0.15,
+        ),
+        Trade(
+            code='000002', entry_date=datetime(2025, 1, 2), entry_price=20.37,
+            shares=500, entry_cost=10190.1, exit_date=datetime(2025, 1, 4),
+            exit_price=19.01, exit_proceeds=9485.03, exit_reason='Stop',
+            holding_days=2,
+        ),
+    ]
+    return engine
+
+
+def test_records_format():
+    """测试 records 格式（默认）与原实现一致"""
+    print("="*80)
+    print("测试 1: format='records'")
+    print("="*80)
+
+    engine = make_engine()
+    results = engine.get_results()
+    assert results == engine.get_results(format='records')
+
+    # 原实现：DataFrame.to_dict('records')，空表为 []
+    expected_equity = engine.portfolio.get_equity_curve_df().to_dict('records')
+    expected_trades = engine.portfolio.get_trades_df().to_dict('records')
+    assert isinstance(results['equity_curve'], list) and len(results['equity_curve']) == 3
+    assert isinstance(results['trades'], list) and len(results['trades']) == 2
+    assert results['equity_curve'] == expected_equity
+    assert results['trades'] == expected_trades
+    assert results['final_value'] == 998_765.43
+    assert results['total_return'] == (998_765.43 - 1_000_000) / 1_000_000
+    assert results['num_trades'] == 2
+    assert results['num_positions'] == 0
+
+    empty = make_engine(with_history=False).get_results()
+    assert empty['equity_curve'] == [] and empty['trades'] == []
+
+    print("✅ records 格式测试通过")
+    print()
+
+
+def test_columnar_format():
+    """测试 columnar 格式"""
+    print("="*80)
+    print("测试 2: format='columnar'")
+    print("="*80)
+
+    engine = make_engine()
+    records = engine.get_results(format='records')
+    results = engine.get_results(format='columnar')
+
+    for key, n_rows in (('equity_curve', 3), ('trades', 2)):
+        columns = results[key]
+        assert isinstance(columns, dict)
+        assert list(columns) == list(records[key][0]), f"{key}: column order differs"
+        assert all(isinstance(v, list) and len(v) == n_rows for v in columns.values())
+        rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+        assert rows == records[key], f"{key}: columnar rows differ from records"
+
+    for key in ('final_value', 'total_return', 'num_trades', 'num_positions'):
+        assert results[key] == records[key]
+
+    print("✅ columnar 格式测试通过")
+    print()
+
+
+def test_dataframe_format():
+    """测试 dataframe 格式"""
+    print("="*80)
+    print("测试 3: format='dataframe'")
+    print("="*80)
+
+    engine = make_engine()
+    records = engine.get_results(format='records')
+    results = engine.get_results(format='dataframe')
+
+    for key, n_rows in (('equity_curve', 3), ('trades', 2)):
+        df = results[key]
+        assert isinstance(df, pd.DataFrame)
+        assert df.shape == (n_rows, len(records[key][0]))
+        assert df.to_dict('records') == records[key]
+
+    empty = make_engine(with_history=False).get_results(format='dataframe')
+    assert isinstance(empty['trades'], pd.DataFrame) and empty['trades'].empty
+
+    print("✅ dataframe 格式测试通过")
+    print()
+
+
+def test_unknown_format():
+    """测试未知格式报错"""
+    print("="*80)
+    print("测试 4: 未知格式")
+    print("="*80)
+
+    engine = make_engine()
+    assert 'json' not in RESULT_FORMATS
+    try:
+        engine.get_results(format='json')
+    except ValueError as e:
+        assert 'json' in str(e)
+    else:
+        raise AssertionError("unknown format should raise ValueError")
+
+    print("✅ 未知格式测试通过")
+    print()
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*80)
+    print("回测结果格式测试")
+    print("="*80 + "\n")
+
+    try:
+        test_records_format()
+        test_columnar_format()
+        test_dataframe_format()
+        test_unknown_format()
+
+        print("\n" + "="*80)
+        print("✅ 所有测试通过！")
+        print("="*80)
+
+    except AssertionError as e:
+        print("\n" + "="*80)
+        print("❌ 测试失败")
+        print("="*80)
+        print(f"\n错误: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print("\n" + "="*80)
+        print("❌ 测试异常")
+        print("="*80)
+        print(f"\n异常: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_all_tests()
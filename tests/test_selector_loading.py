@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+测试买入选股器的加载与跨进程标记
+
+验证：
+1. SelectorRef 的字段与默认值
+2. _selector_params 只取可在 worker 进程重建选股器的公开参数
+3. load_buy_selectors 按配置加载（跳过未激活 / 不存在的选股器），并正确标记 process_safe：
+   参数不可 pickle、或类无法按类名在 Selector 模块中找回的选股器标记为 False
+4. process_safe=False 的选股器即使开启进程池也在本进程内选股
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+import backtest.Selector as Selector_module
+from backtest.engine import BacktestEngine, SelectorRef, _selector_params
+
+
+def make_engine(buy_config, **kwargs) -> BacktestEngine:
+    return BacktestEngine(
+        data_dir="./data",
+        buy_config_path="./configs.json",
+        sell_strategy_config={},
+        start_date="2025-01-01",
+        end_date="2025-01-31",
+        buy_config=buy_config,
+        use_indicator_db=False,
+        parallel_workers=1,
+        verbose=False,
+        **kwargs,
+    )
+
+
+def test_selector_ref():
+    """测试 SelectorRef 字段"""
+    print("="*80)
+    print("测试 1: SelectorRef")
+    print("="*80)
+
+    instance = Selector_module.BBIKDJSelector(j_threshold=10)
+    ref = SelectorRef(
+        class_name="BBIKDJSelector",
+        alias="少妇战法",
+        instance=instance,
+        params={"j_threshold": 10},
+        select=instance.select,
+    )
+    assert ref.process_safe is True, "process_safe defaults to True"
+    assert ref.select.__self__ is instance
+    assert not hasattr(ref, '__dict__'), "SelectorRef uses __slots__"
+
+    print("✅ SelectorRef 测试通过")
+    print()
+
+
+def test_selector_params():
+    """测试 _selector_params 的过滤规则"""
+    print("="*80)
+    print("测试 2: _selector_params")
+    print("="*80)
+
+    instance = Selector_module.BBIKDJSelector(j_threshold=10, max_window=60)
+    instance._private_cache = {"x": 1}
+    instance.indicator_store = object()
+
+    params = _selector_params(instance)
+    assert params['j_threshold'] == 10 and params['max_window'] == 60
+    assert '_private_cache' not in params
+    assert 'indicator_store' not in params
+
+    # 由这些参数可以重建出等价的选股器（worker 进程中的做法）
+    rebuilt = Selector_module.BBIKDJSelector(**params)
+    assert _selector_params(rebuilt) == params
+
+    print(f"   - 参数: {sorted(params)}")
+    print("✅ _selector_params 测试通过")
+    print()
+
+
+def test_load_buy_selectors():
+    """测试选股器加载与 process_safe 标记"""
+    print("="*80)
+    print("测试 3: load_buy_selectors")
+    print("="*80)
+
+    # 以别名注册到 Selector 模块的子类：按配置能找到，但 worker 按类名重建时找不到
+    renamed_cls = type("LocalBBIKDJSelector", (Selector_module.BBIKDJSelector,), {})
+    Selector_module.RenamedSelector = renamed_cls
+
+    buy_config = {
+        "selector_combination": {"mode": "TIME_WINDOW", "time_window_days": 3},
+        "selectors": [
+            {"class": "BBIKDJSelector", "alias": "少妇战法", "activate": True,
+             "params": {"j_threshold": 10}},
+            {"class": "BBIKDJSelector", "alias": "未激活", "activate": False},
+            {"class": "NoSuchSelector", "alias": "不存在"},
+            {"class": "BBIKDJSelector", "alias": "不可序列化",
+             "params": {"j_threshold": lambda j: j < 10}},
+            {"class": "RenamedSelector", "alias": "改名"},
+        ],
+    }
+
+    try:
+        engine = make_engine(buy_config)
+        engine.load_buy_selectors()
+    finally:
+        del Selector_module.RenamedSelector
+
+    assert engine.combination_mode == "TIME_WINDOW"
+    assert engine.time_window_days == 3
+
+    selectors = {ref.alias: ref for ref in engine.buy_selectors}
+    assert list(selectors) == ["少妇战法", "不可序列化", "改名"], list(selectors)
+
+    ref = selectors["少妇战法"]
+    assert ref.class_name == "BBIKDJSelector"
+    assert type(ref.instance) is Selector_module.BBIKDJSelector
+    assert ref.instance.j_threshold == 10
+    assert ref.params == {"j_threshold": 10}
+    assert ref.select.__self__ is ref.instance
+    assert ref.process_safe is True
+
+    assert selectors["不可序列化"].process_safe is False, "unpicklable params must stay in-process"
+    assert selectors["改名"].process_safe is False, "class not found by its own name must stay in-process"
+    assert type(selectors["改名"].instance) is renamed_cls
+
+    assert any("ERROR loading NoSuchSelector" in line for line in engine.logs)
+    assert any("Loaded 3 buy selector(s)" in line for line in engine.logs)
+
+    print(f"   - 已加载: {[(alias, ref.process_safe) for alias, ref in selectors.items()]}")
+    print("✅ load_buy_selectors 测试通过")
+    print()
+
+
+def test_unsafe_selector_runs_in_process():
+    """测试 process_safe=False 的选股器不提交到进程池"""
+    print("="*80)
+    print("测试 4: process_safe=False 时本进程选股")
+    print("="*80)
+
+    engine = make_engine({"selectors": []})
+    # 进程池被使用时会因缺少 submit 而报错
+    engine._executor = object()
+    engine.parallel_workers = 2
+
+    calls = []
+
+    def select(date, data):
+        calls.append(date)
+        return sorted(data)
+
+    ref = SelectorRef(
+        class_name="BBIKDJSelector",
+        alias="本地",
+        instance=Selector_module.BBIKDJSelector(),
+        params={},
+        select=select,
+        process_safe=False,
+    )
+    data = {f"{i:06d}": None for i in range(1, 8)}
+    date = datetime(2025, 1, 10)
+
+    try:
+        picks = engine._parallel_select(ref, date, data)
+    finally:
+        engine._executor = None
+
+    assert calls == [date]
+    assert picks == sorted(data)
+
+    print("✅ 本进程选股测试通过")
+    print()
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*80)
+    print("选股器加载测试")
+    print("="*80 + "\n")
+
+    try:
+        test_selector_ref()
+        test_selector_params()
+        test_load_buy_selectors()
+        test_unsafe_selector_runs_in_process()
+
+        print("\n" + "="*80)
+        print("✅ 所有测试通过！")
+        print("="*80)
+
+    except AssertionError as e:
+        print("\n" + "="*80)
+        print("❌ 测试失败")
+        print("="*80)
+        print(f"\n错误: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print("\n" + "="*80)
+        print("❌ 测试异常")
+        print("="*80)
+        print(f"\n异常: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+测试卖出策略批量路径与逐持仓路径的一致性
+
+验证：
+1. should_sell_batch() 与逐个 should_sell() 的结果（含 reason 字符串）完全一致
+2. PositionArrays 的列与 pnl_pct 与 Position 属性 / unrealized_pnl_pct 一致
+3. CompositeSellStrategy.batch_part() 回传给 should_sell() 后结果不变，
+   ALL 逻辑下未通过数组预筛的持仓不再调用依赖历史数据的子策略
+4. DailyQuotes.take() / prev_close() 与逐只 QuoteRow 读取一致
+5. Trade.from_arrays() 与逐个 Trade(...) 构造完全一致
+"""
+
+import sys
+from dataclasses import fields
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backtest.data_structures import Position, Trade
+from backtest.engine import DailyQuotes
+from backtest.sell_strategies.base import (
+    CompositeSellStrategy,
+    PositionArrays,
+    SellStrategy,
+    SimpleHoldStrategy,
+)
+from backtest.sell_strategies.profit_targets import FixedProfitTargetStrategy
+from backtest.sell_strategies.time_based import TimedExitStrategy
+from backtest.sell_strategies.trailing_stops import PercentageTrailingStopStrategy
+
+
+CURRENT_DATE = datetime(2025, 3, 10)
+QUOTE_CODES = ['000001', '000002', '000003', '000004']
+
+
+class HistoryRule(SellStrategy):
+    """模拟依赖历史数据、不支持批量的子策略：对指定代码触发，并记录被调用的持仓。"""
+
+    def __init__(self, codes, **params):
+        super().__init__(**params)
+        self.codes = set(codes)
+        self.calls = []
+
+    def should_sell(self, position, current_date, current_data, hist_data, **kwargs):
+        self.calls.append(position.code)
+        if position.code in self.codes:
+            return True, f"history rule on {position.code}"
+        return False, ""
+
+    def get_name(self) -> str:
+        return "HistoryRule"
+
+
+def create_positions():
+    """创建一组状态各异的持仓及其当日收盘价（覆盖触发 / 未触发的各种组合）"""
+    # (code, entry_price, shares, highest_price_since_entry, days_held, close)
+    rows = [
+        ('000001', 10.00, 1000, 12.00, 3, 11.80),   # 盈利 ~18%：止盈
+        ('000002', 10.00, 1000, 12.00, 70, 10.90),  # 回撤超过 8%：移动止损；持有超期
+        ('000003', 10.00, 1000, 10.00, 10, 9.50),   # 从未盈利：均不触发
+        ('000004', 20.00, 500, 21.60, 61, 20.40),   # 持有超期
+        ('000005', 10.00, 1000, 11.50, 0, 11.50),   # 盈利略低于 15%：不触发
+        ('000006', 8.00, 2000, 10.40, 65, 10.00),   # 止盈 + 超期
+    ]
+    positions = []
+    close = []
+    for code, entry_price, shares, highest, days_held, last in rows:
+        position = Position(
+            code=code,
+            entry_date=datetime(2025, 1, 2),
+            entry_price=entry_price,
+            shares=shares,
+            cost_basis=entry_price * shares * 1.0003,
+        )
+        position.highest_price_since_entry = highest
+        position.days_held = days_held
+        positions.append(position)
+        close.append(last)
+    return positions, np.array(close, dtype=float)
+
+
+def per_position(strategy, positions, close, **kwargs):
+    """逐持仓调用 should_sell()，返回 [(should_sell, reason), ...]"""
+    results = []
+    for i, position in enumerate(positions):
+        current_data = pd.Series({'close': close[i]})
+        results.append(strategy.should_sell(
+            position, CURRENT_DATE, current_data, pd.DataFrame(), **kwargs
+        ))
+    return results
+
+
+def batchable_strategies():
+    return [
+        FixedProfitTargetStrategy(target_pct=0.15),
+        FixedProfitTargetStrategy(target_pct=0.15, partial_exit=True),
+        TimedExitStrategy(max_holding_days=60),
+        PercentageTrailingStopStrategy(trailing_pct=0.08),
+        PercentageTrailingStopStrategy(trailing_pct=0.08, activate_after_profit_pct=0.05),
+        CompositeSellStrategy([
+            FixedProfitTargetStrategy(target_pct=0.15),
+            TimedExitStrategy(max_holding_days=60),
+            PercentageTrailingStopStrategy(trailing_pct=0.08),
+        ], combination_logic="ANY"),
+        CompositeSellStrategy([
+            FixedProfitTargetStrategy(target_pct=0.15),
+            TimedExitStrategy(max_holding_days=60),
+        ], combination_logic="ALL"),
+    ]
+
+
+def test_batch_matches_per_position():
+    """测试批量卖出规则与逐持仓结果一致（含 reason）"""
+    print("="*80)
+    print("测试 1: should_sell_batch 与 should_sell 一致")
+    print("="*80)
+
+    positions, close = create_positions()
+
+    for strategy in batchable_strategies():
+        assert strategy.supports_batch(), f"{strategy.get_name()} should support batch"
+        expected = per_position(strategy, positions, close)
+
+        mask, reasons = strategy.should_sell_batch(positions, close)
+        assert mask.dtype == bool and len(mask) == len(positions)
+        assert [(bool(m), r) for m, r in zip(mask, reasons)] == expected, \
+            f"{strategy.get_name()}: batch results differ from per-position results"
+
+        # 共享 PositionArrays（组合策略的用法）结果相同
+        mask2, reasons2 = strategy.should_sell_batch(positions, close, PositionArrays(positions))
+        assert np.array_equal(mask, mask2) and reasons == reasons2
+
+        print(f"   - {strategy.get_name()}: {int(mask.sum())}/{len(positions)} 触发")
+
+    # 样本需同时包含触发与未触发的持仓，比较才有意义
+    target_mask, _ = FixedProfitTargetStrategy(target_pct=0.15).should_sell_batch(positions, close)
+    assert 0 < target_mask.sum() < len(positions)
+
+    hold = SimpleHoldStrategy()
+    mask, reasons = hold.should_sell_batch(positions, close)
+    assert not mask.any() and reasons == [""] * len(positions)
+    assert per_position(hold, positions, close) == [(False, "")] * len(positions)
+
+    print("✅ 批量卖出规则一致性测试通过")
+    print()
+
+
+def test_position_arrays():
+    """测试 PositionArrays 的列与盈亏计算"""
+    print("="*80)
+    print("测试 2: PositionArrays")
+    print("="*80)
+
+    positions, close = create_positions()
+    arrays = PositionArrays(positions)
+
+    days_held = arrays.column('days_held')
+    assert days_held.dtype == np.int64
+    assert days_held.tolist() == [p.days_held for p in positions]
+    assert arrays.column('entry_price').tolist() == [p.entry_price for p in positions]
+    # 同一列只构建一次
+    assert arrays.column('days_held') is days_held
+
+    pnl = arrays.pnl_pct(close)
+    assert pnl.tolist() == [p.unrealized_pnl_pct(c) for p, c in zip(positions, close.tolist())]
+
+    idx = np.array([1, 3, 5])
+    assert arrays.pnl_pct(close, idx).tolist() == pnl[idx].tolist()
+
+    # 调用方已有的列（如持仓簿）直接传入，不再从 Position 读取
+    shares = np.array([p.shares for p in positions], dtype=float)
+    cost = np.array([p.cost_basis for p in positions], dtype=float)
+    preset = PositionArrays(positions, shares=shares, cost_basis=cost)
+    assert preset.column('shares') is shares
+    assert preset.pnl_pct(close).tolist() == pnl.tolist()
+
+    print("✅ PositionArrays 测试通过")
+    print()
+
+
+def test_composite_batch_part_any():
+    """测试 ANY 组合下 batch_part 回传后的结果与普通路径一致"""
+    print("="*80)
+    print("测试 3: CompositeSellStrategy.batch_part (ANY)")
+    print("="*80)
+
+    positions, close = create_positions()
+    history = HistoryRule(codes={'000003', '000005'})
+    composite = CompositeSellStrategy([
+        FixedProfitTargetStrategy(target_pct=0.15),
+        history,
+        TimedExitStrategy(max_holding_days=60),
+    ], combination_logic="ANY")
+    assert not composite.supports_batch()
+
+    expected = per_position(composite, positions, close)
+
+    part = composite.batch_part(positions, close)
+    assert sorted(part) == [0, 2], "only batchable sub-strategies are evaluated in batch_part"
+
+    actual = [
+        composite.should_sell(
+            position, CURRENT_DATE, pd.Series({'close': close[i]}), pd.DataFrame(),
+            batch_part=part, batch_row=i,
+        )
+        for i, position in enumerate(positions)
+    ]
+    assert actual == expected, f"batch_part results differ:\n{actual}\n{expected}"
+
+    print(f"   - 卖出: {[p.code for p, (s, _) in zip(positions, actual) if s]}")
+    print("✅ batch_part (ANY) 测试通过")
+    print()
+
+
+def test_composite_batch_part_all_prescreen():
+    """测试 ALL 组合下 batch_part 预筛：结果不变，且被预筛排除的持仓不再调用历史规则"""
+    print("="*80)
+    print("测试 4: CompositeSellStrategy.batch_part (ALL 预筛)")
+    print("="*80)
+
+    positions, close = create_positions()
+    history = HistoryRule(codes={'000002', '000003', '000006'})
+    timed = TimedExitStrategy(max_holding_days=60)
+    composite = CompositeSellStrategy([timed, history], combination_logic="ALL")
+
+    expected = per_position(composite, positions, close)
+    assert history.calls == [p.code for p in positions]
+
+    part = composite.batch_part(positions, close)
+    assert sorted(part) == [0]
+
+    history.calls.clear()
+    actual = [
+        composite.should_sell(
+            position, CURRENT_DATE, pd.Series({'close': close[i]}), pd.DataFrame(),
+            batch_part=part, batch_row=i,
+        )
+        for i, position in enumerate(positions)
+    ]
+    assert actual == expected, f"ALL pre-screen results differ:\n{actual}\n{expected}"
+
+    # 只有超期（数组规则触发）的持仓才会调用历史规则
+    timed_mask, _ = timed.should_sell_batch(positions, close)
+    assert history.calls == [p.code for p, hit in zip(positions, timed_mask) if hit]
+    assert [p.code for p, (s, _) in zip(positions, actual) if s] == ['000002', '000006']
+
+    print(f"   - 历史规则调用: {history.calls}")
+    print("✅ batch_part (ALL 预筛) 测试通过")
+    print()
+
+
+def create_quotes(with_prev_close=True):
+    """构造单日行情快照：4 只股票，000003 当日停牌（无数据）"""
+    col = {code: j for j, code in enumerate(QUOTE_CODES)}
+    # 行序同 PANEL_FIELDS：open, high, low, close, volume
+    values = np.array([
+        [10.0, 20.0, np.nan, 30.0],
+        [10.5, 20.6, np.nan, 31.2],
+        [9.8, 19.5, np.nan, 29.9],
+        [10.2, 20.1, np.nan, 31.0],
+        [1.0e6, 5.0e5, np.nan, 0.0],
+    ])
+    present = np.array([True, True, False, True])
+    prev_closes = np.array([9.9, 19.8, 15.0, 30.5]) if with_prev_close else None
+    return DailyQuotes(values, present, QUOTE_CODES, col, prev_closes)
+
+
+def test_daily_quotes_take():
+    """测试 DailyQuotes.take 与逐只读取一致"""
+    print("="*80)
+    print("测试 5: DailyQuotes.take / prev_close")
+    print("="*80)
+
+    quotes = create_quotes()
+    codes = ['000004', '999999', '000001', '000003', '000002']
+    fields_ = ('close', 'high', 'volume')
+
+    present, values = quotes.take(codes, fields_)
+    assert present.tolist() == [code in quotes for code in codes] == [True, False, True, False, True]
+    assert values.shape == (len(fields_), len(codes))
+    for i, code in enumerate(codes):
+        if not present[i]:
+            continue
+        row = quotes[code]
+        for k, field in enumerate(fields_):
+            assert values[k, i] == row[field], f"{code}.{field}"
+            assert values[k, i] == quotes.column(field)[QUOTE_CODES.index(code)]
+
+    present, values = quotes.take([], fields_)
+    assert len(present) == 0 and values.shape == (len(fields_), 0)
+
+    # prev_close：当日有数据才返回上一行收盘价
+    assert quotes.prev_close('000001') == 9.9
+    assert quotes.prev_close('000004') == 30.5
+    assert np.isnan(quotes.prev_close('000003')), "suspended stock has no prev_close today"
+    assert np.isnan(quotes.prev_close('999999'))
+    assert np.isnan(create_quotes(with_prev_close=False).prev_close('000001'))
+
+    print("✅ DailyQuotes 测试通过")
+    print()
+
+
+def test_trade_from_arrays():
+    """测试 Trade.from_arrays 与逐个构造一致"""
+    print("="*80)
+    print("测试 6: Trade.from_arrays")
+    print("="*80)
+
+    columns = dict(
+        codes=['000001', '000002', '000003'],
+        entry_dates=[datetime(2025, 1, 2), datetime(2025, 1, 3), datetime(2025, 1, 6)],
+        entry_prices=[10.01, 20.37, 8.88],
+        shares=[1000, 500, 2300],
+        entry_costs=[10013.0, 10190.1, 20430.53],
+        exit_dates=[datetime(2025, 2, 3), datetime(2025, 1, 20), datetime(2025, 3, 3)],
+        exit_prices=[11.52, 19.01, 9.37],
+        exit_proceeds=[11491.2, 9485.03, 21512.48],
+        buy_strategies=['少妇战法', None, '填坑战法'],
+        exit_reasons=['Full Profit Target (15.0%) reached', 'Stop', ''],
+        holding_days=[22, 11, 40],
+        max_unrealized_pnl_pcts=[0.18, 0.01, 0.07],
+    )
+    trades = Trade.from_arrays(**columns)
+
+    expected = [
+        Trade(
+            code=columns['codes'][i],
+            entry_date=columns['entry_dates'][i],
+            entry_price=columns['entry_prices'][i],
+            shares=columns['shares'][i],
+            entry_cost=columns['entry_costs'][i],
+            exit_date=columns['exit_dates'][i],
+            exit_price=columns['exit_prices'][i],
+            exit_proceeds=columns['exit_proceeds'][i],
+            buy_strategy=columns['buy_strategies'][i],
+            exit_reason=columns['exit_reasons'][i],
+            holding_days=columns['holding_days'][i],
+            max_unrealized_pnl_pct=columns['max_unrealized_pnl_pcts'][i],
+        )
+        for i in range(len(columns['codes']))
+    ]
+
+    assert len(trades) == len(expected)
+    for built, ref in zip(trades, expected):
+        assert type(built) is Trade
+        for f in fields(Trade):
+            a, b = getattr(built, f.name), getattr(ref, f.name)
+            assert a == b and type(a) is type(b), f"{ref.code}.{f.name}: {a!r} != {b!r}"
+    assert trades == expected
+
+    assert Trade.from_arrays(**{k: [] for k in columns}) == []
+
+    print(f"   - {len(trades)} 笔交易逐字段一致")
+    print("✅ Trade.from_arrays 测试通过")
+    print()
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*80)
+    print("卖出策略批量路径一致性测试")
+    print("="*80 + "\n")
+
+    try:
+        test_batch_matches_per_position()
+        test_position_arrays()
+        test_composite_batch_part_any()
+        test_composite_batch_part_all_prescreen()
+        test_daily_quotes_take()
+        test_trade_from_arrays()
+
+        print("\n" + "="*80)
+        print("✅ 所有测试通过！")
+        print("="*80)
+
+    except AssertionError as e:
+        print("\n" + "="*80)
+        print("❌ 测试失败")
+        print("="*80)
+        print(f"\n错误: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print("\n" + "="*80)
+        print("❌ 测试异常")
+        print("="*80)
+        print(f"\n异常: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+测试 TIME_WINDOW 组合模式的增量窗口
+
+验证（每一步都与按调用记录暴力重算的结果比对）：
+1. 窗口内入选的选股器数达到要求的信号被保留，同一股票保留得分最高的信号
+2. 距今超过 time_window_days 天的日期从左端移出（含一次移出多天）
+3. 同一日期重复调用时以最后一次为准
+4. 日期回退（重新开始的回测）时窗口从头累积
+5. signal_history 为 deque[(date, {selector: codes})]，_window_selectors 与窗口一致
+"""
+
+import sys
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from backtest.data_structures import BuySignal
+from backtest.engine import BacktestEngine
+
+
+TIME_WINDOW_DAYS = 3
+
+# 每次调用: (日期, {选股器: [(code, kdj_j), ...]})；kdj_j 越低得分越高
+CALLS = [
+    # 1/2 开始累积
+    (datetime(2025, 1, 2), {
+        'A': [('000001', 20), ('000002', 30)],
+        'B': [('000003', 40)],
+    }),
+    # 000001: A(1/2) + B → 入选
+    (datetime(2025, 1, 3), {
+        'B': [('000001', 10)],
+        'C': [('000004', 50)],
+    }),
+    # 同日重复调用：上一次的 B→000001 作废；000002: A(1/2) + B → 入选
+    (datetime(2025, 1, 3), {
+        'B': [('000002', 10)],
+        'C': [('000004', 50)],
+    }),
+    # 1/2 距今 4 天移出；000004: C(1/3) + A → 入选；000003 的 B(1/2) 已移出
+    (datetime(2025, 1, 6), {
+        'A': [('000004', 60)],
+        'C': [('000003', 40)],
+    }),
+    # 1/3、1/6 一次移出；000004 只剩 A
+    (datetime(2025, 1, 10), {
+        'A': [('000004', 60)],
+        'B': [('000005', 20)],
+    }),
+    # 日期回退：窗口清空；000001 同日两个选股器入选，保留得分高的（同分保留先出现的）
+    (datetime(2025, 1, 7), {
+        'A': [('000001', 30), ('000006', 20)],
+        'B': [('000001', 10), ('000006', 20)],
+        'C': [('000002', 50)],
+    }),
+    # 000002: C(1/7) + A → 入选；000001 三个选股器齐全
+    (datetime(2025, 1, 8), {
+        'A': [('000002', 40)],
+        'B': [('000007', 20)],
+        'C': [('000001', 70)],
+    }),
+]
+
+
+def make_engine(required_selectors) -> BacktestEngine:
+    engine = BacktestEngine(
+        data_dir="./data",
+        buy_config_path="./configs.json",
+        sell_strategy_config={},
+        start_date="2025-01-01",
+        end_date="2025-01-31",
+        use_indicator_db=False,
+        parallel_workers=1,
+        verbose=False,
+    )
+    engine.combination_mode = "TIME_WINDOW"
+    engine.time_window_days = TIME_WINDOW_DAYS
+    engine.required_selectors = list(required_selectors)
+    return engine
+
+
+def make_signals(date, picks):
+    return {
+        selector: [
+            BuySignal(code=code, date=date, strategy_name=selector,
+                      strategy_alias=selector, kdj_j=kdj_j)
+            for code, kdj_j in signals
+        ]
+        for selector, signals in picks.items()
+    }
+
+
+def brute_force(calls, required_count):
+    """
+    按调用记录重算最后一次调用的结果：
+    有效历史 = 最后一次日期回退之后的调用，同日只取最后一次；
+    窗口 = 距今不超过 TIME_WINDOW_DAYS 天的日期。
+    返回 (入选信号 [(code, selector, score)], {code: 窗口内入选的选股器}, 窗口日期)
+    """
+    history = {}
+    last_date = None
+    for date, picks in calls:
+        if last_date is not None and date < last_date:
+            history = {}
+        history[date] = picks
+        last_date = date
+
+    current_date, current_picks = calls[-1]
+    window_dates = sorted(d for d in history if (current_date - d).days <= TIME_WINDOW_DAYS)
+
+    window = {}
+    for d in window_dates:
+        for selector, signals in history[d].items():
+            for code, _ in signals:
+                window.setdefault(code, set()).add(selector)
+
+    best = {}
+    for selector, signals in make_signals(current_date, current_picks).items():
+        for signal in signals:
+            if len(window[signal.code]) < required_count:
+                continue
+            kept = best.get(signal.code)
+            if kept is None or signal.score > kept.score:
+                best[signal.code] = signal
+    final = [(s.code, s.strategy_name, s.score) for s in best.values()]
+    return final, window, window_dates
+
+
+def run_sequence(required_selectors):
+    engine = make_engine(required_selectors)
+    required_count = len(required_selectors) or 2
+    passed = []
+
+    for i, (date, picks) in enumerate(CALLS):
+        result = engine._apply_combination_logic(make_signals(date, picks), date)
+        actual = [(s.code, s.strategy_name, s.score) for s in result]
+        expected, window, window_dates = brute_force(CALLS[:i + 1], required_count)
+        label = f"call {i + 1} ({date:%Y-%m-%d})"
+
+        assert actual == expected, f"{label}: {actual} != {expected}"
+
+        window_selectors = {code: set(counts) for code, counts in engine._window_selectors.items()}
+        assert window_selectors == window, f"{label}: window {window_selectors} != {window}"
+        assert all(n > 0 for counts in engine._window_selectors.values() for n in counts.values())
+
+        history = engine.signal_history
+        assert isinstance(history, deque)
+        assert [d for d, _ in history] == window_dates, f"{label}: window dates differ"
+        assert history[-1][1] == {
+            selector: {code for code, _ in signals} for selector, signals in picks.items()
+        }
+        passed.append([code for code, _, _ in actual])
+
+    return passed
+
+
+def test_two_selectors_required():
+    """测试默认要求（窗口内至少 2 个选股器）"""
+    print("="*80)
+    print("测试 1: required_selectors 为空（至少 2 个选股器）")
+    print("="*80)
+
+    passed = run_sequence([])
+    assert passed == [
+        [],
+        ['000001'],
+        ['000002'],
+        ['000004'],
+        [],
+        ['000001', '000006'],
+        ['000002', '000001'],
+    ], passed
+
+    for i, codes in enumerate(passed, 1):
+        print(f"   - 第 {i} 次调用: {codes}")
+    print("✅ 默认要求测试通过")
+    print()
+
+
+def test_required_selectors():
+    """测试 required_selectors 指定数量（需 3 个选股器）"""
+    print("="*80)
+    print("测试 2: required_selectors = [A, B, C]")
+    print("="*80)
+
+    passed = run_sequence(['A', 'B', 'C'])
+    assert passed == [[], [], [], [], [], [], ['000001']], passed
+
+    print("✅ required_selectors 测试通过")
+    print()
+
+
+def test_best_signal_per_code():
+    """测试同一股票保留得分最高的信号"""
+    print("="*80)
+    print("测试 3: 同一股票取最高分")
+    print("="*80)
+
+    engine = make_engine([])
+    date, picks = CALLS[5]
+    result = engine._apply_combination_logic(make_signals(date, picks), date)
+    by_code = {s.code: s for s in result}
+    # 000001: B 的 kdj_j 更低（得分更高）；000006: 同分保留先出现的 A
+    assert by_code['000001'].strategy_name == 'B'
+    assert by_code['000006'].strategy_name == 'A'
+    assert [s.code for s in result] == ['000001', '000006']
+
+    print("✅ 最高分测试通过")
+    print()
+
+
+def run_all_tests():
+    """运行所有测试"""
+    print("\n" + "="*80)
+    print("TIME_WINDOW 窗口测试")
+    print("="*80 + "\n")
+
+    try:
+        test_two_selectors_required()
+        test_required_selectors()
+        test_best_signal_per_code()
+
+        print("\n" + "="*80)
+        print("✅ 所有测试通过！")
+        print("="*80)
+
+    except AssertionError as e:
+        print("\n" + "="*80)
+        print("❌ 测试失败")
+        print("="*80)
+        print(f"\n错误: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print("\n" + "="*80)
+        print("❌ 测试异常")
+        print("="*80)
+        print(f"\n异常: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_all_tests()
@@ -7,6 +7,8 @@ Performance optimizations vs original:
   compute_kdj  — K/D 递推由 Python for 循环改为 pandas ewm (底层 Cython/C)，
                  速度提升 10~50 倍；初始值 K[0]=D[0]=50 行为与原版完全一致。
   compute_atr  — 用切片对齐替代 np.roll，消除首尾环绕边界问题，正确性提升。
+  compute_kdj_lines — 只返回 K/D/J 三个 ndarray，不复制输入 DataFrame；
+                 只需要末值的调用方（信号打分、卖出检查）不再为 assign 付整表拷贝。
 """
 
 import numpy as np
@@ -18,30 +20,22 @@ from typing import Tuple
 # KDJ
 # ═══════════════════════════════════════════════════════════════════
 
-def compute_kdj(df: pd.DataFrame, n: int = 9) -> pd.DataFrame:
+def compute_kdj_lines(df: pd.DataFrame, n: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    Calculate KDJ indicator (Stochastic oscillator variant).
+    Calculate KDJ and return the (K, D, J) arrays only.
 
-    [优化] 原实现用 Python for 循环逐行递推 K/D（O(N) Python 解释器开销）。
-    新实现使用 pandas ewm（alpha=1/3, adjust=False），底层 Cython 实现，
-    等价于递推公式  K[i] = 2/3·K[i-1] + 1/3·RSV[i]，速度提升 10~50 倍。
-    将 rsv[0] 强制设为 50，确保 K[0]=D[0]=50，与原版行为完全一致。
+    与 compute_kdj 数值完全一致，但不通过 df.assign 复制整张输入表。
 
     Args:
-        df: DataFrame with OHLC data (must have 'high', 'low', 'close' columns)
+        df: DataFrame with 'high', 'low', 'close' columns
         n:  Period for calculation (default: 9)
 
     Returns:
-        DataFrame with K, D, J columns added
-
-    Formula:
-        RSV = (Close - LLV(Low, N)) / (HHV(High, N) - LLV(Low, N)) * 100
-        K   = EMA(RSV, alpha=1/3)   # Initial K = 50  → rsv[0] = 50
-        D   = EMA(K,   alpha=1/3)   # Initial D = 50
-        J   = 3K - 2D
+        (K, D, J) float64 arrays aligned with df rows
     """
     if df.empty:
-        return df.assign(K=np.nan, D=np.nan, J=np.nan)
+        empty = np.empty(0, dtype=float)
+        return empty, empty, empty
 
     low_n  = df["low"].rolling(window=n, min_periods=1).min()
     high_n = df["high"].rolling(window=n, min_periods=1).max()
@@ -63,7 +57,36 @@ def compute_kdj(df: pd.DataFrame, n: int = 9) -> pd.DataFrame:
     D = K.ewm(alpha=1.0 / 3.0, adjust=False).mean()
     J = 3.0 * K - 2.0 * D
 
-    return df.assign(K=K.values, D=D.values, J=J.values)
+    return K.values, D.values, J.values
+
+
+def compute_kdj(df: pd.DataFrame, n: int = 9) -> pd.DataFrame:
+    """
+    Calculate KDJ indicator (Stochastic oscillator variant).
+
+    [优化] 原实现用 Python for 循环逐行递推 K/D（O(N) Python 解释器开销）。
+    新实现使用 pandas ewm（alpha=1/3, adjust=False），底层 Cython 实现，
+    等价于递推公式  K[i] = 2/3·K[i-1] + 1/3·RSV[i]，速度提升 10~50 倍。
+    将 rsv[0] 强制设为 50，确保 K[0]=D[0]=50，与原版行为完全一致。
+
+    Args:
+        df: DataFrame with OHLC data (must have 'high', 'low', 'close' columns)
+        n:  Period for calculation (default: 9)
+
+    Returns:
+        DataFrame with K, D, J columns added
+
+    Formula:
+        RSV = (Close - LLV(Low, N)) / (HHV(High, N) - LLV(Low, N)) * 100
+        K   = EMA(RSV, alpha=1/3)   # Initial K = 50  → rsv[0] = 50
+        D   = EMA(K,   alpha=1/3)   # Initial D = 50
+        J   = 3K - 2D
+    """
+    if df.empty:
+        return df.assign(K=np.nan, D=np.nan, J=np.nan)
+
+    K, D, J = compute_kdj_lines(df, n)
+    return df.assign(K=K, D=D, J=J)
 
 
 # ═══════════════════════════════════════════════════════════════════
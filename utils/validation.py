@@ -114,7 +114,7 @@ def generate_data_quality_report(
     Generate comprehensive data quality report.
 
     Args:
-        market_data: Dictionary of {stock_code: DataFrame}
+        market_data: Dictionary of {stock_code: DataFrame}, each sorted by date
         backtest_start: Backtest start date
 
     Returns:
@@ -136,7 +136,11 @@ def generate_data_quality_report(
         is_valid_ohlc, ohlc_issues = validate_ohlc_consistency(df)
 
         # Check data length at backtest start
-        df_at_start = df[df['date'] <= backtest_start]
+        # 行情已按日期升序：截至开始日的行是一个前缀
+        n_at_start = df['date'].to_numpy().searchsorted(
+            np.datetime64(pd.Timestamp(backtest_start), 'ns'), side='right'
+        )
+        df_at_start = df.iloc[:n_at_start]
         is_valid_range, range_issues = validate_data_range(df_at_start, min_length=120)
 
         # Collect issues